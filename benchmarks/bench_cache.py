@@ -0,0 +1,33 @@
+"""read() of a large file with and without a warm parse cache."""
+
+import os
+
+import configlines
+
+from .common import TempFiles, generate_config
+
+
+class CachedRead(object):
+    params = [1000, 100000]
+    param_names = ['options']
+
+    def setup(self, count):
+        self.files = TempFiles()
+        self.path = self.files.write('big.cfg', generate_config(count // 20, 20))
+        self.cache = configlines.ParseCache(
+            os.path.join(self.files.directory, 'cache'))
+        configlines.ConfigParser(cache=self.cache).read(self.path)
+
+    def teardown(self, count):
+        self.files.cleanup()
+
+    def time_read_cold(self, count):
+        configlines.ConfigParser().read(self.path)
+
+    def time_read_cached(self, count):
+        configlines.ConfigParser(cache=self.cache).read(self.path)
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(CachedRead)
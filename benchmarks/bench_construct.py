@@ -0,0 +1,45 @@
+"""Cost of creating and discarding short-lived parsers."""
+
+import gc
+
+from six.moves import configparser
+
+import configlines
+
+
+def _parser_class(name):
+    if name.startswith('stdlib.'):
+        return getattr(configparser, name[len('stdlib.'):])
+    return getattr(configlines, name)
+
+
+class Construct(object):
+    params = ['RawConfigParser', 'ConfigParser', 'stdlib.ConfigParser']
+    param_names = ['parser']
+
+    def time_construct(self, name):
+        _parser_class(name)()
+
+    def time_construct_read_string(self, name):
+        cfg = _parser_class(name)()
+        cfg.read_string(u'[foo]\nbar = 1\nbaz = 2\n')
+
+    def track_cyclic_garbage(self, name):
+        # Objects that are only freed by the cyclic collector after 1000
+        # parsers have been created and dropped.
+        cls = _parser_class(name)
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(1000):
+                cfg = cls()
+                cfg.read_string(u'[foo]\nbar = 1\n')
+                del cfg
+            return gc.collect()
+        finally:
+            gc.enable()
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Construct)
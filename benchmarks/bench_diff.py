@@ -0,0 +1,60 @@
+"""diff() against comparing two parsers option by option."""
+
+import configlines
+
+from .common import TempFiles, generate_layout
+
+
+class Diff(object):
+    params = [[10000, 100000], ['sections', 'files']]
+    param_names = ['options', 'layout']
+    timeout = 600
+
+    def setup(self, count, layout):
+        self.files = TempFiles()
+        texts = generate_layout(layout, count)
+        golden = [self.files.write('golden%d.cfg' % i, text)
+                  for i, text in enumerate(texts)]
+        # The host differs from the golden config in a single option
+        texts[-1] = texts[-1].replace('value', 'drifted', 1)
+        host = [self.files.write('host%d.cfg' % i, text)
+                for i, text in enumerate(texts)]
+        self.golden = configlines.ConfigParser()
+        self.golden.read(golden)
+        self.host = configlines.ConfigParser()
+        self.host.read(host)
+        self.digests = self.host.section_digests()
+        self.section = self.host.sections()[0]
+
+    def teardown(self, count, layout):
+        self.files.cleanup()
+
+    def time_option_by_option(self, count, layout):
+        golden, host = self.golden, self.host
+        for section in golden.sections():
+            for option in golden.options(section):
+                value = golden.get(section, option, raw=True)
+                if value != host.get(section, option, raw=True):
+                    golden.get_location(section, option)
+                    host.get_location(section, option)
+
+    def time_diff_cold(self, count, layout):
+        # Digests are dropped first, so this includes hashing every section
+        self.golden._digests.clear()
+        self.host._digests.clear()
+        self.golden.diff(self.host)
+
+    def time_diff(self, count, layout):
+        self.golden.diff(self.host)
+
+    def time_diff_digests(self, count, layout):
+        self.golden.diff(self.digests)
+
+    def time_diff_after_change(self, count, layout):
+        self.host.set(self.section, 'opt0', 'changed')
+        self.golden.diff(self.host)
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Diff)
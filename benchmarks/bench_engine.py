@@ -0,0 +1,44 @@
+"""engine='fast': reading files without going through configparser's
+_read() and the option wrappers."""
+
+from six.moves import configparser
+
+import configlines
+
+from .common import TempFiles, generate_layout
+
+
+class Engine(object):
+    params = [[10000, 100000], ['sections', 'default', 'multiline']]
+    param_names = ['options', 'layout']
+    timeout = 600
+
+    def setup(self, count, layout):
+        self.files = TempFiles()
+        text, = generate_layout(layout, count)
+        self.path = self.files.write('large.cfg', text)
+
+    def teardown(self, count, layout):
+        self.files.cleanup()
+
+    def _read(self, cls, **kwargs):
+        cfg = cls(**kwargs)
+        cfg.read(self.path)
+
+    def time_read_configparser(self, count, layout):
+        self._read(configparser.ConfigParser)
+
+    def time_read_configlines(self, count, layout):
+        self._read(configlines.ConfigParser)
+
+    def time_read_fast(self, count, layout):
+        self._read(configlines.ConfigParser, engine='fast')
+
+    def time_read_fast_lazy(self, count, layout):
+        self._read(configlines.ConfigParser, engine='fast',
+                   track_locations='lazy')
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Engine)
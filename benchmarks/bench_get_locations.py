@@ -0,0 +1,54 @@
+"""get_locations() against one get_location() call per option."""
+
+import configlines
+
+from .common import TempFiles, generate_layout
+
+
+class BulkLocations(object):
+    params = [[1000, 10000], ['sections', 'default']]
+    param_names = ['options', 'layout']
+    # With the 'default' layout, every section sees every DEFAULT option
+    timeout = 600
+
+    def setup(self, count, layout):
+        self.files = TempFiles()
+        paths = [self.files.write('file%d.cfg' % i, text)
+                 for i, text in enumerate(generate_layout(layout, count))]
+        self.parser = configlines.ConfigParser()
+        self.parser.read(paths)
+        self.sections = dict((section, self.parser.options(section))
+                             for section in self.parser.sections())
+
+    def teardown(self, count, layout):
+        self.files.cleanup()
+
+    def time_get_location(self, count, layout):
+        get_location = self.parser.get_location
+        for section, options in self.sections.items():
+            for option in options:
+                get_location(section, option)
+
+    def time_get_locations_cold(self, count, layout):
+        # Views are dropped first, so this includes building them
+        self.parser._location_views.clear()
+        for section, locations in self.parser.get_locations().items():
+            for option in locations:
+                locations[option]
+
+    def time_get_locations(self, count, layout):
+        for section, locations in self.parser.get_locations().items():
+            for option in locations:
+                locations[option]
+
+    def time_get_locations_by_section(self, count, layout):
+        get_locations = self.parser.get_locations
+        for section in self.sections:
+            locations = get_locations(section)
+            for option in locations:
+                locations[option]
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(BulkLocations)
@@ -0,0 +1,46 @@
+"""Cost of track_history=True on large configs."""
+
+import tracemalloc
+
+import configlines
+
+from .common import TempFiles, generate_config
+
+
+class History(object):
+    params = [[10000, 100000], [False, True]]
+    param_names = ['options', 'track_history']
+
+    def setup(self, count, track_history):
+        self.files = TempFiles()
+        self.base = self.files.write('base.cfg', generate_config(count // 20, 20))
+        self.layer = self.files.write('layer.cfg',
+                                      generate_config(count // 40, 20))
+
+    def teardown(self, count, track_history):
+        self.files.cleanup()
+
+    def _read(self, track_history):
+        cfg = configlines.ConfigParser(track_history=track_history)
+        cfg.read([self.base, self.layer])
+        return cfg
+
+    def time_read(self, count, track_history):
+        self._read(track_history)
+
+    def track_location_bytes(self, count, track_history):
+        tracemalloc.start()
+        try:
+            # Kept alive until the snapshot, so that its memory is counted
+            cfg = self._read(track_history)
+            snapshot = tracemalloc.take_snapshot()
+            del cfg
+        finally:
+            tracemalloc.stop()
+        return sum(stat.size for stat in snapshot.statistics('filename')
+                   if 'locations.py' in stat.traceback[0].filename)
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(History)
@@ -0,0 +1,65 @@
+"""Cost of get() on interpolated values, with and without the cache."""
+
+from six.moves import configparser
+
+import configlines
+
+
+def generate_interpolated(sections, depth):
+    """Return the text of a config file where every section has a chain of
+    `depth' options, each referring to the previous one, on top of a value
+    from [DEFAULT]."""
+
+    lines = ['[DEFAULT]', 'root = /srv', '']
+    for i in range(sections):
+        lines.append('[section%d]' % i)
+        lines.append('opt0 = %(root)s/' + 'section%d' % i)
+        for j in range(1, depth):
+            lines.append('opt%d = %%(opt%d)s/%d' % (j, j - 1, j))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+class Interpolation(object):
+    params = [[100, 1000], [1, 5]]
+    param_names = ['sections', 'depth']
+
+    def setup(self, sections, depth):
+        text = generate_interpolated(sections, depth)
+        self.stdlib = configparser.ConfigParser()
+        self.stdlib.read_string(text)
+        self.tracking = configlines.ConfigParser()
+        self.tracking.read_string(text)
+        self.option = 'opt%d' % (depth - 1)
+        self.sections = self.stdlib.sections()
+        self._get(self.tracking)
+
+    def _get(self, cfg):
+        option = self.option
+        for section in self.sections:
+            cfg.get(section, option)
+
+    def time_get_configparser(self, sections, depth):
+        self._get(self.stdlib)
+
+    def time_get_cached(self, sections, depth):
+        self._get(self.tracking)
+
+    def time_get_uncached(self, sections, depth):
+        self.tracking._interpolated.forget()
+        self._get(self.tracking)
+
+    def time_get_location_chain(self, sections, depth):
+        get_location_chain = self.tracking.get_location_chain
+        for section in self.sections:
+            get_location_chain(section, self.option)
+
+    def time_set_and_get(self, sections, depth):
+        # Changing one section only recomputes that section's values
+        self.tracking.set(self.sections[0], 'opt0', '/data')
+        self._get(self.tracking)
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Interpolation)
@@ -0,0 +1,54 @@
+"""track_locations='lazy': cost of reading, and of the first lookup."""
+
+from six.moves import configparser
+
+import configlines
+
+from .common import TempFiles, generate_layout
+
+
+class Lazy(object):
+    params = [[10000, 100000], ['sections', 'files']]
+    param_names = ['options', 'layout']
+
+    def setup(self, count, layout):
+        if layout == 'files' and count > 10000:
+            # configparser itself is quadratic in the number of files
+            raise NotImplementedError
+        self.files = TempFiles()
+        self.paths = [self.files.write('file%d.cfg' % i, text)
+                      for i, text in enumerate(generate_layout(layout, count))]
+        self.parser = self._read(track_locations='lazy')
+        self.parser.get_location('section0' if layout == 'sections'
+                                 else 'file0', 'opt0')
+
+    def teardown(self, count, layout):
+        self.files.cleanup()
+
+    def _read(self, cls=configlines.ConfigParser, **kwargs):
+        cfg = cls(**kwargs)
+        cfg.read(self.paths)
+        return cfg
+
+    def time_read_configparser(self, count, layout):
+        self._read(configparser.ConfigParser)
+
+    def time_read_eager(self, count, layout):
+        self._read()
+
+    def time_read_lazy(self, count, layout):
+        self._read(track_locations='lazy')
+
+    def time_read_lazy_and_locate(self, count, layout):
+        cfg = self._read(track_locations='lazy')
+        cfg.get_location(cfg.sections()[-1], 'opt0')
+
+    def time_repeated_lookup(self, count, layout):
+        get_location = self.parser.get_location
+        for section in self.parser.sections()[:1000]:
+            get_location(section, 'opt0')
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Lazy)
@@ -0,0 +1,67 @@
+"""Memory held by location information: the compact location store versus
+the original defaultdict(dict) of (filename, lineno) tuples."""
+
+import tracemalloc
+from collections import defaultdict
+
+from configlines.locations import _LocationStore
+
+
+def _entries(count, per_section=20):
+    # Option names and file names are owned by the parser anyway, so they are
+    # created before measuring. Line numbers are not: the reader creates a new
+    # int for every line, which is why _measure() stores lineno + 1.
+    sections = max(count // per_section, 1)
+    filename = '/etc/generated/app.cfg'
+    entries = []
+    lineno = 1
+    for i in range(sections):
+        section = 'section%d' % i
+        lineno += 1
+        for j in range(per_section):
+            entries.append((section, 'option%d' % j, filename, lineno))
+            lineno += 1
+    return entries
+
+
+def _measure(factory, entries):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        store = factory()
+        for section, option, filename, lineno in entries:
+            store[section][option] = (filename, lineno + 1)
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+class LocationMemory(object):
+    params = [1000, 10000, 200000]
+    param_names = ['options']
+
+    def setup(self, count):
+        self.entries = _entries(count)
+
+    def track_store_bytes(self, count):
+        return _measure(_LocationStore, self.entries)
+
+    def track_dict_of_tuples_bytes(self, count):
+        return _measure(lambda: defaultdict(dict), self.entries)
+
+    def time_store_fill(self, count):
+        store = _LocationStore()
+        for section, option, filename, lineno in self.entries:
+            store[section][option] = (filename, lineno)
+
+    def time_store_lookup(self, count):
+        store = _LocationStore()
+        for section, option, filename, lineno in self.entries:
+            store[section][option] = (filename, lineno)
+        for section, option, filename, lineno in self.entries:
+            store[section].get(option)
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(LocationMemory)
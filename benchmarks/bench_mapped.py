@@ -0,0 +1,65 @@
+"""Starting a worker: attaching to a mapped file vs. loading a snapshot
+vs. re-parsing."""
+
+import configlines
+
+from .common import TempFiles, generate_config
+
+
+class Mapped(object):
+    params = [10000, 100000]
+    param_names = ['options']
+    timeout = 600
+
+    def setup(self, count):
+        self.files = TempFiles()
+        self.paths = [self.files.write('%d.cfg' % i,
+                                       generate_config(count // 200, 20,
+                                                       prefix='opt%d_' % i))
+                      for i in range(10)]
+        cfg = self._parse()
+        self.snapshot = cfg.snapshot()
+        self.mapped = self.files.write('config.map', '')
+        cfg.export_mapped(self.mapped)
+        # A worker typically looks up a handful of options
+        self.lookups = [(section, cfg.options(section)[0])
+                        for section in cfg.sections()[:20]]
+
+    def teardown(self, count):
+        self.files.cleanup()
+
+    def _parse(self):
+        cfg = configlines.ConfigParser()
+        cfg.read(self.paths)
+        return cfg
+
+    def _lookup(self, cfg):
+        for section, option in self.lookups:
+            cfg.get(section, option)
+            cfg.get_location(section, option)
+
+    def time_reparse(self, count):
+        self._lookup(self._parse())
+
+    def time_load_snapshot(self, count):
+        cfg = configlines.ConfigParser()
+        cfg.load_snapshot(self.snapshot)
+        self._lookup(cfg)
+
+    def time_attach(self, count):
+        with configlines.MappedConfig(self.mapped) as cfg:
+            self._lookup(cfg)
+
+    def time_export(self, count):
+        self._parse().export_mapped(self.mapped)
+
+    def peakmem_load_snapshot(self, count):
+        configlines.ConfigParser().load_snapshot(self.snapshot)
+
+    def peakmem_attach(self, count):
+        configlines.MappedConfig(self.mapped).close()
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Mapped)
@@ -0,0 +1,139 @@
+"""Overhead of configlines relative to the stdlib configparser at scale.
+
+Every measurement is taken for both parsers on the same synthetic files, and
+the track_*_overhead benchmarks report the configlines figure divided by the
+configparser one (1.0 means no overhead). Layouts are described in
+common.generate_layout().
+
+The largest sizes take a while; to run a subset without asv, pass filters to
+the runner, e.g. ``python -m benchmarks.bench_overhead "(1000,"``.
+"""
+
+from six.moves import configparser
+
+import configlines
+
+from .common import TempFiles, best_time, generate_layout, peak_memory
+
+
+# Number of options looked up or set per call of the latency benchmarks
+SAMPLES = 1000
+
+
+class Overhead(object):
+    params = [[1000, 10000, 100000, 1000000],
+              ['sections', 'default', 'multiline', 'files']]
+    param_names = ['options', 'layout']
+    timeout = 1200
+
+    def setup(self, count, layout):
+        self.files = TempFiles()
+        self.paths = [self.files.write('file%d.cfg' % i, text)
+                      for i, text in enumerate(generate_layout(layout, count))]
+        self.stdlib = self._read(configparser.ConfigParser)
+        self.tracking = self._read(configlines.ConfigParser)
+        self.samples = self._samples(self.stdlib)
+
+    def teardown(self, count, layout):
+        self.files.cleanup()
+
+    def _read(self, cls):
+        cfg = cls()
+        cfg.read(self.paths)
+        return cfg
+
+    @staticmethod
+    def _samples(cfg):
+        # Spread lookups evenly over the sections, including options that are
+        # only found through [DEFAULT].
+        sections = cfg.sections()
+        step = max(len(sections) // SAMPLES, 1)
+        samples = []
+        for i, section in enumerate(sections[::step][:SAMPLES]):
+            options = cfg.options(section)
+            samples.append((section, options[i % len(options)]))
+        return samples
+
+    def _get(self, cfg):
+        for section, option in self.samples:
+            cfg.get(section, option)
+
+    def _get_location(self):
+        for section, option in self.samples:
+            self.tracking.get_location(section, option)
+
+    def _get_line(self):
+        for section, option in self.samples:
+            self.tracking.get_line(section, option)
+
+    def _set(self, cfg):
+        for section, option in self.samples:
+            cfg.set(section, option, 'new value')
+
+    # read()
+
+    def time_read_configparser(self, count, layout):
+        self._read(configparser.ConfigParser)
+
+    def time_read_configlines(self, count, layout):
+        self._read(configlines.ConfigParser)
+
+    def track_read_overhead(self, count, layout):
+        return (best_time(lambda: self._read(configlines.ConfigParser)) /
+                best_time(lambda: self._read(configparser.ConfigParser)))
+
+    # Lookups, relative to get() on the stdlib parser
+
+    def time_get_configparser(self, count, layout):
+        self._get(self.stdlib)
+
+    def time_get_configlines(self, count, layout):
+        self._get(self.tracking)
+
+    def time_get_location(self, count, layout):
+        self._get_location()
+
+    def time_get_line(self, count, layout):
+        self._get_line()
+
+    def track_get_overhead(self, count, layout):
+        return (best_time(lambda: self._get(self.tracking)) /
+                best_time(lambda: self._get(self.stdlib)))
+
+    def track_get_location_overhead(self, count, layout):
+        return (best_time(self._get_location) /
+                best_time(lambda: self._get(self.stdlib)))
+
+    def track_get_line_overhead(self, count, layout):
+        return (best_time(self._get_line) /
+                best_time(lambda: self._get(self.stdlib)))
+
+    # set()
+
+    def time_set_configparser(self, count, layout):
+        self._set(self.stdlib)
+
+    def time_set_configlines(self, count, layout):
+        self._set(self.tracking)
+
+    def track_set_overhead(self, count, layout):
+        return (best_time(lambda: self._set(self.tracking)) /
+                best_time(lambda: self._set(self.stdlib)))
+
+    # Memory
+
+    def peakmem_read_configparser(self, count, layout):
+        self._read(configparser.ConfigParser)
+
+    def peakmem_read_configlines(self, count, layout):
+        self._read(configlines.ConfigParser)
+
+    def track_peakmem_overhead(self, count, layout):
+        return (peak_memory(lambda: self._read(configlines.ConfigParser)) /
+                float(peak_memory(lambda: self._read(
+                    configparser.ConfigParser))))
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Overhead)
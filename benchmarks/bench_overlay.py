@@ -0,0 +1,66 @@
+"""Per-tenant parsers: overlays on a shared base vs. full parsers."""
+
+import copy
+import tracemalloc
+
+import configlines
+
+from .common import TempFiles, generate_config
+
+
+TENANTS = 20
+OVERRIDES = u'[section1]\nopt1 = mine\n\n[DEFAULT]\nextra = 1\n'
+
+
+class Overlay(object):
+    params = [[10000, 100000], ['overlay', 'copy', 'reread']]
+    param_names = ['options', 'method']
+
+    def setup(self, count, method):
+        self.files = TempFiles()
+        self.path = self.files.write('base.cfg',
+                                     generate_config(count // 20, 20))
+        self.base = configlines.ConfigParser()
+        self.base.read(self.path)
+        self.tenant = self._tenant(method)
+
+    def teardown(self, count, method):
+        self.files.cleanup()
+
+    def _tenant(self, method):
+        if method == 'overlay':
+            cfg = self.base.overlay()
+        elif method == 'copy':
+            cfg = copy.copy(self.base)
+        else:
+            cfg = configlines.ConfigParser()
+            cfg.read(self.path)
+        cfg.read_string(OVERRIDES, 'tenant.cfg')
+        return cfg
+
+    def time_create(self, count, method):
+        self._tenant(method)
+
+    def time_get(self, count, method):
+        get = self.tenant.get
+        for i in range(0, count // 20, max(count // 20000, 1)):
+            get('section%d' % i, 'opt1')
+
+    def time_get_location(self, count, method):
+        get_location = self.tenant.get_location
+        for i in range(0, count // 20, max(count // 20000, 1)):
+            get_location('section%d' % i, 'opt1')
+
+    def track_bytes_per_tenant(self, count, method):
+        tracemalloc.start()
+        try:
+            tenants = [self._tenant(method) for _ in range(TENANTS)]
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        return size // len(tenants)
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Overlay)
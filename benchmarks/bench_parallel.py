@@ -0,0 +1,38 @@
+"""read() of many conf.d-style fragments, sequentially and in parallel."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import configlines
+
+from .common import TempFiles, generate_config
+
+
+class ManyFragments(object):
+    params = [[300], [20, 500]]
+    param_names = ['files', 'options_per_file']
+
+    def setup(self, files, options):
+        self.files = TempFiles()
+        self.paths = [
+            self.files.write('%03d.conf' % i,
+                             generate_config(5, options // 5,
+                                             prefix='opt%d_' % (i % 7)))
+            for i in range(files)]
+
+    def teardown(self, files, options):
+        self.files.cleanup()
+
+    def time_sequential(self, files, options):
+        configlines.ConfigParser().read(self.paths)
+
+    def time_processes_4(self, files, options):
+        configlines.ConfigParser().read(self.paths, workers=4)
+
+    def time_threads_4(self, files, options):
+        with ThreadPoolExecutor(4) as executor:
+            configlines.ConfigParser().read(self.paths, executor=executor)
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(ManyFragments)
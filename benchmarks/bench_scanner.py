@@ -0,0 +1,49 @@
+"""iter_options(): scanning a single large file without keeping it."""
+
+from six.moves import configparser
+
+import configlines
+
+from .common import TempFiles, generate_layout
+
+
+class Scanner(object):
+    params = [[100000, 1000000], ['sections', 'multiline']]
+    param_names = ['options', 'layout']
+    timeout = 600
+
+    def setup(self, count, layout):
+        self.files = TempFiles()
+        text, = generate_layout(layout, count)
+        self.path = self.files.write('large.cfg', text)
+
+    def teardown(self, count, layout):
+        self.files.cleanup()
+
+    def _scan(self):
+        for _ in configlines.iter_options(self.path):
+            pass
+
+    def _read(self, cls):
+        cfg = cls()
+        cfg.read(self.path)
+
+    def time_read_configparser(self, count, layout):
+        self._read(configparser.RawConfigParser)
+
+    def time_read_configlines(self, count, layout):
+        self._read(configlines.RawConfigParser)
+
+    def time_iter_options(self, count, layout):
+        self._scan()
+
+    def peakmem_read_configparser(self, count, layout):
+        self._read(configparser.RawConfigParser)
+
+    def peakmem_iter_options(self, count, layout):
+        self._scan()
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Scanner)
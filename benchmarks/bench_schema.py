@@ -0,0 +1,61 @@
+"""Schema.validate() against getint() and get_location() for each option."""
+
+from six.moves import configparser
+
+import configlines
+
+from .common import generate_config
+
+
+class Validate(object):
+    params = [[100, 1000]]
+    param_names = ['options']
+
+    def setup(self, count):
+        # Every value is an integer, and those over 500 are out of range
+        text = generate_config(max(count // 10, 1), 10)
+        text = text.replace('value ', '').replace('.', '')
+        self.parser = configlines.ConfigParser()
+        self.parser.read_string(text, 'app.cfg')
+        self.options = [(section, option)
+                        for section in self.parser.sections()
+                        for option in self.parser.options(section)]
+        self.schema = configlines.Schema(dict(
+            (section, dict((option, configlines.Option(int, max=500))
+                           for option in self.parser.options(section)))
+            for section in self.parser.sections()))
+        self.valid = configlines.Schema(dict(
+            (section, dict((option, int)
+                           for option in self.parser.options(section)))
+            for section in self.parser.sections()))
+        self.values = self.valid.validate(self.parser)
+
+    def time_getint(self, count):
+        errors = []
+        for section, option in self.options:
+            try:
+                value = self.parser.getint(section, option)
+                if value > 500:
+                    raise ValueError('too large')
+            except (ValueError, configparser.Error) as e:
+                errors.append((e, self.parser.get_location(section, option)))
+
+    def time_validate(self, count):
+        try:
+            self.schema.validate(self.parser)
+        except configlines.SchemaError:
+            pass
+
+    def time_read_getint(self, count):
+        for section, option in self.options:
+            self.parser.getint(section, option)
+
+    def time_read_validated(self, count):
+        values = self.values
+        for section, option in self.options:
+            values[section][option]
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Validate)
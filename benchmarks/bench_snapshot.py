@@ -0,0 +1,65 @@
+"""Shipping a parsed configuration: snapshots vs. pickling vs. re-parsing."""
+
+import pickle
+
+import configlines
+
+from .common import TempFiles, generate_config
+
+
+class Snapshot(object):
+    params = [10000, 100000]
+    param_names = ['options']
+
+    def setup(self, count):
+        self.files = TempFiles()
+        self.paths = [self.files.write('%d.cfg' % i,
+                                       generate_config(count // 200, 20,
+                                                       prefix='opt%d_' % i))
+                      for i in range(10)]
+        cfg = self._parse()
+        self.snapshot = cfg.snapshot()
+        self.parser_pickle = pickle.dumps(cfg, pickle.HIGHEST_PROTOCOL)
+
+        # What you'd get by pickling the values and locations by hand
+        values = dict((name, dict(cfg.items(name, raw=True)))
+                      for name in cfg.sections())
+        locations = dict((name, dict((option, cfg.get_location(name, option))
+                                     for option in cfg.options(name)))
+                         for name in cfg.sections())
+        self.nested_pickle = pickle.dumps((values, locations),
+                                          pickle.HIGHEST_PROTOCOL)
+
+    def teardown(self, count):
+        self.files.cleanup()
+
+    def _parse(self):
+        cfg = configlines.ConfigParser()
+        cfg.read(self.paths)
+        return cfg
+
+    def time_reparse(self, count):
+        self._parse()
+
+    def time_load_snapshot(self, count):
+        configlines.ConfigParser().load_snapshot(self.snapshot)
+
+    def time_unpickle_parser(self, count):
+        pickle.loads(self.parser_pickle)
+
+    def time_unpickle_nested_dicts(self, count):
+        pickle.loads(self.nested_pickle)
+
+    def track_snapshot_bytes(self, count):
+        return len(self.snapshot)
+
+    def track_parser_pickle_bytes(self, count):
+        return len(self.parser_pickle)
+
+    def track_nested_pickle_bytes(self, count):
+        return len(self.nested_pickle)
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Snapshot)
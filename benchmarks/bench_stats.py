@@ -0,0 +1,40 @@
+"""enable_stats(): the cost of reading with the tracking layer instrumented,
+and the cost of having been instrumented once it is disabled again."""
+
+import configlines
+
+from .common import TempFiles, generate_layout
+
+
+class Stats(object):
+    params = [[10000, 100000], ['configparser', 'fast']]
+    param_names = ['options', 'engine']
+    timeout = 600
+
+    def setup(self, count, engine):
+        self.files = TempFiles()
+        text, = generate_layout('sections', count)
+        self.path = self.files.write('large.cfg', text)
+
+    def teardown(self, count, engine):
+        self.files.cleanup()
+
+    def time_read(self, count, engine):
+        cfg = configlines.ConfigParser(engine=engine)
+        cfg.read(self.path)
+
+    def time_read_disabled(self, count, engine):
+        cfg = configlines.ConfigParser(engine=engine)
+        cfg.enable_stats()
+        cfg.disable_stats()
+        cfg.read(self.path)
+
+    def time_read_enabled(self, count, engine):
+        cfg = configlines.ConfigParser(engine=engine)
+        cfg.enable_stats()
+        cfg.read(self.path)
+
+
+if __name__ == '__main__':
+    from .common import run
+    run(Stats)
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+
+
+def generate_config(sections, options, prefix='opt'):
+    """Return the text of a config file with `sections' sections of `options'
+    options each."""
+
+    lines = []
+    for i in range(sections):
+        lines.append('[section%d]' % i)
+        for j in range(options):
+            lines.append('%s%d = value %d.%d' % (prefix, j, i, j))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def generate_layout(layout, count):
+    """Return a list of config file texts holding about `count' options in
+    total, arranged according to `layout':
+
+    ``sections``
+        one file, with many small sections
+    ``default``
+        one file, with half of the options in [DEFAULT] and every section
+        overriding a few of them
+    ``multiline``
+        one file, where every value spans three lines
+    ``files``
+        many small files of one section each
+    """
+
+    if layout == 'sections':
+        return [generate_config(max(count // 10, 1), 10)]
+    elif layout == 'default':
+        defaults = max(count // 2, 1)
+        sections = max(count // 2 // 5, 1)
+        lines = ['[DEFAULT]']
+        for j in range(defaults):
+            lines.append('opt%d = default %d' % (j, j))
+        for i in range(sections):
+            lines.append('')
+            lines.append('[section%d]' % i)
+            for j in range(5):
+                lines.append('opt%d = value %d.%d' % ((i + j) % defaults, i, j))
+        return ['\n'.join(lines) + '\n']
+    elif layout == 'multiline':
+        lines = []
+        for i in range(max(count // 10, 1)):
+            lines.append('[section%d]' % i)
+            for j in range(10):
+                lines.append('opt%d = first %d.%d' % (j, i, j))
+                lines.append('    second line')
+                lines.append('    third line')
+            lines.append('')
+        return ['\n'.join(lines)]
+    elif layout == 'files':
+        return ['[file%d]\n' % i +
+                ''.join('opt%d = value %d.%d\n' % (j, i, j) for j in range(10))
+                for i in range(max(count // 10, 1))]
+    raise ValueError('unknown layout %r' % (layout,))
+
+
+class TempFiles(object):
+    """Writes config text into a temporary directory and removes it again."""
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='configlines-bench-')
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as fp:
+            fp.write(text)
+        return path
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def peak_memory(func):
+    """Call func() and return the peak number of bytes allocated while it
+    ran, as seen by tracemalloc."""
+
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def best_time(func, repeat=3):
+    """Return the best wall clock time of `repeat' calls to func()."""
+
+    import timeit
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def run(*classes):
+    """Minimal runner so benchmarks can be executed without asv installed:
+    python -m benchmarks.<module> [filter...]
+
+    If filters are given, only parameter combinations whose repr contains
+    one of them are run, e.g. ``python -m benchmarks.bench_overhead 1000,``.
+    """
+
+    import sys
+    import timeit
+    filters = sys.argv[1:]
+    for cls in classes:
+        for param in _params(cls):
+            if filters and not any(f in repr(param) for f in filters):
+                continue
+            bench = cls()
+            if hasattr(bench, 'setup'):
+                try:
+                    bench.setup(*param)
+                except NotImplementedError:
+                    # asv's convention for skipping a combination
+                    continue
+            try:
+                for name in sorted(dir(bench)):
+                    method = getattr(bench, name)
+                    label = '%s.%s%s' % (cls.__name__, name,
+                                         '(%s)' % ', '.join(map(repr, param))
+                                         if param else '')
+                    if name.startswith('time_'):
+                        timer = timeit.Timer(lambda: method(*param))
+                        number, _ = timer.autorange()
+                        best = min(timer.repeat(3, number)) / number
+                        print('%-60s %12.3f ms' % (label, best * 1e3))
+                    elif name.startswith('peakmem_'):
+                        peak = peak_memory(lambda: method(*param))
+                        print('%-60s %12.1f MiB' % (label, peak / 2.0**20))
+                    elif name.startswith('track_'):
+                        print('%-60s %12s' % (label, method(*param)))
+            finally:
+                if hasattr(bench, 'teardown'):
+                    bench.teardown(*param)
+
+
+def _params(cls):
+    import itertools
+    params = getattr(cls, 'params', None)
+    if params is None:
+        return [()]
+    if not params or not isinstance(params[0], (list, tuple)):
+        params = [params]
+    return list(itertools.product(*params))
@@ -1 +1,9 @@
-from .parsers import RawConfigParser, SafeConfigParser, ConfigParser
+from .parsers import (RawConfigParser, SafeConfigParser, ConfigParser,
+                      LocationChange, ConfigDifference)
+from .cache import ParseCache
+from .source import SourceChangedError
+from .scanner import ScannedOption, iter_options
+from .shared import SharedConfig
+from .stats import ReadStats
+from .mapped import MappedConfig
+from .schema import Schema, Option, SchemaError, SchemaViolation
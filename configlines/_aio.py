@@ -0,0 +1,98 @@
+# Coroutine versions of the read methods. Kept in a separate module because
+# the syntax isn't available on Python 2; see the import in parsers.py.
+
+import asyncio
+import os
+
+# Only called from coroutines, where get_event_loop() returns the running
+# loop on Pythons that don't have get_running_loop() (before 3.7).
+_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+class _AsyncReadMixin(object):
+    # Files are opened and parsed in an executor, each into a separate
+    # parser, so neither the event loop nor the parser's own read state is
+    # touched while that happens. The results are then installed on the loop
+    # in one go, without yielding, so other coroutines never see a partial
+    # read. Concurrent calls install their results in the order the
+    # coroutines start running, which for tasks is the order they were
+    # created in.
+
+    async def read_async(self, filenames, encoding=None, executor=None):
+        """Coroutine version of read().
+
+        Files are read and parsed in `executor' (the event loop's default
+        executor if None), then applied to the parser all at once. If any
+        file fails to parse, the error is raised and nothing is applied.
+        Returns the list of files that were read.
+        """
+
+        from .parsers import _parse_file
+
+        if (isinstance(filenames, (str, bytes)) or
+                hasattr(filenames, '__fspath__')):
+            filenames = [filenames]
+        filenames = list(filenames)
+        spec = self._fragment_spec() + (self._cache,)
+        loop = _running_loop()
+
+        async def parse():
+            return await asyncio.gather(*[
+                loop.run_in_executor(executor, _parse_file, spec, filename,
+                                     encoding)
+                for filename in filenames])
+
+        results = await self._install_async(parse())
+        read_ok = []
+        for filename, result in zip(filenames, results):
+            if result is not None:
+                if hasattr(filename, '__fspath__'):
+                    filename = os.fspath(filename)
+                read_ok.append(filename)
+        return read_ok
+
+    async def read_file_async(self, f, source=None, executor=None):
+        """Coroutine version of read_file(). `f' is read from another
+        thread, so it must not be used elsewhere until this is done.
+        """
+
+        from .parsers import _parse_stream
+
+        if source is None:
+            source = getattr(f, 'name', '<???>')
+        loop = _running_loop()
+        parse = loop.run_in_executor(
+            executor, _parse_stream, self._fragment_spec() + (self._cache,),
+            f, source)
+        await self._install_async(_single(parse))
+
+    async def read_string_async(self, string, source='<string>',
+                                executor=None):
+        """Coroutine version of read_string()."""
+
+        await self.read_file_async(string, source, executor)
+
+    async def _install_async(self, parsing):
+        # Waits for `parsing' to produce a list of (fragment, log entry)
+        # results, then for every earlier call to finish, and installs them.
+        previous = getattr(self, '_async_tail', None)
+        done = _running_loop().create_future()
+        self._async_tail = done
+        try:
+            try:
+                results = await parsing
+            finally:
+                if previous is not None:
+                    await asyncio.wait([previous])
+            for result in results:
+                if result is not None:
+                    self._install_fragment(*result)
+            return results
+        finally:
+            done.set_result(None)
+            if self._async_tail is done:
+                del self._async_tail
+
+
+async def _single(future):
+    return [await future]
@@ -0,0 +1,161 @@
+import errno
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+
+
+# Bump whenever the layout of cached entries changes.
+_FORMAT = 1
+
+_SUFFIX = '.cache'
+
+
+def _file_identity(fp):
+    # Returns (device, inode, size, mtime) for an open file object, or None
+    # if it isn't backed by a file descriptor.
+    try:
+        return _identity(os.fstat(fp.fileno()))
+    except (AttributeError, EnvironmentError, ValueError):
+        return None
+
+
+def _path_identity(path):
+    # Like _file_identity(), but for a path. Returns None if it can't be
+    # stat'ed.
+    try:
+        return _identity(os.stat(path))
+    except (EnvironmentError, TypeError, ValueError):
+        return None
+
+
+def _at_start(fp):
+    # Whether an open file is at its start, so that reading it gives the
+    # whole file. False if that can't be told.
+    try:
+        return fp.tell() == 0
+    except (AttributeError, EnvironmentError, ValueError):
+        return False
+
+
+def _identity(st):
+    mtime = getattr(st, 'st_mtime_ns', st.st_mtime)
+    return st.st_dev, st.st_ino, st.st_size, mtime
+
+
+class ParseCache(object):
+    """An on-disk cache of parsed configuration files.
+
+    Pass an instance as the `cache' argument of a parser's constructor. Files
+    read through the parser are then looked up by path, size, modification
+    time and inode, and unchanged files are replayed from the cache instead of
+    being parsed again. Location information is cached along with the values.
+
+    `directory' is created if it doesn't exist. When the cache grows beyond
+    `max_size' bytes, the least recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST or not os.path.isdir(directory):
+                raise
+
+    def key(self, fp, fpname, fingerprint):
+        """Return the cache key for an open file, or None if the file can't
+        be cached (e.g., it isn't a regular file or isn't at its start).
+        """
+
+        if not _at_start(fp):
+            return None
+        identity = _file_identity(fp)
+        if identity is None:
+            return None
+        encoding = getattr(fp, 'encoding', None)
+        ident = repr((_FORMAT, sys.version_info[:2], fpname, identity,
+                      encoding, fingerprint))
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def load(self, key):
+        """Return the cached data for `key', or None."""
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fp:
+                data = fp.read()
+        except EnvironmentError:
+            self.misses += 1
+            return None
+
+        try:
+            data = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        # Mark as recently used
+        try:
+            os.utime(path, None)
+        except EnvironmentError:
+            pass
+        self.hits += 1
+        return data
+
+    def store(self, key, data):
+        """Store data under `key', evicting old entries if necessary."""
+
+        data = marshal.dumps(data)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            getattr(os, 'replace', os.rename)(tmp, self._path(key))
+        except EnvironmentError:
+            self._remove(tmp)
+            return
+        self._evict()
+
+    def clear(self):
+        """Remove every entry from the cache."""
+
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except EnvironmentError:
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+            total += st.st_size
+
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except EnvironmentError:
+            pass
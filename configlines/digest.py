@@ -0,0 +1,33 @@
+import hashlib
+import struct
+
+import six
+
+
+def _section_digest(options):
+    # A digest of the raw values of a section, in hex. Options are hashed in
+    # sorted order, so that the digest doesn't depend on the order options
+    # were read or set in, and with their lengths, so that no two sections
+    # with different contents are encoded the same way.
+    parts = []
+    for option in sorted(options):
+        if option == '__name__':
+            continue
+        value = options[option]
+        parts.append(_encode(option))
+        if value is None:
+            parts.append(b'\0')
+        else:
+            parts.append(b'\1')
+            parts.append(_encode(value))
+    return hashlib.sha256(b''.join(parts)).hexdigest()[:32]
+
+
+def _encode(text):
+    if isinstance(text, six.text_type):
+        data = text.encode('utf-8')
+    elif isinstance(text, bytes):
+        data = text
+    else:
+        data = six.text_type(repr(text)).encode('utf-8')
+    return struct.pack('>I', len(data)) + data
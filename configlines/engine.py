@@ -0,0 +1,151 @@
+import sys
+
+from six.moves import configparser
+
+
+def _fast_engine_supported(parser):
+    # The fast engine follows the Python 3 parser, and skips calling
+    # before_read(), so it can only stand in for interpolations that don't
+    # change values as they are read.
+    base = getattr(configparser, 'Interpolation', None)
+    interpolation = getattr(parser, '_interpolation', None)
+    return (base is not None and interpolation is not None and
+            type(interpolation).before_read is base.before_read)
+
+
+def _parse_lines(parser, fp, fpname):
+    # Parses the lines of a file for engine='fast', following
+    # RawConfigParser._read() rule for rule, but in one pass without
+    # touching the parser. Returns (fragment, error), where fragment is in
+    # the format of _export_fragment() and error is an exception to raise
+    # once the fragment has been applied, or None. Like configparser, fatal
+    # errors stop parsing, and other errors are collected until the end.
+    sectcre = parser.SECTCRE
+    optcre = parser._optcre
+    nonspacecre = parser.NONSPACECRE
+    if nonspacecre is configparser.RawConfigParser.NONSPACECRE:
+        nonspacecre = None                # lstrip() does the same, faster
+    optionxform = parser.optionxform
+    comment_prefixes = tuple(parser._comment_prefixes)
+    inline_prefixes = tuple(parser._inline_comment_prefixes)
+    empty_lines_in_values = parser._empty_lines_in_values
+    strict = parser._strict
+    default_section = parser.default_section
+    sections = parser._sections
+    maxsize = sys.maxsize
+
+    # Section name (None for the default section) -> option -> (lineno,
+    # value), where value is None or a list of lines, in order of first
+    # appearance.
+    blocks = {}
+    elements_added = set()
+    cursect = None
+    sectname = None
+    optname = None
+    optval = None
+    indent_level = 0
+    error = None
+    fatal = None
+    lineno = 0
+    for line in fp:
+        lineno += 1
+        if inline_prefixes:
+            comment_start = maxsize
+            prefixes = dict((prefix, -1) for prefix in inline_prefixes)
+            while comment_start == maxsize and prefixes:
+                next_prefixes = {}
+                for prefix, index in prefixes.items():
+                    index = line.find(prefix, index + 1)
+                    if index == -1:
+                        continue
+                    next_prefixes[prefix] = index
+                    if index == 0 or (index > 0 and line[index - 1].isspace()):
+                        comment_start = min(comment_start, index)
+                prefixes = next_prefixes
+            if line.strip().startswith(comment_prefixes):
+                comment_start = 0
+            if comment_start == maxsize:
+                comment_start = None
+                value = line.strip()
+            else:
+                value = line[:comment_start].strip()
+        else:
+            value = line.strip()
+            comment_start = None
+            if comment_prefixes and value.startswith(comment_prefixes):
+                comment_start = 0
+                value = ''
+        if not value:
+            if empty_lines_in_values:
+                # Blank lines are kept, unless they held a comment
+                if (comment_start is None and cursect is not None and
+                        optname and optval is not None):
+                    optval.append('')
+            else:
+                indent_level = maxsize
+            continue
+
+        if nonspacecre is None:
+            cur_indent_level = len(line) - len(line.lstrip())
+        else:
+            first_nonspace = nonspacecre.search(line)
+            cur_indent_level = first_nonspace.start() if first_nonspace else 0
+        if cursect is not None and optname and cur_indent_level > indent_level:
+            try:
+                optval.append(value)
+            except AttributeError as e:
+                # A continuation of an option without a value
+                fatal = e
+                break
+            continue
+
+        indent_level = cur_indent_level
+        mo = sectcre.match(value)
+        if mo:
+            sectname = mo.group('header')
+            if sectname in sections or sectname != default_section:
+                if strict and sectname in elements_added:
+                    fatal = configparser.DuplicateSectionError(
+                        sectname, fpname, lineno)
+                    break
+                elements_added.add(sectname)
+                cursect = blocks.get(sectname)
+                if cursect is None:
+                    cursect = blocks[sectname] = {}
+            else:
+                cursect = blocks.get(None)
+                if cursect is None:
+                    cursect = blocks[None] = {}
+            optname = None
+        elif cursect is None:
+            fatal = configparser.MissingSectionHeaderError(fpname, lineno,
+                                                           line)
+            break
+        else:
+            mo = optcre.match(value)
+            if mo:
+                optname, optval = mo.group('option', 'value')
+                if not optname:
+                    error = parser._handle_error(error, fpname, lineno, line)
+                optname = optionxform(optname.rstrip())
+                if strict and (sectname, optname) in elements_added:
+                    fatal = configparser.DuplicateOptionError(
+                        sectname, optname, fpname, lineno)
+                    break
+                elements_added.add((sectname, optname))
+                if optval is not None:
+                    optval = [optval.strip()]
+                cursect[optname] = lineno, optval
+            else:
+                error = parser._handle_error(error, fpname, lineno, line)
+
+    fragment = []
+    for name, options in blocks.items():
+        values = []
+        for _, value in options.values():
+            if value is not None:
+                value = '\n'.join(value).rstrip()
+            values.append(value)
+        fragment.append((name, tuple(options), tuple(values),
+                         tuple([lineno for lineno, _ in options.values()])))
+    return fragment, fatal or error
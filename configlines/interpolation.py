@@ -0,0 +1,109 @@
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from six.moves import configparser
+
+from .slots import _Slotted
+
+
+class _InterpolationCache(_Slotted):
+    # Interpolated values by (section, option), along with the (section,
+    # option) pairs each one was looked up from, in lookup order. An option
+    # of None stands for every option of a section. `dependents' is the
+    # reverse: option -> section -> keys of the values that depend on it, so
+    # that a change only drops the values it can affect. Entries for values
+    # that have since been dropped are left behind and ignored.
+    __slots__ = ('values', 'depends', 'dependents')
+
+    def __init__(self):
+        self.values = {}
+        self.depends = {}
+        self.dependents = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, key, value, depends):
+        # The value goes in last, so that anything that finds it can also
+        # find its dependencies.
+        self.depends[key] = depends
+        dependents = self.dependents
+        for section, option in depends:
+            by_section = dependents.get(option)
+            if by_section is None:
+                by_section = dependents[option] = {}
+            keys = by_section.get(section)
+            if keys is None:
+                keys = by_section[section] = set()
+            keys.add(key)
+        self.values[key] = value
+
+    def copy(self):
+        # Values are copied first: add() stores them last, so every value
+        # copied has its dependencies copied too, even if another thread is
+        # adding to this cache meanwhile.
+        clone = _InterpolationCache()
+        clone.values = self.values.copy()
+        clone.depends = self.depends.copy()
+        clone.dependents = dict(
+            (option, dict((section, set(keys))
+                          for section, keys in list(by_section.items())))
+            for option, by_section in list(self.dependents.items()))
+        return clone
+
+    def forget(self, section=None, option=None):
+        # Drops the values that depend on `option' in `section'. A change to
+        # DEFAULT can affect every section; an option of None means the
+        # whole section changed.
+        if section is None or (option is None and
+                               section == configparser.DEFAULTSECT):
+            self.values.clear()
+            self.depends.clear()
+            self.dependents.clear()
+            return
+        if option is None:
+            groups = [by_section.pop(section, ())
+                      for by_section in self.dependents.values()]
+        else:
+            groups = []
+            for name in (option, None):
+                by_section = self.dependents.get(name)
+                if not by_section:
+                    continue
+                if section == configparser.DEFAULTSECT:
+                    groups.extend(by_section.values())
+                    del self.dependents[name]
+                else:
+                    groups.append(by_section.pop(section, ()))
+        values, depends = self.values, self.depends
+        for keys in groups:
+            for key in keys:
+                values.pop(key, None)
+                depends.pop(key, None)
+
+
+class _RecordingMap(Mapping):
+    # Wraps the mapping that get() looks values up in, recording each
+    # option that is found as a dependency of the value being interpolated.
+    __slots__ = ('values', 'section', 'recorder')
+
+    def __init__(self, values, section, recorder):
+        self.values = values
+        self.section = section
+        self.recorder = recorder
+
+    def __getitem__(self, option):
+        value = self.values[option]
+        self.recorder.append((self.section, option))
+        return value
+
+    def __contains__(self, option):
+        return option in self.values
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
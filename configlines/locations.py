@@ -0,0 +1,457 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import sys
+
+import six
+
+from .slots import _Slotted
+
+
+# Line numbers are kept in a signed 32-bit array. Anything that doesn't fit
+# (or any location that isn't a (str, int) tuple) is kept verbatim instead.
+_MAX_LINE = 2**31 - 1
+
+
+class _NameTable(_Slotted):
+    # Interns strings to small integer ids. Ids are never reused, so they stay
+    # valid for the lifetime of the table.
+    __slots__ = ('ids', 'names')
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        try:
+            return self.ids[name]
+        except KeyError:
+            ident = self.ids[name] = len(self.names)
+            self.names.append(name)
+            return ident
+
+    def nbytes(self, strings=False):
+        size = sys.getsizeof(self.ids) + sys.getsizeof(self.names)
+        if strings:
+            size += sum(sys.getsizeof(name) for name in self.names)
+        return size
+
+
+class _SectionLocations(_Slotted):
+    # Location information for the options of a single section. Each option
+    # owns a slot in a pair of parallel arrays holding the interned file id
+    # and the line number. Freed slots are recycled. Locations that can't be
+    # packed into the arrays are stored as-is in `extra'.
+    __slots__ = ('store', 'name', 'files', 'slots', 'file_ids', 'lines',
+                 'free', 'extra')
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.files = store.files
+        self.slots = {}
+        self.file_ids = array('i')
+        self.lines = array('i')
+        self.free = None
+        self.extra = None
+
+    def __len__(self):
+        return len(self.slots) + (len(self.extra) if self.extra else 0)
+
+    def __contains__(self, option):
+        return option in self.slots or bool(self.extra and option in self.extra)
+
+    def __iter__(self):
+        for option in list(self.slots):
+            yield option
+        if self.extra:
+            for option in list(self.extra):
+                yield option
+
+    def __getitem__(self, option):
+        location = self.get(option)
+        if location is None:
+            raise KeyError(option)
+        return location
+
+    def get(self, option, default=None):
+        slot = self.slots.get(option)
+        if slot is None:
+            if self.extra:
+                return self.extra.get(option, default)
+            return default
+        return self.files.names[self.file_ids[slot]], self.lines[slot]
+
+    def __setitem__(self, option, location):
+        if location is None:
+            self.pop(option)
+            return
+        filename, lineno = location
+        if (type(location) is tuple and type(lineno) is int
+                and isinstance(filename, six.string_types)
+                and 0 <= lineno <= _MAX_LINE):
+            if self.extra:
+                self.extra.pop(option, None)
+            file_id = self.files.intern(filename)
+            slot = self.slots.get(option)
+            history = self.store.history
+            if history is not None and (slot is None or
+                                        self.file_ids[slot] != file_id or
+                                        self.lines[slot] != lineno):
+                history.append(self.name, option, file_id, lineno)
+            reverse = self.store.reverse
+            if reverse is not None:
+                if slot is not None:
+                    reverse.remove(self.file_ids[slot], self.lines[slot],
+                                   self.name, option)
+                reverse.add(file_id, lineno, self.name, option)
+            if slot is None:
+                if self.free:
+                    slot = self.free.pop()
+                    self.file_ids[slot] = file_id
+                    self.lines[slot] = lineno
+                else:
+                    slot = len(self.lines)
+                    self.file_ids.append(file_id)
+                    self.lines.append(lineno)
+                self.slots[option] = slot
+            else:
+                self.file_ids[slot] = file_id
+                self.lines[slot] = lineno
+        else:
+            self._release(option)
+            if self.extra is None:
+                self.extra = {}
+            elif self.extra.get(option) == location:
+                return
+            self.extra[option] = location
+            if self.store.history is not None:
+                self.store.history.append_extra(self.name, option, location)
+
+    def restore(self, option, location):
+        # Sets a location again after it was released, e.g. by set() with
+        # location='preserve', without logging it twice in a row.
+        history = self.store.history
+        if history is not None:
+            logged = history.get(self.name, option)
+            if logged and logged[-1] == location:
+                self.store.history = None
+        try:
+            self[option] = location
+        finally:
+            self.store.history = history
+
+    def __delitem__(self, option):
+        if self.pop(option) is None:
+            raise KeyError(option)
+
+    def _release(self, option):
+        slot = self.slots.pop(option, None)
+        if slot is not None:
+            if self.store.reverse is not None:
+                self.store.reverse.remove(self.file_ids[slot], self.lines[slot],
+                                          self.name, option)
+            self.file_ids[slot] = -1
+            if self.free is None:
+                self.free = []
+            self.free.append(slot)
+        return slot
+
+    def pop(self, option, default=None):
+        location = self.get(option)
+        if location is None:
+            return default
+        if self._release(option) is None:
+            del self.extra[option]
+        return location
+
+    def items(self):
+        for option in self:
+            yield option, self.get(option)
+
+    def nbytes(self):
+        size = (sys.getsizeof(self) + sys.getsizeof(self.slots) +
+                sys.getsizeof(self.file_ids) + sys.getsizeof(self.lines))
+        if self.free is not None:
+            size += sys.getsizeof(self.free)
+        if self.extra is not None:
+            size += sys.getsizeof(self.extra) + sum(
+                sys.getsizeof(location) for location in self.extra.values())
+        return size
+
+    def pack(self, options):
+        # Returns the locations of `options' as (file_ids, lines, extra): two
+        # arrays in the same order as `options', with a file id of -1 where
+        # there is no packed location, and a dict of the locations that
+        # couldn't be packed.
+        file_ids = array('i')
+        lines = array('i')
+        for option in options:
+            slot = self.slots.get(option)
+            if slot is None:
+                file_ids.append(-1)
+                lines.append(0)
+            else:
+                file_ids.append(self.file_ids[slot])
+                lines.append(self.lines[slot])
+        extra = {}
+        if self.extra:
+            for option in options:
+                if option in self.extra:
+                    extra[option] = self.extra[option]
+        return file_ids, lines, extra
+
+    def unpack(self, options, file_ids, lines):
+        # The reverse of pack(), without the extra locations. An empty
+        # section is filled in directly; otherwise each location is set in
+        # turn so that history and the reverse index stay up to date.
+        store = self.store
+        if (self.slots or self.extra or store.history is not None or
+                store.reverse is not None):
+            names = self.files.names
+            for option, file_id, lineno in zip(options, file_ids, lines):
+                if file_id < 0:
+                    self.pop(option)
+                else:
+                    self[option] = names[file_id], lineno
+            return
+        keep = [pos for pos, file_id in enumerate(file_ids) if file_id >= 0]
+        if len(keep) < len(options):
+            options = [options[pos] for pos in keep]
+            file_ids = array('i', [file_ids[pos] for pos in keep])
+            lines = array('i', [lines[pos] for pos in keep])
+        self.slots = dict(zip(options, range(len(options))))
+        self.file_ids = array('i', file_ids)
+        self.lines = array('i', lines)
+        self.free = None
+
+
+class _LocationStore(_Slotted):
+    # Holds (filename, line_number) information for every tracked option,
+    # keyed by section and then by option, much like a defaultdict(dict).
+    # Filenames are interned once per store. A reverse index from file and
+    # line back to options is built the first time it's needed, and kept up
+    # to date from then on. If enabled, every location ever set is also
+    # appended to a history log.
+    __slots__ = ('files', 'sections', 'reverse', 'history', 'section_names',
+                 'option_names')
+
+    def __init__(self, history=False):
+        self.files = _NameTable()
+        self.sections = {}
+        self.reverse = None
+        self.section_names = _NameTable()
+        self.option_names = _NameTable()
+        self.history = _HistoryLog(self) if history else None
+
+    def __contains__(self, section):
+        return section in self.sections
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def __getitem__(self, section):
+        try:
+            return self.sections[section]
+        except KeyError:
+            locations = _SectionLocations(self, section)
+            self.sections[section] = locations
+            return locations
+
+    def __delitem__(self, section):
+        if self.pop(section) is None:
+            raise KeyError(section)
+
+    def get(self, section, default=None):
+        return self.sections.get(section, default)
+
+    def pop(self, section, default=None):
+        locations = self.sections.pop(section, None)
+        if locations is None:
+            return default
+        if self.reverse is not None:
+            for option, slot in locations.slots.items():
+                self.reverse.remove(locations.file_ids[slot],
+                                    locations.lines[slot], section, option)
+        return locations
+
+    def nbytes(self):
+        # Roughly the memory held by the store. Section and option names are
+        # left out, since the parser holds them anyway, but file names are
+        # counted.
+        size = (sys.getsizeof(self) + sys.getsizeof(self.sections) +
+                self.files.nbytes(strings=True) +
+                self.section_names.nbytes() + self.option_names.nbytes())
+        for locations in self.sections.values():
+            size += locations.nbytes()
+        if self.reverse is not None:
+            size += self.reverse.nbytes()
+        if self.history is not None:
+            size += self.history.nbytes()
+        return size
+
+    def reverse_index(self):
+        if self.reverse is None:
+            reverse = _ReverseIndex(self.section_names, self.option_names)
+            entries = []
+            for section, locations in self.sections.items():
+                for option, slot in locations.slots.items():
+                    entries.append((locations.file_ids[slot],
+                                    locations.lines[slot], section, option))
+            entries.sort(key=lambda entry: entry[:2])
+            for entry in entries:
+                reverse.add(*entry)
+            self.reverse = reverse
+        return self.reverse
+
+
+class _ReverseIndex(_Slotted):
+    # Maps a file back to the options defined in it. For each file id, keeps
+    # three parallel arrays sorted by line number: lines, section ids and
+    # option ids. Section and option names are interned.
+    __slots__ = ('by_file', 'sections', 'options')
+
+    def __init__(self, sections, options):
+        self.by_file = {}
+        self.sections = sections
+        self.options = options
+
+    def add(self, file_id, lineno, section, option):
+        columns = self.by_file.get(file_id)
+        if columns is None:
+            columns = self.by_file[file_id] = (array('i'), array('i'),
+                                               array('i'))
+        lines, section_ids, option_ids = columns
+        section_id = self.sections.intern(section)
+        option_id = self.options.intern(option)
+        if not lines or lines[-1] <= lineno:
+            lines.append(lineno)
+            section_ids.append(section_id)
+            option_ids.append(option_id)
+        else:
+            pos = bisect_right(lines, lineno)
+            lines.insert(pos, lineno)
+            section_ids.insert(pos, section_id)
+            option_ids.insert(pos, option_id)
+
+    def remove(self, file_id, lineno, section, option):
+        columns = self.by_file.get(file_id)
+        if columns is None:
+            return
+        lines, section_ids, option_ids = columns
+        section_id = self.sections.ids.get(section)
+        option_id = self.options.ids.get(option)
+        pos = bisect_left(lines, lineno)
+        while pos < len(lines) and lines[pos] == lineno:
+            if section_ids[pos] == section_id and option_ids[pos] == option_id:
+                del lines[pos]
+                del section_ids[pos]
+                del option_ids[pos]
+                return
+            pos += 1
+
+    def nbytes(self):
+        size = sys.getsizeof(self) + sys.getsizeof(self.by_file)
+        for columns in self.by_file.values():
+            size += sys.getsizeof(columns) + sum(sys.getsizeof(column)
+                                                 for column in columns)
+        return size
+
+    def _entry(self, columns, pos):
+        lines, section_ids, option_ids = columns
+        return (self.sections.names[section_ids[pos]],
+                self.options.names[option_ids[pos]], lines[pos])
+
+    def at(self, file_id, lineno):
+        # The last entry starting at or before lineno, or None
+        columns = self.by_file.get(file_id)
+        if columns is None:
+            return None
+        pos = bisect_right(columns[0], lineno)
+        if pos == 0:
+            return None
+        return self._entry(columns, pos - 1)
+
+    def between(self, file_id, first, last):
+        # All entries starting in first..last, inclusive
+        columns = self.by_file.get(file_id)
+        if columns is None:
+            return []
+        lines = columns[0]
+        return [self._entry(columns, pos)
+                for pos in range(bisect_left(lines, first),
+                                 bisect_right(lines, last))]
+
+
+class _HistoryLog(_Slotted):
+    # An append-only log of every location that was set, stored as parallel
+    # arrays of section id, option id, file id and line number. Locations
+    # that can't be packed are kept in `extra' and referenced by a file id of
+    # -1 with the line holding the index into `extra'. An index from option
+    # to log positions is built on the first query.
+    __slots__ = ('store', 'section_ids', 'option_ids', 'file_ids', 'lines',
+                 'extra', 'index')
+
+    def __init__(self, store):
+        self.store = store
+        self.section_ids = array('i')
+        self.option_ids = array('i')
+        self.file_ids = array('i')
+        self.lines = array('i')
+        self.extra = []
+        self.index = None
+
+    def __len__(self):
+        return len(self.lines)
+
+    def nbytes(self):
+        size = sys.getsizeof(self) + sum(
+            sys.getsizeof(column) for column in (self.section_ids,
+                                                 self.option_ids,
+                                                 self.file_ids, self.lines,
+                                                 self.extra))
+        if self.index is not None:
+            size += sys.getsizeof(self.index) + sum(
+                sys.getsizeof(positions) for positions in self.index.values())
+        return size
+
+    def append(self, section, option, file_id, lineno):
+        section_id = self.store.section_names.intern(section)
+        option_id = self.store.option_names.intern(option)
+        if self.index is not None:
+            key = section_id, option_id
+            self.index.setdefault(key, []).append(len(self.lines))
+        self.section_ids.append(section_id)
+        self.option_ids.append(option_id)
+        self.file_ids.append(file_id)
+        self.lines.append(lineno)
+
+    def append_extra(self, section, option, location):
+        self.extra.append(location)
+        self.append(section, option, -1, len(self.extra) - 1)
+
+    def get(self, section, option):
+        # Every location set for an option, oldest first
+        section_id = self.store.section_names.ids.get(section)
+        option_id = self.store.option_names.ids.get(option)
+        if section_id is None or option_id is None:
+            return []
+        if self.index is None:
+            index = {}
+            for pos, key in enumerate(zip(self.section_ids, self.option_ids)):
+                index.setdefault(key, []).append(pos)
+            self.index = index
+        names = self.store.files.names
+        result = []
+        for pos in self.index.get((section_id, option_id), ()):
+            file_id = self.file_ids[pos]
+            if file_id < 0:
+                result.append(self.extra[self.lines[pos]])
+            else:
+                result.append((names[file_id], self.lines[pos]))
+        return result
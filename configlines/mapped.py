@@ -0,0 +1,368 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+import six
+from six.moves import configparser
+
+
+# The layout of a mapped file, with all integers little-endian:
+#
+#   magic     _MAGIC
+#   header    _HEADER
+#   files     n_files * _FILE: the file names that locations refer to
+#   sections  n_sections * _SECTION, sorted by name, including the default
+#             section at default_index
+#   options   n_options * _OPTION, grouped by section and sorted by name
+#             within each. A section's options include those it inherits
+#             from the default section.
+#   strings   the UTF-8 text that everything else points into
+#
+# Strings are referred to by (absolute offset, byte length). A value length
+# of _NONE means the value is None, and an interpolated value length of
+# _FAILED means the value couldn't be interpolated when it was exported. A
+# file id of -1 means there is no location.
+_MAGIC = b'CFGLMAP\x01'
+_HEADER = struct.Struct('<9I')
+_FILE = struct.Struct('<2I')
+_SECTION = struct.Struct('<4I')
+_OPTION = struct.Struct('<6I2i')
+
+_NONE = 0xffffffff
+_FAILED = 0xfffffffe
+_FLAG_LOWER = 1
+
+_UNSET = object()
+
+# Interpolations that leave values without a given character unchanged, so
+# that get() needn't be called for them. None means every value.
+_MARKERS = dict((getattr(configparser, name), marker)
+                for name, marker in (('Interpolation', None),
+                                     ('BasicInterpolation', '%'),
+                                     ('ExtendedInterpolation', '$'))
+                if hasattr(configparser, name))
+
+
+class MappedConfig(object):
+    """A read-only configuration, attached to a file written by a parser's
+    export_mapped().
+
+    The file is mapped into memory rather than read, so attaching costs
+    about the same however large the configuration is, and every process
+    that attaches to the same file shares its pages. Nothing is decoded
+    until it is looked up.
+
+    get(), has_section(), has_option(), options() and get_location() work
+    like those of the exported parser, with values interpolated as they
+    were at the time, except that sections and options are listed in sorted
+    order. Option names go through the default optionxform() if the parser
+    used it, and are used as given otherwise, unless `optionxform' is passed.
+    """
+
+    def __init__(self, filename, optionxform=None):
+        with open(filename, 'rb') as fp:
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(_MAGIC)] != _MAGIC:
+            self._map.close()
+            raise ValueError('%r is not a configlines mapped file'
+                             % (filename,))
+        (flags, self._default_index, _, self._files_off, self._n_sections,
+         self._sections_off, _, self._options_off, _) = _HEADER.unpack_from(
+             self._map, len(_MAGIC))
+        if optionxform is None:
+            optionxform = _lower if flags & _FLAG_LOWER else _unchanged
+        self.optionxform = optionxform
+        self.filename = filename
+        self._filenames = {}
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def sections(self):
+        """Return the names of the sections, in sorted order."""
+
+        return [self._section_name(index)
+                for index in range(self._n_sections)
+                if index != self._default_index]
+
+    def has_section(self, section):
+        found = self._section(section)
+        return found is not None and found[0] != self._default_index
+
+    def options(self, section):
+        """Return the options of a section, including those it inherits
+        from the default section, in sorted order."""
+
+        found = self._section(section)
+        if found is None or found[0] == self._default_index:
+            raise configparser.NoSectionError(section)
+        _, first, count = found
+        return [self._text(*self._option_at(first + index)[:2])
+                for index in range(count)]
+
+    def has_option(self, section, option):
+        if not section:
+            section = self._section_name(self._default_index)
+        found = self._section(section)
+        return found is not None and self._option(found, option) is not None
+
+    def get(self, section, option, raw=False, fallback=_UNSET):
+        """Return the value of an option, interpolated unless `raw' is
+        true. Raises NoSectionError or NoOptionError if there is no such
+        option, unless `fallback' is given.
+        """
+
+        found = self._section(section)
+        entry = None if found is None else self._option(found, option)
+        if entry is None:
+            if fallback is not _UNSET:
+                return fallback
+            if found is None:
+                raise configparser.NoSectionError(section)
+            raise configparser.NoOptionError(option, section)
+        _, _, raw_off, raw_len, off, length, _, _ = entry
+        if raw:
+            off, length = raw_off, raw_len
+        elif length == _FAILED:
+            raise configparser.InterpolationError(
+                option, section, 'could not be interpolated when exported')
+        if length == _NONE:
+            return None
+        return self._text(off, length)
+
+    def get_location(self, section, option):
+        """Works like the parser's get_location()."""
+
+        found = self._section(section)
+        if found is None or found[0] == self._default_index:
+            raise configparser.NoSectionError(section)
+        entry = self._option(found, option)
+        if entry is None:
+            raise configparser.NoOptionError(option, section)
+        file_id, lineno = entry[6:]
+        if file_id < 0:
+            return None
+        filename = self._filenames.get(file_id)
+        if filename is None:
+            filename = self._filenames[file_id] = self._text(
+                *_FILE.unpack_from(self._map,
+                                   self._files_off + file_id * _FILE.size))
+        return filename, lineno
+
+    def _section_name(self, index):
+        off, length, _, _ = _SECTION.unpack_from(
+            self._map, self._sections_off + index * _SECTION.size)
+        return self._text(off, length)
+
+    def _text(self, off, length):
+        return self._map[off:off + length].decode('utf-8')
+
+    def _section(self, section):
+        # (index, first option, option count) of a section, or None. Names
+        # are compared as UTF-8, whose byte order is code point order.
+        key = section.encode('utf-8')
+        data = self._map
+        lo, hi = 0, self._n_sections
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off, length, first, count = _SECTION.unpack_from(
+                data, self._sections_off + mid * _SECTION.size)
+            name = data[off:off + length]
+            if name < key:
+                lo = mid + 1
+            elif name > key:
+                hi = mid
+            else:
+                return mid, first, count
+        return None
+
+    def _option(self, found, option):
+        # The _OPTION entry of an option of a section found by _section(),
+        # or None.
+        key = self.optionxform(option).encode('utf-8')
+        data = self._map
+        _, lo, hi = found
+        hi += lo
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._option_at(mid)
+            name = data[entry[0]:entry[0] + entry[1]]
+            if name < key:
+                lo = mid + 1
+            elif name > key:
+                hi = mid
+            else:
+                return entry
+        return None
+
+    def _option_at(self, index):
+        return _OPTION.unpack_from(self._map,
+                                   self._options_off + index * _OPTION.size)
+
+
+def _lower(optionstr):
+    return optionstr.lower()
+
+
+def _unchanged(optionstr):
+    return optionstr
+
+
+def _export(parser, filename):
+    # Writes `parser' to `filename' in the layout above. The file is written
+    # under a temporary name and renamed into place, so that processes
+    # attaching meanwhile see either the old contents or the new ones.
+    parser._resolve_lazy()
+    marker = _MARKERS.get(type(getattr(parser, '_interpolation', None)),
+                          _UNSET)
+    default_section = getattr(parser, 'default_section',
+                              configparser.DEFAULTSECT)
+    sections = []
+    for section in [default_section] + parser.sections():
+        if section == default_section:
+            options = parser._defaults
+            locations = dict((option, parser._layered_location(
+                configparser.DEFAULTSECT, option)) for option in options)
+        else:
+            options = parser._sections[section]
+            locations = parser.get_locations(section)
+        entries = []
+        for option, location in locations.items():
+            if option in options:
+                text = options[option]
+            else:
+                text = parser._defaults[option]
+            raw = _encoded(section, option, text)
+            if raw is None or marker is None or (
+                    marker is not _UNSET and marker not in text):
+                value = raw
+            else:
+                value = _interpolated(parser, section, option)
+            entries.append((option.encode('utf-8'), raw, value,
+                            _checked(section, option, location)))
+        entries.sort(key=lambda entry: entry[0])
+        sections.append((section.encode('utf-8'), entries))
+    sections.sort(key=lambda section: section[0])
+
+    strings = _Strings()
+    files = {}
+    n_options = sum(len(entries) for _, entries in sections)
+    files_off = len(_MAGIC) + _HEADER.size
+    for _, entries in sections:
+        for entry in entries:
+            if entry[3] is not None:
+                files.setdefault(entry[3][0], len(files))
+    sections_off = files_off + len(files) * _FILE.size
+    options_off = sections_off + len(sections) * _SECTION.size
+    strings.offset = options_off + n_options * _OPTION.size
+
+    flags = 0
+    if (type(parser).optionxform is
+            configparser.RawConfigParser.optionxform and
+            'optionxform' not in parser.__dict__):
+        flags |= _FLAG_LOWER
+    default_index = [name for name, _ in sections].index(
+        default_section.encode('utf-8'))
+    parts = [_MAGIC, _HEADER.pack(flags, default_index, len(files), files_off,
+                                  len(sections), sections_off, n_options,
+                                  options_off, strings.offset)]
+    for name in sorted(files, key=files.get):
+        parts.append(_FILE.pack(*strings.add(name.encode('utf-8'))))
+    first = 0
+    for name, entries in sections:
+        parts.append(_SECTION.pack(strings.add(name)[0], len(name), first,
+                                   len(entries)))
+        first += len(entries)
+    for _, entries in sections:
+        for option, raw, value, location in entries:
+            if location is None:
+                file_id, lineno = -1, 0
+            else:
+                file_id, lineno = files[location[0]], location[1]
+            parts.append(_OPTION.pack(*(strings.add(option) +
+                                        strings.ref(raw) + strings.ref(value) +
+                                        (file_id, lineno))))
+    parts.extend(strings.parts)
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp = tempfile.mkstemp(dir=directory, prefix='.configlines-')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(b''.join(parts))
+        getattr(os, 'replace', os.rename)(temp, filename)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def _encoded(section, option, value):
+    if value is None:
+        return None
+    if not isinstance(value, six.string_types):
+        raise ValueError('[%s] %s must be a string to be exported'
+                         % (section, option))
+    return value.encode('utf-8')
+
+
+def _interpolated(parser, section, option):
+    # The value that get() returns, encoded, or _FAILED.
+    try:
+        value = parser.get(section, option)
+    except configparser.Error:
+        return _FAILED
+    return _encoded(section, option, value)
+
+
+def _checked(section, option, location):
+    if location is not None:
+        filename, lineno = location
+        filename = _filename(filename)
+        if not isinstance(filename, six.string_types) or \
+                not isinstance(lineno, six.integer_types):
+            raise ValueError('the location of [%s] %s must be (filename, '
+                             'lineno) to be exported' % (section, option))
+        location = filename, lineno
+    return location
+
+
+def _filename(filename):
+    # Locations keep file names as they were passed to read(), which can be
+    # path-like objects or bytes. The file table holds text.
+    if hasattr(filename, '__fspath__'):
+        filename = os.fspath(filename)
+    if isinstance(filename, bytes):
+        filename = filename.decode(sys.getfilesystemencoding())
+    return filename
+
+
+class _Strings(object):
+    # The string table of a mapped file. Equal strings are stored once.
+
+    def __init__(self):
+        self.offset = 0
+        self.parts = []
+        self.known = {}
+
+    def add(self, data):
+        ref = self.known.get(data)
+        if ref is None:
+            ref = self.known[data] = (self.offset, len(data))
+            self.parts.append(data)
+            self.offset += len(data)
+        return ref
+
+    def ref(self, data):
+        # Like add(), but also takes None and _FAILED.
+        if data is None:
+            return 0, _NONE
+        if data is _FAILED:
+            return 0, _FAILED
+        return self.add(data)
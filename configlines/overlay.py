@@ -0,0 +1,188 @@
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+from six.moves import configparser
+
+
+_EMPTY = {}
+
+
+class _OverlayOptions(MutableMapping):
+    # The options of one section of an overlay parser: the overlay's own
+    # values on top of the base parser's, minus any that the overlay removed.
+    # The overlay's own dict is only created once something is written to it.
+    __slots__ = ('sections', 'name', 'own', 'removed', 'base_options')
+
+    def __init__(self, sections, name, own, base_options=None):
+        self.sections = sections
+        self.name = name
+        self.own = own
+        self.removed = None
+        self.base_options = base_options
+
+    @property
+    def base(self):
+        if self.sections is None:
+            return self.base_options
+        # The base may have dropped the section since
+        return self.sections.base.get(self.name, _EMPTY)
+
+    def owns(self, key):
+        return self.own is not None and key in self.own
+
+    def hides(self, key):
+        return bool(self.removed) and key in self.removed
+
+    def revert(self, key):
+        # Drops the overlay's own value, if any, without hiding the base's.
+        # Returns True if the base's value shows through.
+        if self.owns(key):
+            del self.own[key]
+        if self.removed:
+            self.removed.discard(key)
+        return key in self.base
+
+    def for_update(self, keys):
+        # The overlay's own dict, for storing `keys' directly.
+        if self.removed:
+            self.removed.difference_update(keys)
+        return self._own()
+
+    def _own(self):
+        if self.own is None:
+            self.own = self.sections.dict_type()
+            self.sections.own[self.name] = self.own
+        return self.own
+
+    def __getitem__(self, key):
+        own = self.own
+        if own is not None and key in own:
+            return own[key]
+        if self.removed and key in self.removed:
+            raise KeyError(key)
+        return self.base[key]
+
+    def __contains__(self, key):
+        if self.own is not None and key in self.own:
+            return True
+        if self.removed and key in self.removed:
+            return False
+        return key in self.base
+
+    def __setitem__(self, key, value):
+        self._own()[key] = value
+        if self.removed:
+            self.removed.discard(key)
+
+    def __delitem__(self, key):
+        base = self.base
+        if self.owns(key):
+            del self.own[key]
+        elif key not in base or self.hides(key):
+            raise KeyError(key)
+        if key in base:
+            if self.removed is None:
+                self.removed = set()
+            self.removed.add(key)
+
+    def __iter__(self):
+        base = self.base
+        removed = self.removed or ()
+        for key in list(base):
+            if key not in removed:
+                yield key
+        if self.own is not None:
+            for key in list(self.own):
+                if key not in base:
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self):
+        if self.sections is None:
+            dict_type = type(self.own)
+        else:
+            dict_type = self.sections.dict_type
+        options = dict_type.base()
+        options.update(self.items())
+        return options
+
+
+class _OverlaySections(MutableMapping):
+    # The sections of an overlay parser. Sections of the base parser are
+    # seen through _OverlayOptions views, which are created on first access.
+    # Sections that only exist in the overlay, or that the overlay removed
+    # and added again, are plain tracked dicts held in `own'.
+    __slots__ = ('own', 'base', 'dict_type', 'removed', 'views')
+
+    def __init__(self, own, base, dict_type):
+        self.own = own
+        self.base = base
+        self.dict_type = dict_type
+        self.removed = set()
+        self.views = {}
+
+    def _visible(self, name):
+        return name not in self.removed and name in self.base
+
+    def __getitem__(self, name):
+        if self._visible(name):
+            view = self.views.get(name)
+            if view is None:
+                view = self.views[name] = _OverlayOptions(
+                    self, name, self.own.get(name))
+            return view
+        return self.own[name]
+
+    def __contains__(self, name):
+        return name in self.own or self._visible(name)
+
+    def __setitem__(self, name, options):
+        if self._visible(name):
+            self.removed.add(name)
+            self.views.pop(name, None)
+        self.own[name] = options
+
+    def __delitem__(self, name):
+        visible = self._visible(name)
+        if name in self.own:
+            del self.own[name]
+        elif not visible:
+            raise KeyError(name)
+        if visible:
+            self.removed.add(name)
+            self.views.pop(name, None)
+
+    def __iter__(self):
+        visible = []
+        for name in list(self.base):
+            if name not in self.removed:
+                visible.append(name)
+                yield name
+        visible = set(visible)
+        for name in list(self.own):
+            if name not in visible:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class _SectionProxies(dict):
+    # Section proxies for an overlay parser, created when first needed so
+    # that the base's sections don't each need one up front.
+    __slots__ = ('parser',)
+
+    def __init__(self, parser, proxies):
+        dict.__init__(self, proxies)
+        self.parser = parser
+
+    def __missing__(self, name):
+        proxy = self[name] = configparser.SectionProxy(self.parser, name)
+        return proxy
+
+    def __delitem__(self, name):
+        self.pop(name, None)
@@ -1,21 +1,394 @@
-from collections import OrderedDict, defaultdict
+from array import array
+from collections import namedtuple
+import copy
+import functools
+import io
+import marshal
+import os
+import pickle
+import re
+import sys
+import weakref
+try:
+    from types import MappingProxyType
+except ImportError:
+    MappingProxyType = dict
 
 import six
 from six.moves import configparser
 
+from .cache import _at_start, _file_identity, _path_identity
+from .digest import _section_digest
+from .engine import _fast_engine_supported, _parse_lines
+from .interpolation import _InterpolationCache, _RecordingMap
+from .locations import _LocationStore
+from .mapped import _export as _export_mapped
+from .overlay import _OverlayOptions, _OverlaySections, _SectionProxies
+from .slots import _Slotted
+from .source import _SourceFiles, _mapped_file
+from .stats import _Stats, _install as _install_stats, \
+    _uninstall as _uninstall_stats
 
+if sys.version_info >= (3, 5):
+    from ._aio import _AsyncReadMixin
+else:
+    _AsyncReadMixin = object
 
-class _LineTrackingMixin(object):
+
+LocationChange = namedtuple('LocationChange',
+                            'section option old_location new_location')
+
+ConfigDifference = namedtuple('ConfigDifference',
+                              'section option value other_value location '
+                              'other_location')
+
+# Bump whenever the layout of snapshots changes.
+_SNAPSHOT_FORMAT = 1
+
+_EMPTY_LOCATIONS = {}
+
+# Interpolations that only look values up through the mapping and methods
+# that get() records, so that their results can be cached.
+_CACHED_INTERPOLATIONS = tuple(
+    getattr(configparser, name)
+    for name in ('BasicInterpolation', 'ExtendedInterpolation')
+    if hasattr(configparser, name))
+
+_MISSING = object()
+
+# The identity logged for a file that has been deleted since it was read, so
+# that reload_changed() still notices when it comes back. Not None, which
+# means that a source can't be checked at all.
+_DELETED = ()
+
+_PATTERN_TYPE = type(re.compile(''))
+
+
+def _bulk_update(dict_base):
+    # A function of (options, items) that stores items in an OptionWrapper
+    # for `dict_base' without going through the tracking hooks. dict.update()
+    # never calls a subclass's __setitem__(), but other update() methods,
+    # such as OrderedDict's, do.
+    if dict_base.update is dict.update:
+        return dict.update
+    setitem = dict_base.__setitem__
+
+    def update(options, items):
+        for key, value in items:
+            setitem(options, key, value)
+    return update
+
+
+def _wrapper_types(dict_base):
+    # Returns the (OptionWrapper, SectionWrapper) classes for a given dict
+    # type. These are created once per dict type and shared by every parser
+    # using it, so that constructing a parser doesn't create new classes.
+    try:
+        return _wrapper_cache[dict_base]
+    except KeyError:
+        pass
+
+    class OptionWrapper(dict_base):
+        # Tracks when options are added or removed, and adds or removes
+        # line information as appropriate.
+        __slots__ = ('sectname', 'parser_ref')
+        base = dict_base
+        bulk_update = staticmethod(_bulk_update(dict_base))
+
+        def __init__(self, *args, **kwargs):
+            self.sectname = None
+            self.parser_ref = None
+            dict_base.__init__(self, *args, **kwargs)
+
+        def __setitem__(self, key, value):
+            if self.parser_ref is not None:
+                parser = self.parser_ref()
+                if parser is not None:
+                    parser._track_set(self.sectname, key)
+            dict_base.__setitem__(self, key, value)
+
+        def __delitem__(self, key):
+            dict_base.__delitem__(self, key)
+            if self.parser_ref is not None:
+                parser = self.parser_ref()
+                if parser is not None:
+                    parser._track_remove(self.sectname, key)
+
+        def pop(self, key, *args, **kwargs):
+            val = dict_base.pop(self, key, *args, **kwargs)
+            if self.parser_ref is not None:
+                parser = self.parser_ref()
+                if parser is not None:
+                    parser._track_remove(self.sectname, key)
+            return val
+
+    class SectionWrapper(dict_base):
+        # OptionWrappers need to know their names and their parser. This
+        # wrapper class ensures that they get that information when they are
+        # added. Also removes line information when sections are removed
+        __slots__ = ('parser_ref',)
+
+        def __init__(self, *args, **kwargs):
+            self.parser_ref = None
+            dict_base.__init__(self, *args, **kwargs)
+
+        def __setitem__(self, key, value):
+            value.sectname = key
+            value.parser_ref = self.parser_ref
+            dict_base.__setitem__(self, key, value)
+
+        def __delitem__(self, key):
+            dict_base.__delitem__(self, key)
+            parser = self.parser_ref()
+            if parser is not None:
+                parser._track_remove_section(key)
+
+        def pop(self, key, *args, **kwargs):
+            val = dict_base.pop(self, key, *args, **kwargs)
+            parser = self.parser_ref()
+            if parser is not None:
+                parser._track_remove_section(key)
+            return val
+
+    types = _wrapper_cache[dict_base] = OptionWrapper, SectionWrapper
+    return types
+
+_wrapper_cache = weakref.WeakKeyDictionary()
+
+
+class _FpWrapper(object):
+    # A simple wrapper to track line numbers as files are read.
+    __slots__ = ('fp', 'parser')
+
+    def __init__(self, fp, parser):
+        self.fp = fp
+        self.parser = parser
+        parser._curr_lineno = None
+
+    def readline(self):
+        parser = self.parser
+        line = self.fp.readline()
+        if not line:
+            parser._curr_lineno = None
+        elif parser._curr_lineno is None:
+            parser._curr_lineno = 1
+        else:
+            parser._curr_lineno += 1
+        return line
+
+    def __iter__(self):
+        parser = self.parser
+        for line in self.fp:
+            if parser._curr_lineno is None:
+                parser._curr_lineno = 1
+            else:
+                parser._curr_lineno += 1
+            yield line
+        parser._curr_lineno = None
+
+
+def _make_parser(parser_cls, init_cls, args, kwargs, attrs=(), cache=None):
+    # Creates a parser of class `parser_cls', initialized by the configlines
+    # class `init_cls', bypassing any __init__ defined by subclasses. `attrs'
+    # are (name, value) pairs of instance attributes to set afterwards.
+    parser = parser_cls.__new__(parser_cls)
+    init_cls.__init__(parser, *args, **kwargs)
+    for name, value in attrs:
+        setattr(parser, name, value)
+    parser._cache = cache
+    return parser
+
+
+def _inherit_attrs(parser, source):
+    # Gives `parser', which _make_parser() created without running the
+    # __init__ of a subclass, the public instance attributes that such an
+    # __init__ (or the user) set on `source'. Private ones are left alone,
+    # as are those that configlines or configparser set themselves.
+    for name, value in source.__dict__.items():
+        if not name.startswith('_') and name not in parser.__dict__:
+            setattr(parser, name, value)
+
+
+# Attributes that change how files are parsed, and that configparser lets
+# users override on an instance, e.g., `cfg.optionxform = str'.
+_PARSE_ATTRS = ('optionxform', 'SECTCRE', 'OPTCRE')
+
+
+def _callable_fingerprint(func):
+    # Something that tells a callable apart from others, and stays the same
+    # from one process to the next, or None if there is no such thing (e.g.,
+    # for lambdas and closures).
+    if isinstance(func, functools.partial):
+        inner = _callable_fingerprint(func.func)
+        if inner is None:
+            return None
+        return (inner, repr(func.args),
+                repr(sorted((func.keywords or {}).items())))
+    func = getattr(func, '__func__', func)
+    name = getattr(func, '__qualname__', getattr(func, '__name__', None))
+    if not isinstance(name, six.string_types) or '<' in name:
+        return None
+    code = getattr(func, '__code__', None)
+    if code is not None:
+        code = code.co_code, repr(code.co_consts), code.co_names
+    return getattr(func, '__module__', None), name, code
+
+
+def _parse_file(spec, filename, encoding):
+    # Parses a file into a fragment, in a parser made from `spec'. Returns
+    # (fragment, log entry), or None if the file can't be opened.
+    try:
+        if encoding is None:
+            fp = open(filename)
+        else:
+            fp = io.open(filename, encoding=encoding)
+    except EnvironmentError:
+        return None
+    with fp:
+        return _parse_stream(spec, fp, filename)
+
+
+def _parse_stream(spec, fp, source):
+    # Like _parse_file(), for an open file or a string.
+    if isinstance(fp, six.string_types):
+        fp = six.StringIO(fp)
+    parser = _make_parser(*spec)
+    parser._read(fp, source)
+    return parser._export_fragment(), parser._read_log[-1]
+
+
+def _parse_files(spec, filenames, encoding):
+    # Parses files into fragments. Runs in worker threads or processes for
+    # read(..., workers=N). Returns one entry per file: a (fragment, log
+    # entry) tuple, None if the file can't be opened, or _PARSE_FAILED.
+    results = []
+    for filename in filenames:
+        try:
+            results.append(_parse_file(spec, filename, encoding))
+        except Exception:
+            results.append(_PARSE_FAILED)
+    return results
+
+_PARSE_FAILED = 'failed'
+
+
+def _shippable(spec, executor):
+    # Whether `spec' can be sent to `executor', or to a new process pool if
+    # it is None. Threads can be sent anything.
+    if executor is not None:
+        from concurrent.futures import ProcessPoolExecutor
+        if not isinstance(executor, ProcessPoolExecutor):
+            return True
+    try:
+        pickle.dumps(spec, -1)
+    except Exception:
+        return False
+    return True
+
+
+def _array_bytes(values):
+    return values.tobytes() if hasattr(values, 'tobytes') else \
+        values.tostring()
+
+
+def _bytes_array(data):
+    values = array('i')
+    if hasattr(values, 'frombytes'):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    return values
+
+
+def _location_file(location):
+    # The file name of a location, or None
+    try:
+        filename, _ = location
+    except (TypeError, ValueError):
+        return None
+    return filename
+
+
+class _RecordingFpWrapper(_FpWrapper):
+    # Also keeps the lines that were read, for get_source().
+    __slots__ = ('lines',)
+
+    def __init__(self, fp, parser):
+        _FpWrapper.__init__(self, fp, parser)
+        self.lines = []
+
+    def readline(self):
+        line = _FpWrapper.readline(self)
+        if line:
+            self.lines.append(line)
+        return line
+
+    def __iter__(self):
+        append = self.lines.append
+        for line in _FpWrapper.__iter__(self):
+            append(line)
+            yield line
+
+
+class _LazyLocations(_Slotted):
+    # Bookkeeping for track_locations='lazy'. Nothing is tracked while files
+    # are read; locations are worked out from the read log when first needed.
+    # `resolved' counts the files that have been scanned so far. Changes made
+    # since then are queued in `events' as (epoch, section, option, location)
+    # tuples, where epoch is the number of files read before the change and
+    # option is None if the whole section was removed. `saved' holds the
+    # contents of sources that can't be opened again by name, either as text
+    # or as an already parsed fragment, by position in the read log.
+    __slots__ = ('resolved', 'events', 'saved')
+
+    def __init__(self):
+        self.resolved = 0
+        self.events = []
+        self.saved = {}
+
+
+class _LineTrackingMixin(_AsyncReadMixin):
     # This is an internal class that patches in line tracking functionality
     # to objects derived from RawConfigParser.
     # Note: No docstring so that we don't accidentally mess up derived
     # classes' docstrings.
 
-    def __init__(self):
+    _fp_wrapper = _FpWrapper
+
+    # Constructor keyword arguments handled here rather than by configparser
+    _TRACKING_OPTIONS = ('cache', 'source_cache', 'track_history',
+                         'track_locations', 'engine')
+
+    def __init__(self, cache=None, source_cache=None, track_history=False,
+                 track_locations=True, engine='configparser'):
         # We'll call constructors explicitly to ensure that this happens after
         # the main base class.
 
-        self._option_lines = defaultdict(dict)
+        if track_locations not in (True, 'lazy'):
+            raise ValueError("track_locations must be True or 'lazy'")
+        if engine not in ('configparser', 'fast'):
+            raise ValueError("engine must be 'configparser' or 'fast'")
+        if track_locations == 'lazy' and track_history:
+            raise ValueError("track_history can't be used with "
+                             "track_locations='lazy'")
+
+        self._option_lines = _LocationStore(history=track_history)
+        self._cache = cache
+
+        # With engine='fast', files are parsed by _parse_lines() and stored
+        # in bulk, if the parser is one that it can stand in for.
+        self._engine = engine
+        self._fast = engine == 'fast' and _fast_engine_supported(self)
+
+        # Every file read so far, in order, as (fpname, identity, encoding)
+        # tuples. identity is None if the source can't be stat'ed by name.
+        self._read_log = []
+
+        # Source text for get_source(). If requested, the text of files is
+        # captured while they are read.
+        self._sources = _SourceFiles(source_cache or 1)
+        if source_cache and track_locations is True:
+            self._fp_wrapper = _RecordingFpWrapper
 
         # State:
         # lineno = None, reading_file = None    => not reading
@@ -24,113 +397,1053 @@ class _LineTrackingMixin(object):
         self._curr_lineno = None
         self._curr_filename = None
 
-        # Use self._dict as the base class in case the user used something
-        # custom. Hold on to a reference though, because it may change
-
-        dict_base = self._dict
-        class OptionWrapper(self._dict):
-            # Tracks when options are added or removed, and adds or removes
-            # line information as appropriate.
-
-            def __init__(inner, *args, **kwargs):
-                inner.sectname = None
-                dict_base.__init__(inner, *args, **kwargs)
-
-            def __setitem__(inner, key, value):
-                sectname = inner.sectname
-                if sectname is not None:
-                    if self._curr_lineno is not None:
-                        location = self._curr_filename, self._curr_lineno
-                        self._option_lines[sectname][key] = location
-                    elif self._curr_filename is None and sectname is not None:
-                        self._option_lines[sectname].pop(key, None)
-                dict_base.__setitem__(inner, key, value)
-
-            def __delitem__(inner, key):
-                dict_base.__delitem__(inner, key)
-                if inner.sectname is not None:
-                    self._option_lines[inner.sectname].pop(key, None)
-
-            def pop(inner, key, *args, **kwargs):
-                val = dict_base.pop(inner, key, *args, **kwargs)
-                if inner.sectname is not None:
-                    self._option_lines[inner.sectname].pop(key, None)
-                return val
-
-        class SectionWrapper(self._dict):
-            # OptionWrappers need to know their names. This wrapper class
-            # ensures that they get that information when they are added.
-            # Also removes line information when sections are removed
-            def __setitem__(inner, key, value):
-                value.sectname = key
-                dict_base.__setitem__(inner, key, value)
-
-            def __delitem__(inner, key):
-                dict_base.__delitem__(inner, key)
-                del self._option_lines[key]
-
-            def pop(inner, key, *args, **kwargs):
-                val = dict_base.pop(inner, key, *args, **kwargs)
-                self._option_lines.pop(key, None)
-                return val
-
-        class FpWrapper(object):
-            # A simple wrapper to track line numbers as files are read.
-            def __init__(inner, fp):
-                inner.fp = fp
-                self._curr_lineno = None
+        # In lazy mode, sections are left as they are so that reading costs
+        # nothing extra.
+        self._lazy = None
+        self._base = None
 
-            def readline(inner):
-                line = inner.fp.readline()
-                if not line:
-                    self._curr_lineno = None
-                elif self._curr_lineno is None:
-                    self._curr_lineno = 1
-                else:
-                    self._curr_lineno += 1
-                return line
-            
-            def __iter__(inner):
-                for line in inner.fp:
-                    if self._curr_lineno is None:
-                        self._curr_lineno = 1
-                    else:
-                        self._curr_lineno += 1
-                    yield line
-                self._curr_lineno = None
-        self._fp_wrapper = FpWrapper
+        # Read-only option -> location mappings returned by get_locations(),
+        # by section. Dropped whenever the section, or DEFAULT, changes.
+        self._location_views = {}
+
+        # section_digests() of each section, until the section changes.
+        self._digests = {}
+
+        # Results of get() with interpolation, if the interpolation is one
+        # whose lookups can all be recorded, and the recorders of the get()
+        # calls in progress.
+        self._interpolated = None
+        if type(getattr(self, '_interpolation', None)) in \
+                _CACHED_INTERPOLATIONS:
+            self._interpolated = _InterpolationCache()
+        self._recording = []
 
+        # Counters for stats(), once enable_stats() has been called.
+        self._stats = None
+
+        if track_locations == 'lazy':
+            self._lazy = _LazyLocations()
+        else:
+            self._wrap_sections()
+        self._hide_location_getters()
+
+    def _hide_location_getters(self):
+        # The converter mapping treats every get*() method as a converter,
+        # including get_location() and friends. They aren't, so don't let
+        # section proxies wrap them.
+        converters = getattr(self, '_converters', None)
+        if converters is not None:
+            for name in list(converters):
+                if hasattr(_LineTrackingMixin, 'get' + name):
+                    del converters[name]
+
+    def _wrap_sections(self):
+        # Use self._dict as the base class in case the user used something
+        # custom. The wrappers only hold a weak reference to the parser so
+        # that dropping a parser doesn't leave a reference cycle behind.
+        OptionWrapper, SectionWrapper = _wrapper_types(self._dict)
+        parser_ref = weakref.ref(self)
+
+        sections = self._sections
         self._dict = OptionWrapper
         self._sections = SectionWrapper()
+        self._sections.parser_ref = parser_ref
+        for name, options in sections.items():
+            self._sections[name] = OptionWrapper(options)
         self._defaults = OptionWrapper(self._defaults)
         self._defaults.sectname = configparser.DEFAULTSECT
+        self._defaults.parser_ref = parser_ref
+
+    def __getstate__(self):
+        # Sections are stored as plain dicts, since the wrappers refer back
+        # to the parser through weak references. Section proxies and
+        # converters are bound to the parser, so only the converter functions
+        # themselves are kept and the rest is recreated by __setstate__().
+        # Overlays are stored as standalone parsers.
+        if self._base is not None:
+            return self._flattened().__getstate__()
+        state = self.__dict__.copy()
+        state.pop('_async_tail', None)
+        _uninstall_stats(state)
+        state['_stats'] = None
+        state['_location_views'] = {}
+        state['_digests'] = dict(self._digests)
+        state['_recording'] = []
+        if self._interpolated is not None:
+            state['_interpolated'] = _InterpolationCache()
+        dict_type = self._dict.base if self._lazy is None else self._dict
+        sections = dict_type()
+        for name, options in self._sections.items():
+            sections[name] = dict_type(options)
+        state['_dict'] = dict_type
+        state['_sections'] = sections
+        state['_defaults'] = dict_type(self._defaults)
+        converters = state.pop('_converters', None)
+        if converters is not None:
+            del state['_proxies']
+            custom = dict((name, func) for name, func in converters.items()
+                          if func is not None)
+            for name in custom:
+                state.pop('get' + name, None)
+            state['_converters'] = custom
+        return state
+
+    def __setstate__(self, state):
+        state = dict(state)
+        converters = state.pop('_converters', None)
+        self.__dict__.update(state)
+        if self._lazy is None:
+            self._wrap_sections()
+        if converters is not None:
+            self._proxies = state['_dict']()
+            self._converters = configparser.ConverterMapping(self)
+            for name in [self.default_section] + list(self._sections):
+                self._proxies[name] = configparser.SectionProxy(self, name)
+            self._hide_location_getters()
+            for name, func in converters.items():
+                self._converters[name] = func
+
+    def __copy__(self):
+        # Values are shared, but everything that can change is copied so
+        # that the two parsers are independent.
+        if self._base is not None:
+            return self._flattened()
+        state = self.__getstate__()
+        state['_option_lines'] = copy.deepcopy(self._option_lines)
+        state['_read_log'] = list(self._read_log)
+        state['_lazy'] = copy.deepcopy(self._lazy)
+        clone = type(self).__new__(type(self))
+        clone.__setstate__(state)
+        return clone
+
+    def __deepcopy__(self, memo):
+        # Compiled patterns are shared rather than copied. They can't be
+        # changed, and can't be deep-copied before Python 3.7.
+        state = self.__getstate__()
+        for value in state.values():
+            if isinstance(value, _PATTERN_TYPE):
+                memo[id(value)] = value
+        clone = type(self).__new__(type(self))
+        memo[id(self)] = clone
+        clone.__setstate__(copy.deepcopy(state, memo))
+        return clone
+
+    def snapshot(self):
+        """Return the sections, values and locations of this parser as a
+        compact byte string, which load_snapshot() can restore.
+
+        Snapshots are meant for handing a parsed configuration to other
+        processes on the same machine, such as worker processes, rather than
+        for long-term storage. Values and locations must be types that the
+        marshal module supports.
+        """
+
+        if self._base is not None:
+            return self._flattened().snapshot()
+        self._resolve_lazy()
+        store = self._option_lines
+        blocks = [(None, configparser.DEFAULTSECT, self._defaults)]
+        blocks.extend((name, name, options)
+                      for name, options in self._sections.items())
+        # Equal names and values are made the same object, so that marshal
+        # writes them once and refers back to them afterwards.
+        shared = {}
+        share = shared.setdefault
+        packed = []
+        for name, sectname, options in blocks:
+            names = tuple([share(option, option) for option in options])
+            locations = store.get(sectname)
+            if locations is None:
+                file_ids = array('i', [-1]) * len(names)
+                lines = array('i', [0]) * len(names)
+                extra = {}
+            else:
+                file_ids, lines, extra = locations.pack(names)
+            values = tuple([share(value, value)
+                            if isinstance(value, six.string_types) else value
+                            for value in options.values()])
+            packed.append((name, names, values,
+                           _array_bytes(file_ids), _array_bytes(lines), extra))
+        return marshal.dumps((_SNAPSHOT_FORMAT, tuple(store.files.names),
+                              tuple(self._read_log), tuple(packed)))
+
+    def export_mapped(self, filename):
+        """Write the sections, values and locations of this parser to
+        `filename', in a form that MappedConfig can attach to.
+
+        Values are stored both raw and as get() returns them, so that
+        MappedConfig needs no parser to look them up. They must be strings or
+        None. File names in locations are stored as text, even if they were
+        read from path-like objects or bytes. The file is replaced in one
+        step, so processes attaching to it meanwhile never see a partly
+        written file.
+        """
+
+        _export_mapped(self, filename)
+
+    def load_snapshot(self, data):
+        """Apply a snapshot made by snapshot(), as if the files it was made
+        from had just been read. Raises ValueError if `data' isn't a
+        snapshot that this version can load.
+        """
+
+        try:
+            version, files, read_log, blocks = marshal.loads(data)
+        except (EOFError, TypeError, ValueError):
+            version = None
+        if version != _SNAPSHOT_FORMAT:
+            raise ValueError('not a configlines snapshot')
+
+        self._resolve_lazy()
+        store = self._option_lines
+        file_map = array('i', [store.files.intern(name) for name in files])
+        remap = file_map != array('i', range(len(files)))
+        if self._lazy is None:
+            update = self._dict.bulk_update
+        else:
+            update = self._dict.update
+
+        for name, names, values, file_ids, lines, extra in blocks:
+            if name is None:
+                options = self._defaults
+                sectname = configparser.DEFAULTSECT
+            else:
+                options = self._sections.get(name)
+                if options is None:
+                    options = self._new_section(name)
+                sectname = name
+            if isinstance(options, _OverlayOptions):
+                options = options.for_update(names)
+            # Values are stored directly, and locations in bulk
+            update(options, zip(names, values))
+            file_ids = _bytes_array(file_ids)
+            if remap:
+                file_ids = array('i', [file_map[file_id] if file_id >= 0
+                                       else -1 for file_id in file_ids])
+            locations = store[sectname]
+            locations.unpack(names, file_ids, _bytes_array(lines))
+            for option, location in extra.items():
+                locations[option] = location
+
+        self._read_log.extend(read_log)
+        if self._lazy is not None:
+            self._lazy.resolved = len(self._read_log)
+        self._forget_views()
+        if self._interpolated:
+            self._interpolated.forget()
+
+    @classmethod
+    def _tracking_options(cls, kwargs):
+        # Remove our own keyword arguments from `kwargs' and return them.
+        return dict((name, kwargs.pop(name)) for name in cls._TRACKING_OPTIONS
+                    if name in kwargs)
+
+    def _track_set(self, sectname, key):
+        # Called before an option is stored in a tracked section.
+        if self._location_views or self._digests:
+            self._forget_views(sectname)
+        if self._interpolated:
+            self._interpolated.forget(sectname, key)
+        if self._curr_lineno is not None:
+            location = self._curr_filename, self._curr_lineno
+            self._option_lines[sectname][key] = location
+        elif self._curr_filename is None:
+            self._option_lines[sectname].pop(key, None)
+
+    def _track_remove(self, sectname, key):
+        # Called after an option is removed from a tracked section.
+        self._option_lines[sectname].pop(key, None)
+        if self._location_views or self._digests:
+            self._forget_views(sectname)
+        if self._interpolated:
+            self._interpolated.forget(sectname, key)
+
+    def _track_remove_section(self, sectname):
+        # Called after a section is removed.
+        self._option_lines.pop(sectname, None)
+        if self._location_views or self._digests:
+            self._forget_views(sectname)
+        if self._interpolated:
+            self._interpolated.forget(sectname)
+
+    def _forget_views(self, sectname=None):
+        # Drops the get_locations() views and section digests that may be out
+        # of date after a change to `sectname', or to any section if None.
+        if sectname is None:
+            self._location_views.clear()
+            self._digests.clear()
+            return
+        self._digests.pop(sectname, None)
+        if sectname == configparser.DEFAULTSECT:
+            self._location_views.clear()
+        else:
+            self._location_views.pop(sectname, None)
 
     def _read(self, fp, fpname):
+        self._forget_views()
+        if self._lazy is not None and self._interpolated:
+            # Nothing tells us which values change in lazy mode
+            self._interpolated.forget()
+        # Sources that can't be read again by name from the start, to get
+        # what is about to be read, have no identity
+        identity = _file_identity(fp)
+        if identity is not None and (_path_identity(fpname) != identity or
+                                     not _at_start(fp)):
+            identity = None
+        self._read_log.append((fpname, identity, getattr(fp, 'encoding', None)))
+
+        if self._lazy is not None and identity is None:
+            # Keep a copy of anything we won't be able to read again
+            text = fp.read()
+            self._lazy.saved[len(self._read_log) - 1] = text
+            fp = six.StringIO(text)
+
+        fingerprint = None
+        if self._cache is not None:
+            fingerprint = self._parse_fingerprint()
+        if fingerprint is not None:
+            key = self._cache.key(fp, fpname, fingerprint)
+            if key is not None:
+                fragment = self._cache.load(key)
+                if fragment is None:
+                    fragment = self._parse_fragment(fp, fpname)
+                    self._cache.store(key, fragment)
+                self._apply_fragment(fragment, fpname)
+                return
+
+        if self._fast:
+            self._read_fast(fp, fpname, identity)
+            return
+
+        if self._lazy is not None:
+            super(_LineTrackingMixin, self)._read(fp, fpname)
+            return
+
         self._curr_filename = fpname
-        fp = self._fp_wrapper(fp)
+        fp = self._fp_wrapper(fp, self)
         try:
             super(_LineTrackingMixin, self)._read(fp, fpname)
         finally:
             self._curr_filename = None
             self._curr_lineno = None
+        lines = getattr(fp, 'lines', None)
+        if lines is not None and identity is not None:
+            self._sources.add(fpname, identity, self._read_log[-1][2], lines)
+
+    def _read_fast(self, fp, fpname, identity):
+        # _read() for engine='fast'
+        lines = None
+        if (self._lazy is None and
+                issubclass(self._fp_wrapper, _RecordingFpWrapper)):
+            fp = lines = list(fp)
+        fragment, error = _parse_lines(self, fp, fpname)
+        self._store_fragment(fragment, fpname)
+        if error is not None:
+            raise error
+        if lines is not None and identity is not None:
+            self._sources.add(fpname, identity, self._read_log[-1][2], lines)
+
+    def read(self, filenames, encoding=None, workers=None, executor=None):
+        """Works like read() as documented in the configparser module, with
+        the following optional arguments:
+
+        If `workers' is given, files are parsed concurrently by a pool of that
+        many worker processes. Alternatively, any concurrent.futures executor
+        may be passed as `executor'. Either way, the results are merged in
+        the order given, so later files override earlier ones and location
+        information is the same as for a sequential read.
+
+        Worker processes receive the parser's class and constructor
+        arguments, and any optionxform() set on the instance. If those can't
+        be pickled, files are read sequentially instead. Files that fail in a
+        worker are read again sequentially.
+        """
+
+        spec = None
+        if workers is not None or executor is not None:
+            spec = self._fragment_spec() + (self._cache,)
+        if spec is None or not _shippable(spec, executor):
+            args = (filenames,) if encoding is None else (filenames, encoding)
+            return super(_LineTrackingMixin, self).read(*args)
+
+        if (isinstance(filenames, (six.string_types, bytes)) or
+                hasattr(filenames, '__fspath__')):
+            filenames = [filenames]
+        filenames = list(filenames)
+
+        own_executor = executor is None
+        if own_executor:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(workers)
+        try:
+            # Hand out a few batches per worker to keep the overhead of
+            # shipping arguments and results down.
+            batch = max(1, len(filenames) // (4 * (workers or 4)))
+            futures = [executor.submit(_parse_files, spec,
+                                       filenames[i:i + batch], encoding)
+                       for i in range(0, len(filenames), batch)]
+
+            read_ok = []
+            for i, future in enumerate(futures):
+                batch_names = filenames[i * batch:(i + 1) * batch]
+                try:
+                    fragments = future.result()
+                except Exception:
+                    fragments = [_PARSE_FAILED] * len(batch_names)
+                for filename, result in zip(batch_names, fragments):
+                    if result is None:
+                        continue
+                    elif result == _PARSE_FAILED:
+                        # Let a sequential read raise the error, if there is
+                        # one, with the same partial results.
+                        args = ([filename],)
+                        if encoding is not None:
+                            args += (encoding,)
+                        read_ok.extend(
+                            super(_LineTrackingMixin, self).read(*args))
+                        continue
+                    fragment, (_, identity, file_encoding) = result
+                    self._install_fragment(
+                        fragment, (filename, identity, file_encoding))
+                    if hasattr(filename, '__fspath__'):
+                        filename = os.fspath(filename)
+                    read_ok.append(filename)
+            return read_ok
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+    def reload_changed(self):
+        """Re-read every previously read file that has changed on disk.
+
+        Only the changed files are parsed again. Options they contributed are
+        replaced or removed; if a removed option was shadowed by an earlier
+        file, the earlier value is restored. Options set programmatically are
+        left alone. Files that have been deleted count as empty, and are
+        read again if they come back. Sections left without options are
+        removed, unless a file still has a header for them.
+
+        Returns a list of LocationChange(section, option, old_location,
+        new_location) tuples, one for each option whose value or location
+        changed. Locations are None for options that were added or removed.
+
+        Not available with track_locations='lazy', since the original contents
+        of changed files are needed to tell what they contributed.
+        """
+
+        if self._lazy is not None:
+            raise ValueError("reload_changed() can't be used with "
+                             "track_locations='lazy'")
+
+        changed = {}
+        for fpname, identity, encoding in self._read_log:
+            if identity is not None:
+                current = _path_identity(fpname)
+                if current is None:
+                    current = _DELETED
+                if current != identity:
+                    changed[fpname] = encoding
+        if not changed:
+            return []
+
+        # Parse everything up front, so that a file with errors leaves the
+        # parser untouched.
+        fragments = {}
+        for fpname, encoding in changed.items():
+            fragments[fpname] = self._reparse(fpname, encoding)
+        encodings = dict((log[0], log[2]) for log in self._read_log)
+
+        parsed = dict(fragments)
+        def fragment(fpname):
+            # The current contents of a file, as a fragment, or None if it
+            # can't be read.
+            if fpname not in parsed:
+                parsed[fpname] = self._reparse(fpname, encodings[fpname])
+            entry = parsed[fpname]
+            return None if entry is None else entry[0]
+
+        definitions = {}
+        def defined(fpname):
+            # {(section, option): (value, lineno)} for the current contents
+            # of a file, or None if that can't be determined.
+            if fpname not in definitions:
+                entry = fragment(fpname)
+                result = None
+                if entry is not None:
+                    result = {}
+                    for name, names, values, lines in entry:
+                        if name is None:
+                            name = configparser.DEFAULTSECT
+                        for option, value, lineno in zip(names, values,
+                                                         lines):
+                            # Python 2 keeps every section's name as
+                            # __name__, which no file defines
+                            if option != '__name__':
+                                result[name, option] = value, lineno
+                definitions[fpname] = result
+            return definitions[fpname]
+
+        positions = [log[0] for log in self._read_log]
+        last_position = dict((fpname, i) for i, fpname in enumerate(positions))
+
+        # Options that need to be resolved again: those that currently come
+        # from a changed file, and those that changed files now define.
+        affected = []
+        seen = set()
+        # Options are visited in the order of their sections, rather than of
+        # the location store, whose order isn't kept on Python 2.
+        for section in [configparser.DEFAULTSECT] + list(self._sections):
+            locations = self._option_lines.get(section)
+            if not locations:
+                continue
+            if section == configparser.DEFAULTSECT:
+                options = self._defaults
+            else:
+                options = self._sections[section]
+            for option in options:
+                if _location_file(locations.get(option)) in changed:
+                    affected.append((section, option))
+                    seen.add((section, option))
+        for fpname in positions:
+            if fpname in changed:
+                found = defined(fpname) or {}
+                for key in sorted(found, key=lambda key: found[key][1]):
+                    if key not in seen:
+                        affected.append(key)
+                        seen.add(key)
+
+        # Sections that appear in changed files are created in file order
+        for fpname in positions:
+            entry = fragments.get(fpname)
+            if entry is not None:
+                for name, _, _, _ in entry[0]:
+                    if name is not None and name not in self._sections:
+                        self._new_section(name)
+
+        changes = []
+        emptied = set()
+        for section, option in affected:
+            if section == configparser.DEFAULTSECT:
+                options = self._defaults
+            else:
+                options = self._sections.get(section)
+                if options is None:
+                    continue
+            old_location = self._option_lines[section].get(option)
+            present = option in options
+            if (present and isinstance(options, _OverlayOptions) and
+                    not options.owns(option)):
+                # The value comes from the base of an overlay
+                present = False
+            current = _location_file(old_location)
+            if present and current not in last_position:
+                # Set programmatically, or from somewhere we can't reload
+                continue
+
+            winner = None
+            for i in range(len(positions) - 1, -1, -1):
+                fpname = positions[i]
+                if fpname in changed:
+                    found = (defined(fpname) or {}).get((section, option))
+                    if found is not None:
+                        winner = fpname, found
+                        break
+                elif not present or i > last_position[current]:
+                    # These didn't define the option, or it would have come
+                    # from them.
+                    continue
+                elif fpname == current:
+                    winner = fpname, (options[option], old_location[1])
+                    break
+                else:
+                    found = (defined(fpname) or {}).get((section, option))
+                    if found is not None:
+                        winner = fpname, found
+                        break
+
+            old_value = options.get(option) if present else None
+            if winner is None:
+                if present:
+                    # In an overlay, the base's value shows through again
+                    if (isinstance(options, _OverlayOptions) and
+                            options.revert(option)):
+                        new_location = self._layered_location(section, option)
+                    else:
+                        del options[option]
+                        new_location = None
+                        emptied.add(section)
+                    changes.append(LocationChange(section, option,
+                                                  old_location, new_location))
+                continue
+
+            fpname, (value, lineno) = winner
+            new_location = (fpname, lineno)
+            if present and old_value == value and old_location == new_location:
+                continue
+            self._curr_filename = fpname
+            self._curr_lineno = lineno
+            try:
+                options[option] = value
+            finally:
+                self._curr_filename = None
+                self._curr_lineno = None
+            changes.append(LocationChange(
+                section, option, old_location if present else None,
+                self._option_lines[section].get(option)))
+
+        # Sections that only existed for options that are gone now, as they
+        # wouldn't exist after reading the files afresh
+        emptied.discard(configparser.DEFAULTSECT)
+        emptied = [section for section in emptied
+                   if section in self._sections and
+                   not any(option != '__name__'
+                           for option in self._sections[section])]
+        if emptied:
+            declared = set()
+            for fpname in set(positions):
+                declared.update(name for name, _, _, _ in fragment(fpname) or ()
+                                if name is not None)
+            for section in emptied:
+                if section not in declared:
+                    self.remove_section(section)
+
+        # Remember the new state of the files
+        for fpname in changed:
+            self._sources.forget(fpname)
+        log = []
+        for fpname, identity, encoding in self._read_log:
+            if fpname in changed:
+                entry = fragments[fpname]
+                identity = _DELETED if entry is None else entry[1]
+            log.append((fpname, identity, encoding))
+        self._read_log = log
+        self._forget_views()
+        if self._interpolated:
+            self._interpolated.forget()
+        return changes
+
+    def _reparse(self, fpname, encoding):
+        # Parses a file by name into a fragment. Returns (fragment,
+        # identity), or None if the file can't be opened. The file is parsed
+        # with the same settings, including optionxform(), as the first time.
+        parser = _make_parser(*self._fragment_spec() + (self._cache,))
+        try:
+            if encoding is None:
+                fp = open(fpname)
+            else:
+                fp = io.open(fpname, encoding=encoding)
+        except EnvironmentError:
+            return None
+        with fp:
+            parser._read(fp, fpname)
+        return parser._export_fragment(), parser._read_log[-1][1]
+
+    def _parse_fingerprint(self):
+        # Everything about this parser that affects how a file is parsed.
+        # Used to make sure that cached results are only reused by parsers
+        # that would have produced the same results. None if this parser's
+        # optionxform() can't be told apart from others, in which case
+        # nothing is cached.
+        cls = type(self)
+        optionxform = _callable_fingerprint(self.optionxform)
+        if optionxform is None:
+            return None
+        interpolation = getattr(self, '_interpolation', None)
+        return (cls.__module__, cls.__name__, optionxform,
+                self.SECTCRE.pattern,
+                getattr(self, '_optcre', self.OPTCRE).pattern,
+                getattr(self, '_comment_prefixes', None),
+                getattr(self, '_inline_comment_prefixes', None),
+                getattr(self, '_strict', None),
+                getattr(self, '_empty_lines_in_values', None),
+                getattr(self, 'default_section', configparser.DEFAULTSECT),
+                type(interpolation).__name__)
+
+    def _fragment_spec(self):
+        # Arguments for _make_parser() that create an empty parser configured
+        # like this one, for parsing a single file in isolation. Defaults
+        # passed to the constructor are left out, since they don't come from
+        # the file.
+        init_cls, args, kwargs = self._init_args
+        if args:
+            args = (None,) + args[1:]
+        kwargs = dict(kwargs)
+        kwargs.pop('defaults', None)
+        if self._engine != 'configparser':
+            kwargs['engine'] = self._engine
+        return type(self), init_cls, args, kwargs, self._parse_attrs()
+
+    def _parse_attrs(self):
+        # The _PARSE_ATTRS that have been overridden on this instance, as
+        # (name, value) pairs for _make_parser().
+        attrs = self.__dict__
+        return tuple((name, attrs[name]) for name in _PARSE_ATTRS
+                     if name in attrs)
+
+    def _fragment_parser(self):
+        return _make_parser(*self._fragment_spec())
+
+    def _parse_fragment(self, fp, fpname):
+        # Parse a single file in isolation and return it as a fragment that
+        # can be applied later with _apply_fragment(). If parsing fails,
+        # whatever was parsed is applied to this parser before re-raising, so
+        # that the result is the same as if the file had been read directly.
+        parser = self._fragment_parser()
+        try:
+            parser._read(fp, fpname)
+        except Exception:
+            self._apply_fragment(parser._export_fragment(), fpname)
+            raise
+        return parser._export_fragment()
+
+    def _export_fragment(self):
+        # A fragment is a list of (section, options, values, lines) tuples,
+        # with None standing in for the default section. It only contains
+        # types that marshal can handle.
+        fragment = []
+        blocks = [(None, configparser.DEFAULTSECT, self._defaults)]
+        blocks.extend((name, name, options)
+                      for name, options in self._sections.items())
+        for name, sectname, options in blocks:
+            if name is None and not options:
+                continue
+            locations = self._option_lines.get(sectname)
+            names = tuple(options)
+            lines = []
+            for option in names:
+                location = locations and locations.get(option)
+                lines.append(location[1] if location is not None else None)
+            fragment.append((name, names, tuple(options.values()), lines))
+        return fragment
+
+    def _apply_fragment(self, fragment, fpname):
+        # Replays a fragment as if its file had just been read.
+        self._forget_views()
+        self._curr_filename = fpname
+        try:
+            for name, names, values, lines in fragment:
+                if name is None:
+                    options = self._defaults
+                else:
+                    options = self._sections.get(name)
+                    if options is None:
+                        options = self._new_section(name)
+                for option, value, lineno in zip(names, values, lines):
+                    self._curr_lineno = lineno
+                    options[option] = value
+        finally:
+            self._curr_filename = None
+            self._curr_lineno = None
+
+    def _store_fragment(self, fragment, fpname):
+        # Like _apply_fragment(), but stores values and locations in bulk
+        # rather than one option at a time through the option wrappers.
+        self._forget_views()
+        store = self._option_lines
+        cache = self._interpolated
+        if self._lazy is None:
+            update = self._dict.bulk_update
+            file_id = store.files.intern(fpname)
+        else:
+            update = self._dict.update
+        for name, names, values, lines in fragment:
+            if name is None:
+                options = self._defaults
+                sectname = configparser.DEFAULTSECT
+            else:
+                options = self._sections.get(name)
+                if options is None:
+                    options = self._new_section(name)
+                sectname = name
+            if isinstance(options, _OverlayOptions):
+                options = options.for_update(names)
+            update(options, zip(names, values))
+            if cache:
+                for option in names:
+                    cache.forget(sectname, option)
+            if self._lazy is None:
+                if None in lines:
+                    # Options without a location, like __name__ on Python 2
+                    file_ids = array('i', [file_id if lineno is not None
+                                           else -1 for lineno in lines])
+                    lines = [lineno or 0 for lineno in lines]
+                else:
+                    file_ids = array('i', [file_id]) * len(names)
+                store[sectname].unpack(names, file_ids, array('i', lines))
+
+    def _resolve_lazy(self):
+        # In lazy mode, brings the location store up to date by scanning the
+        # files read since the last call, in order, and replaying any changes
+        # made in between.
+        lazy = self._lazy
+        if lazy is None or (lazy.resolved == len(self._read_log) and
+                            not lazy.events):
+            return
+        self._forget_views()
+        store = self._option_lines
+        events = lazy.events
+        applied = 0
+        try:
+            while True:
+                position = lazy.resolved
+                while (applied < len(events) and
+                       events[applied][0] <= position):
+                    _, section, option, location = events[applied]
+                    if option is None:
+                        store.pop(section, None)
+                    else:
+                        store[section][option] = location
+                    applied += 1
+                if position == len(self._read_log):
+                    break
+                fpname = self._read_log[position][0]
+                for name, names, _, lines in self._scan_lazy(position):
+                    locations = store[configparser.DEFAULTSECT
+                                      if name is None else name]
+                    for option, lineno in zip(names, lines):
+                        if lineno is not None:
+                            locations[option] = fpname, lineno
+                lazy.resolved = position + 1
+        finally:
+            del events[:applied]
+
+    def _scan_lazy(self, position):
+        # Parses a file from the read log again, as a fragment, with the
+        # same settings, including optionxform(), as when it was read. Raises
+        # SourceChangedError if it has changed since it was read.
+        saved = self._lazy.saved.get(position)
+        if isinstance(saved, list):
+            return saved
+        fpname, identity, encoding = self._read_log[position]
+        if saved is not None:
+            fp = six.StringIO(saved)
+        else:
+            fp = _mapped_file(fpname, identity, encoding)
+        parser = self._fragment_parser()
+        try:
+            parser._read(fp, fpname)
+        except Exception:
+            # Reading it failed the first time too; whatever was parsed
+            # before the error was kept.
+            pass
+        finally:
+            fp.close()
+        return parser._export_fragment()
+
+    def _mark_lazy(self, section, option, location):
+        # Records a change made in lazy mode. Applied directly if the store
+        # is up to date, and queued otherwise.
+        lazy = self._lazy
+        epoch = len(self._read_log)
+        self._forget_views(section)
+        if self._interpolated:
+            self._interpolated.forget(section, option)
+        if lazy.resolved == epoch and not lazy.events:
+            if option is None:
+                self._option_lines.pop(section, None)
+            else:
+                self._option_lines[section][option] = location
+        else:
+            lazy.events.append((epoch, section, option, location))
+
+    def overlay(self):
+        """Return a new parser layered on top of this one.
+
+        The overlay sees every section, value and location of this parser,
+        but only stores what is read into it or changed in it. Changes made
+        to the overlay, including removing options and sections, don't
+        affect this parser; changes made to this parser show through
+        unless the overlay has overridden them. Pickling or copying an
+        overlay produces a standalone parser.
+
+        The __init__ of a subclass isn't run for the overlay. Instead, it
+        shares the public instance attributes of this parser, such as those
+        that __init__ set; private ones (starting with `_') aren't carried
+        over.
+        """
+
+        # Configured like this parser, including overrides set on it such
+        # as optionxform, so that both layers use the same option names
+        child = _make_parser(*self._fragment_spec() + (self._cache,))
+        _inherit_attrs(child, self)
+        child._base = self
+        # The base's values can change underneath cached results
+        child._interpolated = None
+        child._sections = _OverlaySections(child._sections, self._sections,
+                                           child._dict)
+        child._defaults = _OverlayOptions(None, configparser.DEFAULTSECT,
+                                          child._defaults, self._defaults)
+        proxies = getattr(child, '_proxies', None)
+        if proxies is not None:
+            child._proxies = _SectionProxies(child, proxies)
+        return child
+
+    def _flattened(self):
+        # A standalone parser with the values and locations of every layer
+        # of an overlay.
+        init_cls, args, kwargs = self._init_args
+        flat = _make_parser(type(self), init_cls, args, kwargs,
+                            self._parse_attrs(), self._cache)
+        _inherit_attrs(flat, self)
+        update = flat._dict.bulk_update
+        blocks = [(configparser.DEFAULTSECT, self._defaults, flat._defaults)]
+        blocks.extend((name, options, flat._new_section(name))
+                      for name, options in self._sections.items())
+        for sectname, options, target in blocks:
+            update(target, options.items())
+            locations = flat._option_lines[sectname]
+            for option in options:
+                location = self._layered_location(sectname, option)
+                if location is not None:
+                    locations[option] = location
+
+        layers = []
+        parser = self
+        while parser is not None:
+            layers.append(parser._read_log)
+            parser = parser._base
+        for read_log in reversed(layers):
+            flat._read_log.extend(read_log)
+        return flat
+
+    def _join_multiline_values(self):
+        # Every value is stored again here, but only the ones that were just
+        # read change, and they were dropped from the interpolation cache
+        # when their lines were read. So don't let the rest be dropped too.
+        # In an overlay, only values stored in the overlay itself can have
+        # just been read; don't rewrite every value of the base.
+        if self._base is None:
+            cache, self._interpolated = self._interpolated, None
+            try:
+                return super(_LineTrackingMixin,
+                             self)._join_multiline_values()
+            finally:
+                self._interpolated = cache
+        sections, defaults = self._sections, self._defaults
+        self._sections, self._defaults = sections.own, defaults.own
+        try:
+            super(_LineTrackingMixin, self)._join_multiline_values()
+        finally:
+            self._sections, self._defaults = sections, defaults
+
+    def _install_fragment(self, fragment, log_entry):
+        # Applies a fragment that was parsed elsewhere, and logs its source,
+        # as if it had just been read.
+        fpname, identity, _ = log_entry
+        if self._lazy is not None and identity is None:
+            self._lazy.saved[len(self._read_log)] = fragment
+        self._read_log.append(log_entry)
+        self._store_fragment(fragment, fpname)
+
+    def _new_section(self, name):
+        # Adds an empty section the same way _read() does.
+        options = self._dict()
+        if six.PY2:
+            options['__name__'] = name
+        self._sections[name] = options
+        proxies = getattr(self, '_proxies', None)
+        if proxies is not None:
+            proxies[name] = configparser.SectionProxy(self, name)
+        return options
 
     def get_location(self, section, option):
         """Get location information for an option value in a given section.
 
         Returns a tuple (filename, line_number) if location information
-        exists, and None otherwise.
+        exists, and None otherwise. With track_locations='lazy', raises
+        SourceChangedError if a file has to be scanned and it has changed
+        since it was read.
         """
 
+        self._resolve_lazy()
         if not self.has_section(section):
             raise configparser.NoSectionError(section)
         elif not self.has_option(section, option):
             raise configparser.NoOptionError(option, section)
         option = self.optionxform(option)
-        loc = self._option_lines[section].get(option)
+        loc = self._layered_location(section, option)
         if loc is None and option in self._defaults:
-            return self._option_lines[configparser.DEFAULTSECT].get(option)
+            return self._layered_location(configparser.DEFAULTSECT, option)
         return loc
 
+    def get_locations(self, section=None):
+        """Get location information for every option in a given section, or
+        in every section if `section' is None.
+
+        For a section, returns a read-only mapping of each of its options,
+        including those that come from DEFAULT, to the same location that
+        get_location() would return. Without a section, returns a dict of
+        these mappings by section name. The mappings are kept between calls
+        until their section or DEFAULT changes.
+        """
+
+        self._resolve_lazy()
+        if section is None:
+            return dict((name, self._section_locations(name))
+                        for name in self._sections)
+        if not self.has_section(section):
+            raise configparser.NoSectionError(section)
+        return self._section_locations(section)
+
+    def _section_locations(self, section):
+        # The get_locations() view of a section, built on first use. Changes
+        # to an overlay's base can't be seen from the overlay, so views of
+        # overlays are always built from scratch.
+        view = self._location_views.get(section)
+        if view is not None:
+            return view
+        options = self._sections[section]
+        defaults = self._defaults
+        locations = {}
+        if self._base is None:
+            store = self._option_lines
+            own = store.get(section, _EMPTY_LOCATIONS)
+            fallback = store.get(configparser.DEFAULTSECT, _EMPTY_LOCATIONS)
+            for option in options:
+                location = own.get(option)
+                if location is None and option in defaults:
+                    location = fallback.get(option)
+                locations[option] = location
+            for option in defaults:
+                if option not in options:
+                    locations[option] = fallback.get(option)
+        else:
+            for option in options:
+                location = self._layered_location(section, option)
+                if location is None and option in defaults:
+                    location = self._layered_location(
+                        configparser.DEFAULTSECT, option)
+                locations[option] = location
+            for option in defaults:
+                if option not in options:
+                    locations[option] = self._layered_location(
+                        configparser.DEFAULTSECT, option)
+        locations.pop('__name__', None)
+        view = MappingProxyType(locations)
+        if self._base is None:
+            self._location_views[section] = view
+        return view
+
+    def _layered_location(self, section, option):
+        # The location of an option, taken from the layer its value comes
+        # from. Only overlays have more than one layer.
+        parser = self
+        while parser._base is not None:
+            if section == configparser.DEFAULTSECT:
+                options = parser._defaults
+            else:
+                options = parser._sections.get(section)
+            if not isinstance(options, _OverlayOptions) or options.owns(option):
+                break
+            if options.hides(option):
+                return None
+            parser = parser._base
+            parser._resolve_lazy()
+        locations = parser._option_lines.get(section)
+        if locations is None:
+            return None
+        return locations.get(option)
+
     def get_line(self, section, option):
         """Get the line number for an option value in a given section.
 
@@ -154,6 +1467,329 @@ class _LineTrackingMixin(object):
             return loc[0]
         return None
 
+    def get_source(self, section, option, context=0):
+        """Get the source text for an option value in a given section.
+
+        Returns a list of (line_number, line) tuples covering the whole
+        value, including continuation lines, plus `context' lines before and
+        after it. Returns None if location information doesn't exist or the
+        file can't be read. Raises SourceChangedError if the file has changed
+        since it was read.
+        """
+
+        loc = self.get_location(section, option)
+        if loc is None:
+            return None
+        filename, lineno = loc
+        if not isinstance(lineno, six.integer_types):
+            return None
+        identity = encoding = None
+        parser = self
+        while parser is not None:
+            for fpname, file_identity, file_encoding in reversed(
+                    parser._read_log):
+                if fpname == filename:
+                    identity, encoding = file_identity, file_encoding
+                    break
+            else:
+                parser = parser._base
+                continue
+            break
+        return self._sources.excerpt(
+            filename, identity, encoding, lineno, context,
+            tuple(getattr(self, '_comment_prefixes', ('#', ';'))) +
+            tuple(getattr(self, '_inline_comment_prefixes', ())),
+            getattr(self, '_empty_lines_in_values', True))
+
+    def get(self, section, option, *args, **kwargs):
+        # Interpolated values are cached. Anything that isn't a plain lookup
+        # with interpolation goes straight to configparser.
+        cache = self._interpolated
+        if (cache is None or args or kwargs.get('raw') or
+                kwargs.get('vars') is not None):
+            return super(_LineTrackingMixin, self).get(section, option,
+                                                       *args, **kwargs)
+        key = section, self.optionxform(option)
+        value = cache.values.get(key, _MISSING)
+        if value is _MISSING:
+            value, _ = self._recorded_get(key, kwargs)
+        elif self._recording:
+            self._recording[-1].extend(cache.depends[key])
+        return value
+
+    def _recorded_get(self, key, kwargs):
+        # Calls get() while recording every option that is looked up, and
+        # caches the result if there is a cache. Returns (value, depends).
+        recorder = []
+        self._recording.append(recorder)
+        try:
+            value = super(_LineTrackingMixin, self).get(key[0], key[1],
+                                                        **kwargs)
+        finally:
+            self._recording.pop()
+        if self._recording:
+            self._recording[-1].extend(recorder)
+        # If the option itself wasn't found first, `fallback' was returned.
+        if not recorder or recorder[0] != key:
+            return value, None
+        depends = []
+        seen = set()
+        for dependency in recorder:
+            if dependency not in seen:
+                seen.add(dependency)
+                depends.append(dependency)
+        depends = tuple(depends)
+        if self._interpolated is not None:
+            self._interpolated.add(key, value, depends)
+        return value, depends
+
+    def _unify_values(self, section, vars):
+        values = super(_LineTrackingMixin, self)._unify_values(section, vars)
+        if self._recording:
+            return _RecordingMap(values, section, self._recording[-1])
+        return values
+
+    def items(self, *args, **kwargs):
+        # Interpolating one section can read all of another one at once.
+        if self._recording and args:
+            self._recording[-1].append((args[0], None))
+        return super(_LineTrackingMixin, self).items(*args, **kwargs)
+
+    def get_location_chain(self, section, option):
+        """Get the location of an option value and of every option that its
+        interpolated value was built from.
+
+        Returns a list of (section, option, location) tuples in the order the
+        options were looked up, starting with the option itself. Options
+        that come from DEFAULT are listed under DEFAULT. Raises the same
+        errors as get().
+        """
+
+        key = section, self.optionxform(option)
+        depends = None
+        if self._interpolated is not None:
+            self.get(section, option)
+            depends = self._interpolated.depends.get(key)
+        if depends is None:
+            _, depends = self._recorded_get(key, {})
+        if not depends:
+            depends = [key]
+        self._resolve_lazy()
+        chain = []
+        for sectname, name in depends:
+            if name is None:
+                continue
+            if name not in self._sections.get(sectname, _EMPTY_LOCATIONS):
+                sectname = configparser.DEFAULTSECT
+            chain.append((sectname, name,
+                          self._layered_location(sectname, name)))
+        return chain
+
+    def get_location_history(self, section, option):
+        """Get every location that ever set an option value in a given
+        section.
+
+        Returns a list of (filename, line_number) tuples, oldest first. The
+        last one is the current location, unless the value has since been
+        set without location information. Returns None unless the parser was
+        created with track_history=True.
+        """
+
+        history = self._option_lines.history
+        if history is None:
+            return None
+        if not self.has_section(section):
+            raise configparser.NoSectionError(section)
+        elif not self.has_option(section, option):
+            raise configparser.NoOptionError(option, section)
+        option = self.optionxform(option)
+        locations = history.get(section, option)
+        if not locations and option in self._defaults:
+            return history.get(configparser.DEFAULTSECT, option)
+        return locations
+
+    def get_option_at(self, filename, lineno):
+        """Find the option defined at a given line of a file.
+
+        Returns a tuple (section, option) for the option whose definition
+        starts at `lineno', or most recently before it, in `filename'.
+        Returns None if there is no such option. Only the current location of
+        each option is considered.
+        """
+
+        self._resolve_lazy()
+        store = self._option_lines
+        file_id = store.files.ids.get(filename)
+        if file_id is None:
+            return None
+        entry = store.reverse_index().at(file_id, lineno)
+        if entry is None:
+            return None
+        return entry[:2]
+
+    def get_options_in(self, filename, first, last):
+        """Find all options defined in a range of lines of a file.
+
+        Returns a list of (section, option, line_number) tuples for every
+        option whose definition starts between `first' and `last' inclusive,
+        ordered by line number.
+        """
+
+        self._resolve_lazy()
+        store = self._option_lines
+        file_id = store.files.ids.get(filename)
+        if file_id is None:
+            return []
+        return store.reverse_index().between(file_id, first, last)
+
+    def section_digests(self):
+        """Return a digest of the raw values of each section, as a dict of
+        hex strings by section name, including the default section.
+
+        Sections with the same options and raw values have the same digest,
+        whatever order they were read in, so comparing digests is a quick way
+        to tell which sections of two parsers differ, even on different
+        machines. Digests are kept until their section changes, so only
+        changed sections are hashed again.
+        """
+
+        default_section = getattr(self, 'default_section',
+                                  configparser.DEFAULTSECT)
+        digests = {default_section: self._digest_of(
+            configparser.DEFAULTSECT)}
+        for name in self._sections:
+            digests[name] = self._digest_of(name)
+        return digests
+
+    def _digest_of(self, sectname):
+        # Like _section_locations(), digests of overlays aren't kept.
+        digest = self._digests.get(sectname)
+        if digest is not None:
+            return digest
+        if sectname == configparser.DEFAULTSECT:
+            options = self._defaults
+        else:
+            options = self._sections[sectname]
+        digest = _section_digest(options)
+        if self._base is None:
+            self._digests[sectname] = digest
+        return digest
+
+    def diff(self, other):
+        """Compare the raw values of this parser with those of another.
+
+        `other' is another configlines parser, or the section_digests() of
+        one. Sections whose digests match are skipped. Returns a list of
+        ConfigDifference(section, option, value, other_value, location,
+        other_location) tuples, ordered by section and option, where values
+        and locations come from this parser and `other' respectively. An
+        option missing from one side has a value and location of None there.
+        Options in the default section are compared under its own name rather
+        than as part of every section.
+
+        When `other' is a dict of digests, there is nothing to compare options
+        with, so each differing section is reported once with an option,
+        values and locations of None.
+        """
+
+        ours = self.section_digests()
+        if isinstance(other, _LineTrackingMixin):
+            theirs = other.section_digests()
+        else:
+            theirs = other
+        names = [name for name in set(ours) | set(theirs)
+                 if ours.get(name) != theirs.get(name)]
+        names.sort()
+        if not isinstance(other, _LineTrackingMixin):
+            return [ConfigDifference(name, None, None, None, None, None)
+                    for name in names]
+
+        self._resolve_lazy()
+        other._resolve_lazy()
+        differences = []
+        for name in names:
+            our_options, our_sectname = self._raw_section(name)
+            their_options, their_sectname = other._raw_section(name)
+            for option in sorted(set(our_options) | set(their_options)):
+                if option == '__name__':
+                    continue
+                value = our_options.get(option, _MISSING)
+                other_value = their_options.get(option, _MISSING)
+                if value == other_value:
+                    continue
+                if value is _MISSING:
+                    value = location = None
+                else:
+                    location = self._layered_location(our_sectname, option)
+                if other_value is _MISSING:
+                    other_value = other_location = None
+                else:
+                    other_location = other._layered_location(their_sectname,
+                                                             option)
+                differences.append(ConfigDifference(
+                    name, option, value, other_value, location,
+                    other_location))
+        return differences
+
+    def _raw_section(self, name):
+        # The options of a section by the name section_digests() reports it
+        # under, and the name its locations are stored under.
+        if name == getattr(self, 'default_section', configparser.DEFAULTSECT):
+            return self._defaults, configparser.DEFAULTSECT
+        return self._sections.get(name, {}), name
+
+    def enable_stats(self, callback=None):
+        """Start counting and timing the work done by this parser, for
+        stats(). Counters start again from zero.
+
+        If `callback' is given, it is called after each file or string is
+        read with a ReadStats(filename, seconds, lines, sets) tuple, where
+        lines is the number of lines read through the line-tracking wrapper
+        and sets the number of times an option was stored. configparser
+        stores each option twice: once as it is read, and again once
+        multi-line values are joined.
+
+        Until this is called, nothing is counted and reading costs exactly
+        what it did before. Copies and pickles of the parser aren't
+        instrumented.
+        """
+
+        _uninstall_stats(self.__dict__)
+        _install_stats(self, _Stats(callback))
+
+    def disable_stats(self):
+        """Stop counting. stats() keeps returning the counts so far."""
+
+        _uninstall_stats(self.__dict__)
+
+    def stats(self):
+        """Return what has been counted since enable_stats(), and how much
+        memory location information takes up, as a dict:
+
+        ``reads``, ``read_seconds``
+            calls to _read(), one per file or string read, and the time
+            spent in them
+        ``files``
+            a dict with the ``reads``, ``seconds`` and ``lines`` of each file
+        ``lines``
+            lines read through the line-tracking file wrapper
+        ``hooks``, ``hook_seconds``
+            calls to the hooks that track options as they are set
+            (``set``), removed (``remove``) and as sections are removed
+            (``remove_section``), and the time spent in them, including
+            while reading; ``bulk`` counts options stored without hooks by
+            engine='fast'
+        ``location_bytes``
+            the approximate size of the location information in memory
+
+        Counts are zero if enable_stats() hasn't been called.
+        """
+
+        stats = self._stats
+        if stats is None:
+            stats = _Stats()
+        return stats.report(self._option_lines.nbytes())
+
     def set(self, section, option, value, *args, **kwargs):
         """Works like set() as documented in the configparser module, with
         the following optional keyword-only argument:
@@ -181,12 +1817,19 @@ class _LineTrackingMixin(object):
                 six.raise_from(err, None)
 
         option_xform = self.optionxform(option)
-        cur_location = self._option_lines[section].get(option_xform)
+        if new_location == 'preserve':
+            self._resolve_lazy()
+        cur_location = self._layered_location(section, option_xform)
         super(_LineTrackingMixin, self).set(section, option, value,
                 *args, **kwargs)
-        if new_location == 'preserve':
+        if self._lazy is not None:
+            if new_location == 'preserve':
+                new_location = cur_location
+            self._mark_lazy(section, option_xform, new_location)
+        elif new_location == 'preserve':
             if cur_location is not None:
-                self._option_lines[section][option_xform] = cur_location
+                self._option_lines[section].restore(option_xform,
+                                                    cur_location)
         elif new_location is not None:
             self._option_lines[section][option_xform] = new_location
 
@@ -207,20 +1850,43 @@ class _LineTrackingMixin(object):
                 err = ValueError("location must be (filename, lineno) or None")
                 six.raise_from(err, None)
         option = self.optionxform(option)
-        self._option_lines[section][option] = location
+        if self._lazy is not None:
+            self._mark_lazy(section, option, location)
+        else:
+            self._option_lines[section][option] = location
+            self._forget_views(section)
+
+    def remove_option(self, section, option):
+        existed = super(_LineTrackingMixin, self).remove_option(section,
+                                                                option)
+        if existed and self._lazy is not None:
+            self._mark_lazy(section, self.optionxform(option), None)
+        return existed
+
+    def remove_section(self, section):
+        existed = super(_LineTrackingMixin, self).remove_section(section)
+        if existed and self._lazy is not None:
+            self._mark_lazy(section, None, None)
+        return existed
 
 class RawConfigParser(_LineTrackingMixin, configparser.RawConfigParser):
     def __init__(self, *args, **kwargs):
+        options = self._tracking_options(kwargs)
         configparser.RawConfigParser.__init__(self, *args, **kwargs)
-        _LineTrackingMixin.__init__(self)
+        _LineTrackingMixin.__init__(self, **options)
+        self._init_args = RawConfigParser, args, kwargs
 
 class ConfigParser(_LineTrackingMixin, configparser.ConfigParser):
     def __init__(self, *args, **kwargs):
+        options = self._tracking_options(kwargs)
         configparser.ConfigParser.__init__(self, *args, **kwargs)
-        _LineTrackingMixin.__init__(self)
+        _LineTrackingMixin.__init__(self, **options)
+        self._init_args = ConfigParser, args, kwargs
 
 class SafeConfigParser(_LineTrackingMixin, configparser.SafeConfigParser):
     def __init__(self, *args, **kwargs):
+        options = self._tracking_options(kwargs)
         configparser.SafeConfigParser.__init__(self, *args, **kwargs)
-        _LineTrackingMixin.__init__(self)
+        _LineTrackingMixin.__init__(self, **options)
+        self._init_args = SafeConfigParser, args, kwargs
 
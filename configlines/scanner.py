@@ -0,0 +1,163 @@
+from collections import namedtuple
+import io
+import os
+import re
+import sys
+
+import six
+from six.moves import configparser
+
+
+ScannedOption = namedtuple('ScannedOption',
+                           'section option value filename lineno')
+
+_NONSPACECRE = re.compile(r'\S')
+
+
+def iter_options(fp_or_path, encoding=None, source=None, parser=None):
+    """Parse a configuration file one option at a time.
+
+    `fp_or_path' is a file name or an open file. Yields a
+    ScannedOption(section, option, value, filename, lineno) tuple for each
+    option as soon as its value is complete, where lineno is the line the
+    option starts on, as returned by get_location(). Values are raw: joined
+    across continuation lines but not interpolated. Options in the default
+    section are yielded under its own name rather than merged into the other
+    sections.
+
+    Nothing is kept once an option has been yielded, so arbitrarily large
+    files can be scanned in constant memory. The flip side is that repeated
+    sections and options are yielded again rather than being detected as
+    duplicates.
+
+    `source' overrides the file name that is reported, like in read_file().
+    The syntax is that of RawConfigParser's defaults, unless `parser' is given,
+    in which case its delimiters, comment prefixes and optionxform() are used
+    instead. As with read(), unparsable lines are collected and raised as a
+    ParsingError at the end.
+    """
+
+    if hasattr(fp_or_path, '__fspath__'):
+        fp_or_path = os.fspath(fp_or_path)
+    if isinstance(fp_or_path, (six.string_types, bytes)):
+        if encoding is None:
+            fp = open(fp_or_path)
+        else:
+            fp = io.open(fp_or_path, encoding=encoding)
+        if source is None:
+            source = fp_or_path
+        with fp:
+            for option in _scan(fp, source, parser):
+                yield option
+    else:
+        if source is None:
+            source = getattr(fp_or_path, 'name', '<???>')
+        for option in _scan(fp_or_path, source, parser):
+            yield option
+
+
+def _scan(fp, fpname, parser):
+    # A streaming version of RawConfigParser._read(). Follows it closely,
+    # except that the option being read is kept in local variables until the
+    # next line that isn't part of its value, and is then yielded.
+    if parser is None:
+        parser = configparser.RawConfigParser
+        optionxform = _lower
+    else:
+        optionxform = parser.optionxform
+    sectcre = parser.SECTCRE
+    optcre = getattr(parser, '_optcre', parser.OPTCRE)
+    nonspacecre = getattr(parser, 'NONSPACECRE', _NONSPACECRE)
+    comment_prefixes = getattr(parser, '_comment_prefixes', ('#', ';'))
+    inline_prefixes = getattr(parser, '_inline_comment_prefixes', ())
+    empty_lines_in_values = getattr(parser, '_empty_lines_in_values', True)
+
+    sectname = None
+    optname = None
+    optlineno = None
+    optval = None                         # None, or a list of lines
+    indent_level = 0
+    error = None
+    for lineno, line in enumerate(fp, 1):
+        comment_start = sys.maxsize
+        if inline_prefixes:
+            prefixes = dict((prefix, -1) for prefix in inline_prefixes)
+            while comment_start == sys.maxsize and prefixes:
+                next_prefixes = {}
+                for prefix, index in prefixes.items():
+                    index = line.find(prefix, index + 1)
+                    if index == -1:
+                        continue
+                    next_prefixes[prefix] = index
+                    if index == 0 or (index > 0 and line[index - 1].isspace()):
+                        comment_start = min(comment_start, index)
+                prefixes = next_prefixes
+        stripped = line.strip()
+        for prefix in comment_prefixes:
+            if stripped.startswith(prefix):
+                comment_start = 0
+                break
+        if comment_start == sys.maxsize:
+            comment_start = None
+        value = line[:comment_start].strip()
+        if not value:
+            if empty_lines_in_values:
+                if (comment_start is None and optname is not None and
+                        optval is not None):
+                    optval.append('')
+            else:
+                indent_level = sys.maxsize
+            continue
+
+        first_nonspace = nonspacecre.search(line)
+        cur_indent_level = first_nonspace.start() if first_nonspace else 0
+        if optname is not None and cur_indent_level > indent_level:
+            if optval is None:
+                error = _parsing_error(error, fpname, lineno, line)
+            else:
+                optval.append(value)
+            continue
+
+        if optname is not None:
+            yield _scanned(sectname, optname, optval, fpname, optlineno)
+            optname = None
+        indent_level = cur_indent_level
+        mo = sectcre.match(value)
+        if mo:
+            sectname = mo.group('header')
+        elif sectname is None:
+            raise configparser.MissingSectionHeaderError(fpname, lineno, line)
+        else:
+            mo = optcre.match(value)
+            if mo and mo.group('option'):
+                optname = optionxform(mo.group('option').rstrip())
+                optlineno = lineno
+                optval = mo.group('value')
+                if optval is not None:
+                    optval = [optval.strip()]
+            else:
+                error = _parsing_error(error, fpname, lineno, line)
+
+    if optname is not None:
+        yield _scanned(sectname, optname, optval, fpname, optlineno)
+    if error is not None:
+        raise error
+
+
+def _scanned(section, option, lines, filename, lineno):
+    if lines is not None:
+        lines = '\n'.join(lines).rstrip()
+    return ScannedOption(section, option, lines, filename, lineno)
+
+
+def _parsing_error(error, fpname, lineno, line):
+    if error is None:
+        error = configparser.ParsingError(fpname)
+    error.append(lineno, repr(line))
+    return error
+
+
+def _lower(optionstr):
+    # RawConfigParser.optionxform(), for text of either string type on
+    # Python 2, where str.lower() only takes byte strings.
+    return optionstr.lower()
@@ -0,0 +1,202 @@
+from collections import namedtuple
+
+import six
+from six.moves import configparser
+
+
+SchemaViolation = namedtuple('SchemaViolation',
+                             'section option message location')
+
+_REQUIRED = object()
+
+
+class SchemaError(configparser.Error):
+    """Raised by Schema.validate() with every problem it found.
+
+    `errors' is a list of SchemaViolation(section, option, message, location)
+    tuples, where location is the (filename, line_number) of the offending
+    value, or None if there is no value to point at.
+    """
+
+    def __init__(self, errors):
+        lines = ['Invalid configuration:']
+        for section, option, message, location in errors:
+            if option is None:
+                where = '[%s]' % (section,)
+            else:
+                where = '[%s] %s' % (section, option)
+            if location is not None:
+                where += ' (%s, line %d)' % location
+            lines.append('\t%s: %s' % (where, message))
+        configparser.Error.__init__(self, '\n'.join(lines))
+        self.errors = errors
+        self.args = (errors,)
+
+
+class Option(object):
+    """How an option of a Schema is converted and checked.
+
+    `type' is int, float, bool (which accepts the same values as
+    getboolean()), str, or any other callable that takes the raw string and
+    raises ValueError or TypeError if it isn't valid. If `default' is given,
+    it is used as is when the option is missing; otherwise the option is
+    required. Converted values must also be one of `choices', be between
+    `min' and `max' inclusive, and make `check' return true, if given.
+    """
+
+    __slots__ = ('type', 'default', 'choices', 'min', 'max', 'check')
+
+    def __init__(self, type=str, default=_REQUIRED, choices=None, min=None,
+                 max=None, check=None):
+        self.type = type
+        self.default = default
+        self.choices = choices
+        self.min = min
+        self.max = max
+        self.check = check
+
+
+class Schema(object):
+    """The sections and options that a configuration must have, and the
+    types of their values.
+
+    `spec' maps section names to dicts that map option names to an Option,
+    or just to a type for a required option without constraints. Options of
+    the parser's default section can be described under its name. If
+    `allow_unknown' is false, options and sections that aren't described
+    are errors too.
+
+    A schema is compiled once, when it is created, and can then validate
+    any number of parsers.
+    """
+
+    def __init__(self, spec, allow_unknown=True):
+        self._sections = []
+        for section, options in spec.items():
+            compiled = []
+            for name, option in options.items():
+                if not isinstance(option, Option):
+                    option = Option(option)
+                compiled.append((name, option.default,
+                                 _converter(option.type), _checks(option)))
+            self._sections.append((section, compiled))
+        self._allow_unknown = allow_unknown
+
+    def validate(self, parser):
+        """Convert and check every option that the schema describes.
+
+        Returns the converted values as a dict of dicts by section and
+        option name, with defaults filled in, so that reading them later is
+        a plain lookup. Values are interpolated as get() would. Every
+        option is checked, and if any are missing or invalid, a SchemaError
+        listing all of them is raised instead.
+        """
+
+        default_section = getattr(parser, 'default_section',
+                                  configparser.DEFAULTSECT)
+        errors = []
+        values = {}
+        for section, options in self._sections:
+            typed = values[section] = {}
+            for name, default, convert, checks in options:
+                try:
+                    value = parser.get(section, name)
+                    if value is None:
+                        raise ValueError('no value given')
+                    value = convert(parser, value)
+                    for test, message in checks:
+                        if not test(value):
+                            raise ValueError(message)
+                except (configparser.NoSectionError,
+                        configparser.NoOptionError):
+                    if default is _REQUIRED:
+                        errors.append(SchemaViolation(section, name,
+                                                      'missing', None))
+                    else:
+                        typed[name] = default
+                except (ValueError, TypeError, configparser.Error) as e:
+                    # TypeError too, from a `type' that chokes on strings or
+                    # constraints that can't be compared with the value
+                    location = _location(parser, default_section, section,
+                                         name)
+                    errors.append(SchemaViolation(section, name, str(e),
+                                                  location))
+                else:
+                    typed[name] = value
+
+        if not self._allow_unknown:
+            errors.extend(self._unknown(parser, default_section))
+        if errors:
+            raise SchemaError(errors)
+        return values
+
+    def _unknown(self, parser, default_section):
+        # Violations for the options and sections of `parser' that the
+        # schema doesn't describe.
+        known = dict((section, set(parser.optionxform(name)
+                                   for name, _, _, _ in options))
+                     for section, options in self._sections)
+        for section in [default_section] + parser.sections():
+            if section == default_section:
+                options = parser._defaults
+            else:
+                options = parser._sections[section]
+            names = known.get(section, ())
+            if section not in known and section != default_section:
+                yield SchemaViolation(section, None, 'unknown section', None)
+                continue
+            for option in options:
+                if option not in names and option != '__name__':
+                    location = _location(parser, default_section, section,
+                                         option)
+                    yield SchemaViolation(section, option, 'unknown option',
+                                          location)
+
+
+def _location(parser, default_section, section, option):
+    # get_location(), which also works for the default section.
+    if section != default_section:
+        return parser.get_location(section, option)
+    parser._resolve_lazy()
+    return parser._layered_location(configparser.DEFAULTSECT,
+                                    parser.optionxform(option))
+
+
+def _converter(type_):
+    # A function of (parser, value) that converts a raw value to `type_'.
+    if type_ is str or type_ is six.text_type:
+        return lambda parser, value: value
+    if type_ is bool:
+        return _boolean
+    return lambda parser, value: type_(value)
+
+
+def _boolean(parser, value):
+    states = getattr(parser, 'BOOLEAN_STATES', None)
+    if states is None:
+        states = parser._boolean_states
+    try:
+        return states[value.lower()]
+    except KeyError:
+        raise ValueError('Not a boolean: %s' % value)
+
+
+def _checks(option):
+    # (test, message) pairs for the constraints of an Option.
+    checks = []
+    if option.choices is not None:
+        choices = option.choices
+        checks.append((lambda value: value in choices,
+                       'must be one of %s' % ', '.join(map(repr, choices))))
+    if option.min is not None:
+        low = option.min
+        checks.append((lambda value: value >= low,
+                       'must be at least %r' % (low,)))
+    if option.max is not None:
+        high = option.max
+        checks.append((lambda value: value <= high,
+                       'must be at most %r' % (high,)))
+    if option.check is not None:
+        checks.append((option.check, 'failed %s' % (
+            getattr(option.check, '__name__', 'check'),)))
+    return checks
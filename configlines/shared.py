@@ -0,0 +1,159 @@
+import copy
+import threading
+
+from .parsers import ConfigParser
+
+
+class SharedConfig(object):
+    """A parser that many threads can read from while it is being updated.
+
+    Readers use the parser in `current', which is never changed once it has
+    been published. read(), reload_changed() and update() work on a private
+    copy instead, and replace `current' with it in a single assignment when
+    they are done. Readers therefore take no locks and never see a partial
+    update or a location attributed to the wrong file. A reader that needs
+    several lookups to agree with each other should hold on to one `current'
+    for all of them. Writers wait for each other.
+
+    `parser' is the initial parser, a new ConfigParser if None. It must not
+    be changed directly afterwards. The read-only methods of the current
+    parser, such as get(), get_location() and sections(), can also be called
+    on this object.
+    """
+
+    # Methods passed through to the current parser, besides get*() and
+    # has_*()
+    _READ_METHODS = frozenset(['sections', 'options', 'items', 'defaults',
+                               'snapshot', 'section_digests', 'diff'])
+
+    def __init__(self, parser=None):
+        if parser is None:
+            parser = ConfigParser()
+        self._lock = threading.Lock()
+        self._publish(parser)
+
+    @property
+    def current(self):
+        """The currently published parser. Treat it as read-only."""
+
+        return self._current
+
+    def update(self, func):
+        """Call func(parser) with a private copy of the current parser, then
+        publish the copy. Returns the result of func(). If func() raises,
+        nothing is published.
+        """
+
+        with self._lock:
+            parser = self._private()
+            result = func(parser)
+            self._publish(parser)
+            return result
+
+    def read(self, filenames, encoding=None, **kwargs):
+        """Works like the parser's read(), then publishes the result."""
+
+        return self.update(lambda parser: parser.read(filenames, encoding,
+                                                      **kwargs))
+
+    def read_file(self, f, source=None):
+        """Works like the parser's read_file(), then publishes the result."""
+
+        self.update(lambda parser: parser.read_file(f, source))
+
+    def read_string(self, string, source='<string>'):
+        """Works like the parser's read_string(), then publishes the result.
+        """
+
+        self.update(lambda parser: parser.read_string(string, source))
+
+    def read_dict(self, dictionary, source='<dict>'):
+        """Works like the parser's read_dict(), then publishes the result."""
+
+        self.update(lambda parser: parser.read_dict(dictionary, source))
+
+    def reload_changed(self):
+        """Works like the parser's reload_changed(), and publishes the result
+        if anything changed.
+        """
+
+        with self._lock:
+            parser = self._private()
+            changes = parser.reload_changed()
+            if changes:
+                self._publish(parser)
+            return changes
+
+    def get_option_at(self, filename, lineno):
+        """Works like the parser's get_option_at()."""
+
+        self._reverse_index()
+        return self._current.get_option_at(filename, lineno)
+
+    def get_options_in(self, filename, first, last):
+        """Works like the parser's get_options_in()."""
+
+        self._reverse_index()
+        return self._current.get_options_in(filename, first, last)
+
+    def _reverse_index(self):
+        # The reverse index is built on first use, which mustn't happen in
+        # several threads at once. Copies made afterwards keep it.
+        if self._current._option_lines.reverse is None:
+            with self._lock:
+                self._current._option_lines.reverse_index()
+
+    def _private(self):
+        # A copy of the current parser to make changes to. Interpolated
+        # values are carried over, so that only the ones that the changes
+        # affect have to be worked out again.
+        current = self._current
+        parser = copy.copy(current)
+        if current._interpolated is not None:
+            parser._interpolated = current._interpolated.copy()
+        return parser
+
+    def _publish(self, parser):
+        # Lazy locations are resolved here, since resolving them changes the
+        # parser, and each reader thread gets its own interpolation recorders.
+        parser._resolve_lazy()
+        parser._recording = _ThreadRecorders()
+        self._current = parser
+
+    def __getattr__(self, name):
+        if (name in SharedConfig._READ_METHODS or name.startswith('get') or
+                name.startswith('has_')):
+            return getattr(self._current, name)
+        raise AttributeError(name)
+
+    def __getitem__(self, section):
+        return self._current[section]
+
+    def __contains__(self, section):
+        return section in self._current
+
+    def __iter__(self):
+        return iter(self._current)
+
+    def __len__(self):
+        return len(self._current)
+
+
+class _ThreadRecorders(threading.local):
+    # Stands in for the stack of interpolation dependency recorders of a
+    # published parser, since each reader thread needs its own.
+
+    def __init__(self):
+        self.stack = []
+
+    def __len__(self):
+        return len(self.stack)
+
+    def __getitem__(self, index):
+        return self.stack[index]
+
+    def append(self, recorder):
+        self.stack.append(recorder)
+
+    def pop(self):
+        return self.stack.pop()
@@ -0,0 +1,11 @@
+class _Slotted(object):
+    # Pickling for classes with __slots__ and no __dict__, which Python 2
+    # can't pickle with protocols 0 and 1 unless they define __getstate__.
+    __slots__ = ()
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
@@ -0,0 +1,162 @@
+from array import array
+from collections import OrderedDict
+import io
+import mmap
+
+import six
+from six.moves import configparser
+
+from .cache import _file_identity
+
+
+class SourceChangedError(configparser.Error):
+    """Raised when a file has changed on disk since it was read, so that its
+    contents no longer match the parsed values."""
+
+    def __init__(self, filename):
+        configparser.Error.__init__(
+            self, 'File %r has changed since it was read' % (filename,))
+        self.filename = filename
+        self.args = (filename,)
+
+
+def _mapped_file(name, identity, encoding):
+    # Opens a file that was read earlier for parsing again, through a memory
+    # map. Raises SourceChangedError if it is missing or has changed since.
+    try:
+        fp = open(name, 'rb')
+    except EnvironmentError:
+        raise SourceChangedError(name)
+    with fp:
+        if _file_identity(fp) != identity:
+            raise SourceChangedError(name)
+        try:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            data = b''
+        else:
+            try:
+                data = mapped[:]
+            finally:
+                mapped.close()
+    if six.PY2 and encoding is None:
+        return io.BytesIO(data)
+    return io.TextIOWrapper(io.BytesIO(data), encoding)
+
+
+def _line_offsets(lines):
+    # Offsets of the start of every line, plus the end of the text.
+    offsets = array('l', [0])
+    end = 0
+    for line in lines:
+        end += len(line)
+        offsets.append(end)
+    return offsets
+
+
+def _text_offsets(text):
+    # Like _line_offsets(), for text that hasn't been split into lines. Lines
+    # end at '\n' only, the same as when iterating over a file.
+    offsets = array('l', [0])
+    pos = text.find('\n')
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = text.find('\n', pos + 1)
+    if offsets[-1] != len(text):
+        offsets.append(len(text))
+    return offsets
+
+
+class _SourceFiles(object):
+    # Keeps a line offset index for every file that has been read, and the
+    # text of the `max_resident' most recently used files. Text that has been
+    # evicted is read from disk again when needed, after checking that the
+    # file hasn't changed.
+
+    def __init__(self, max_resident):
+        self.max_resident = max_resident
+        self.files = {}                 # name -> (identity, encoding, offsets)
+        self.texts = OrderedDict()      # name -> text, least recent first
+
+    def add(self, name, identity, encoding, lines):
+        offsets = _line_offsets(lines)
+        self.files[name] = identity, encoding, offsets
+        self._remember(name, ''.join(lines))
+
+    def forget(self, name):
+        self.files.pop(name, None)
+        self.texts.pop(name, None)
+
+    def _remember(self, name, text):
+        self.texts.pop(name, None)
+        if self.max_resident > 0:
+            self.texts[name] = text
+            while len(self.texts) > self.max_resident:
+                try:
+                    self.texts.popitem(last=False)
+                except KeyError:
+                    # Evicted by another thread reading a shared parser
+                    break
+
+    def _load(self, name, identity, encoding):
+        # Returns (text, offsets) for a file, reading it if necessary.
+        info = self.files.get(name)
+        if info is not None:
+            identity, encoding, offsets = info
+            text = self.texts.get(name)
+            if text is not None:
+                self._remember(name, text)
+                return text, offsets
+
+        try:
+            fp = io.open(name, encoding=encoding)
+        except (EnvironmentError, TypeError, ValueError):
+            return None, None
+        with fp:
+            if identity is not None and _file_identity(fp) != identity:
+                raise SourceChangedError(name)
+            text = fp.read()
+
+        if info is None:
+            offsets = _text_offsets(text)
+            self.files[name] = identity, encoding, offsets
+        self._remember(name, text)
+        return text, offsets
+
+    def excerpt(self, name, identity, encoding, lineno, context,
+                comment_prefixes=('#', ';'), empty_lines_in_values=True):
+        # Returns [(lineno, line), ...] for the value starting at `lineno',
+        # including continuation lines, with `context' lines on either side.
+        # Returns None if the file can't be read or doesn't have that line.
+        text, offsets = self._load(name, identity, encoding)
+        if text is None:
+            return None
+        count = len(offsets) - 1
+        if not 1 <= lineno <= count:
+            return None
+
+        def line(number):
+            return text[offsets[number - 1]:offsets[number]].rstrip('\r\n')
+
+        # Continuation lines are indented deeper than the option. Blank lines
+        # and comments don't end the value unless the parser has
+        # empty_lines_in_values off, but aren't part of it if nothing
+        # follows.
+        first = line(lineno)
+        indent = len(first) - len(first.lstrip())
+        end = lineno
+        for number in range(lineno + 1, count + 1):
+            current = line(number)
+            stripped = current.strip()
+            if not stripped or stripped.startswith(comment_prefixes):
+                if not empty_lines_in_values:
+                    break
+            elif len(current) - len(current.lstrip()) > indent:
+                end = number
+            else:
+                break
+
+        return [(number, line(number))
+                for number in range(max(lineno - context, 1),
+                                    min(end + context, count) + 1)]
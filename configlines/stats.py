@@ -0,0 +1,159 @@
+from collections import namedtuple
+import time
+import weakref
+
+
+ReadStats = namedtuple('ReadStats', 'filename seconds lines sets')
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+# Methods that are replaced by instrumented versions, as instance attributes,
+# while instrumentation is enabled. Nothing else changes, so a parser that
+# isn't instrumented runs exactly the same code as before.
+_HOOKS = ('_track_set', '_track_remove', '_track_remove_section')
+_INSTRUMENTED = _HOOKS + ('_read', '_read_fast', '_store_fragment')
+
+
+class _Stats(object):
+    # Counters collected by an instrumented parser. `files' maps a file name
+    # to [reads, seconds, lines].
+    __slots__ = ('callback', 'reads', 'read_seconds', 'files', 'lines',
+                 'sets', 'hooks', 'hook_seconds')
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.reads = 0
+        self.read_seconds = 0.0
+        self.files = {}
+        self.lines = 0
+        self.sets = 0
+        self.hooks = dict((name[len('_track_'):], 0) for name in _HOOKS)
+        self.hooks['bulk'] = 0
+        self.hook_seconds = 0.0
+
+    def add_read(self, fpname, seconds, lines, sets):
+        self.reads += 1
+        self.read_seconds += seconds
+        counts = self.files.get(fpname)
+        if counts is None:
+            counts = self.files[fpname] = [0, 0.0, 0]
+        counts[0] += 1
+        counts[1] += seconds
+        counts[2] += lines
+        if self.callback is not None:
+            self.callback(ReadStats(fpname, seconds, lines, sets))
+
+    def report(self, location_bytes):
+        return {
+            'reads': self.reads,
+            'read_seconds': self.read_seconds,
+            'files': dict((name, {'reads': reads, 'seconds': seconds,
+                                  'lines': lines})
+                          for name, (reads, seconds, lines)
+                          in self.files.items()),
+            'lines': self.lines,
+            'hooks': dict(self.hooks),
+            'hook_seconds': self.hook_seconds,
+            'location_bytes': location_bytes,
+        }
+
+
+def _install(parser, stats):
+    # Instruments `parser', which must not be instrumented already. The
+    # replacements only hold a weak reference to the parser, like the
+    # section wrappers do.
+    cls = type(parser)
+    ref = weakref.ref(parser)
+    attrs = parser.__dict__
+
+    for name in _HOOKS:
+        attrs[name] = _timed_hook(ref, stats, getattr(cls, name),
+                                  name[len('_track_'):])
+
+    read = cls._read
+
+    def _read(fp, fpname):
+        lines, sets = stats.lines, stats.sets
+        start = _clock()
+        try:
+            read(ref(), fp, fpname)
+        finally:
+            stats.add_read(fpname, _clock() - start, stats.lines - lines,
+                           stats.sets - sets)
+
+    read_fast = cls._read_fast
+
+    def _read_fast(fp, fpname, identity):
+        read_fast(ref(), _counted(fp, stats), fpname, identity)
+
+    store_fragment = cls._store_fragment
+
+    def _store_fragment(fragment, fpname):
+        count = sum(len(names) for _, names, _, _ in fragment)
+        stats.hooks['bulk'] += count
+        stats.sets += count
+        store_fragment(ref(), fragment, fpname)
+
+    attrs['_read'] = _read
+    attrs['_read_fast'] = _read_fast
+    attrs['_store_fragment'] = _store_fragment
+    attrs['_fp_wrapper'] = _counting_wrapper(parser._fp_wrapper)
+    attrs['_stats'] = stats
+
+
+def _uninstall(attrs):
+    # Removes instrumentation from a parser's __dict__, or from a copy of
+    # it. Counters are left in place.
+    for name in _INSTRUMENTED:
+        attrs.pop(name, None)
+    wrapper = attrs.get('_fp_wrapper')
+    if wrapper is not None:
+        attrs['_fp_wrapper'] = getattr(wrapper, 'counted', wrapper)
+
+
+def _timed_hook(ref, stats, method, name):
+    hooks = stats.hooks
+
+    def hook(*args):
+        start = _clock()
+        method(ref(), *args)
+        stats.hook_seconds += _clock() - start
+        hooks[name] += 1
+        if name == 'set':
+            stats.sets += 1
+    return hook
+
+
+def _counted(fp, stats):
+    for line in fp:
+        stats.lines += 1
+        yield line
+
+
+def _counting_wrapper(wrapper):
+    # A subclass of an _FpWrapper class that also counts the lines read
+    # through it, in the parser's _stats. Created once per class.
+    counting = _counting_wrappers.get(wrapper)
+    if counting is not None:
+        return counting
+
+    class CountingFpWrapper(wrapper):
+        __slots__ = ()
+        counted = wrapper
+
+        def readline(self):
+            line = wrapper.readline(self)
+            if line:
+                self.parser._stats.lines += 1
+            return line
+
+        def __iter__(self):
+            stats = self.parser._stats
+            for line in wrapper.__iter__(self):
+                stats.lines += 1
+                yield line
+
+    _counting_wrappers[wrapper] = CountingFpWrapper
+    return CountingFpWrapper
+
+_counting_wrappers = {}
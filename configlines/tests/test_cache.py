@@ -0,0 +1,135 @@
+from unittest import TestCase, skipIf
+import functools
+import os
+import shutil
+import tempfile
+
+import six
+from six.moves import configparser
+from pkg_resources import resource_filename
+
+import configlines
+
+
+class CacheTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache = configlines.ParseCache(os.path.join(self.tmp, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as fp:
+            fp.write(text)
+        return path
+
+    def assertSameConfig(self, cfg1, cfg2):
+        self.assertEqual(cfg1.sections(), cfg2.sections())
+        for section in cfg1.sections():
+            self.assertEqual(cfg1.items(section, raw=True),
+                             cfg2.items(section, raw=True))
+            for option in cfg1.options(section):
+                self.assertEqual(cfg1.get_location(section, option),
+                                 cfg2.get_location(section, option))
+
+    def test_replay(self):
+        paths = [resource_filename(__name__, name)
+                 for name in ('data1.cfg', 'data2.cfg', 'data3.cfg')]
+        cold = configlines.ConfigParser()
+        cold.read(paths)
+
+        first = configlines.ConfigParser(cache=self.cache)
+        first.read(paths)
+        self.assertEqual(self.cache.misses, 3)
+        self.assertSameConfig(cold, first)
+
+        second = configlines.ConfigParser(cache=self.cache)
+        second.read(paths)
+        self.assertEqual(self.cache.hits, 3)
+        self.assertSameConfig(cold, second)
+        self.assertEqual(second.get('qwerty', 'abc'), 'a split\nline')
+        self.assertEqual(second.get_location('sectB', 'foo'), (paths[1], 8))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_invalidation(self):
+        path = self.write('a.cfg', '[foo]\nbar = 1\n')
+        cfg = configlines.RawConfigParser(cache=self.cache)
+        cfg.read(path)
+
+        path = self.write('a.cfg', '[foo]\n\nbar = 2\nbaz = 3\n')
+        cfg = configlines.RawConfigParser(cache=self.cache)
+        cfg.read(path)
+        self.assertEqual(self.cache.hits, 0)
+        self.assertEqual(cfg.get('foo', 'bar'), '2')
+        self.assertEqual(cfg.get_location('foo', 'bar'), (path, 3))
+
+        # Differently configured parsers don't share entries
+        cfg = configlines.RawConfigParser(cache=self.cache, strict=False)
+        cfg.read(path)
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_optionxform(self):
+        paths = [self.write('a.cfg', '[foo]\nFooBar = 1\n'),
+                 self.write('b.cfg', '[foo]\nOther = 2\n')]
+        for _ in range(2):
+            cfg = configlines.ConfigParser(cache=self.cache)
+            cfg.optionxform = str
+            cfg.read(paths)
+            self.assertEqual(cfg.options('foo'), ['FooBar', 'Other'])
+            self.assertEqual(cfg.get_location('foo', 'Other'), (paths[1], 2))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+        # Entries made with another optionxform() aren't reused
+        cfg = configlines.ConfigParser(cache=self.cache)
+        cfg.read(paths)
+        self.assertEqual(cfg.options('foo'), ['foobar', 'other'])
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 4))
+
+        for prefix in ('x_', 'x_', 'y_'):
+            cfg = configlines.ConfigParser(cache=self.cache)
+            cfg.optionxform = functools.partial(_prefixed, prefix)
+            cfg.read(paths)
+            self.assertEqual(cfg.options('foo'),
+                             [prefix + 'FooBar', prefix + 'Other'])
+        self.assertEqual((self.cache.hits, self.cache.misses), (4, 8))
+
+        # Lambdas can't be told apart, so they aren't cached at all
+        for _ in range(2):
+            cfg = configlines.ConfigParser(cache=self.cache)
+            cfg.optionxform = lambda option: option.upper()
+            cfg.read(paths)
+            self.assertEqual(cfg.options('foo'), ['FOOBAR', 'OTHER'])
+        self.assertEqual((self.cache.hits, self.cache.misses), (4, 8))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_not_cached(self):
+        cfg = configlines.ConfigParser(cache=self.cache)
+        cfg.read_string(u'[foo]\nbar = 1\n')
+        self.assertEqual(cfg.get_location('foo', 'bar'), ('<string>', 2))
+        self.assertEqual(self.cache.hits + self.cache.misses, 0)
+
+    def test_errors(self):
+        path = self.write('bad.cfg', '[foo]\nbar = 1\nnot an option\n')
+        for _ in range(2):
+            cfg = configlines.ConfigParser(cache=self.cache)
+            with self.assertRaises(configparser.ParsingError):
+                cfg.read(path)
+            self.assertEqual(cfg.get_location('foo', 'bar'), (path, 2))
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_eviction(self):
+        cache = configlines.ParseCache(self.cache.directory, max_size=1)
+        paths = [self.write('%d.cfg' % i, '[foo]\nbar = %d\n' % i)
+                 for i in range(3)]
+        for path in paths:
+            configlines.ConfigParser(cache=cache).read(path)
+        self.assertLessEqual(len(os.listdir(cache.directory)), 1)
+
+        cache.clear()
+        self.assertEqual(os.listdir(cache.directory), [])
+
+
+def _prefixed(prefix, option):
+    return prefix + option
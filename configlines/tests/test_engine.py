@@ -0,0 +1,141 @@
+from unittest import TestCase, skipIf
+import random
+
+import six
+from six.moves import configparser
+from pkg_resources import resource_filename
+
+import configlines
+
+
+# Pieces that random files are made of, chosen to hit every rule of
+# RawConfigParser._read(): repeated sections and options, both kinds of
+# comment, continuation lines, blank lines and valueless options.
+SECTIONS = [u'[a]', u'[b]', u'[DEFAULT]', u'[ a ]', u'[c] ; x', u'[]']
+OPTIONS = [u'x = 1', u'X: 2', u'y=', u'z = a ; b', u'z = a;b', u'w',
+           u'# comment', u'; comment', u'v = %(x)s', u' = 3', u'u = 1 # c',
+           u'x ; c']
+INDENTS = [u'', u'', u'', u' ', u'    ', u'\t']
+
+
+def random_text(rng):
+    lines = []
+    if rng.random() < 0.9:
+        lines.append(rng.choice(SECTIONS))
+    for _ in range(rng.randint(0, 25)):
+        choice = rng.random()
+        if choice < 0.15:
+            lines.append(rng.choice(SECTIONS))
+        elif choice < 0.3:
+            lines.append(rng.choice([u'', u'  ']))
+        else:
+            lines.append(rng.choice(INDENTS) + rng.choice(OPTIONS))
+    return u'\n'.join(lines) + rng.choice([u'', u'\n'])
+
+
+PARSER_OPTIONS = [
+    {},
+    {'strict': False},
+    {'allow_no_value': True},
+    {'allow_no_value': True, 'strict': False},
+    {'empty_lines_in_values': False},
+    {'inline_comment_prefixes': (';', '#')},
+    {'comment_prefixes': ('#',), 'inline_comment_prefixes': (';',),
+     'allow_no_value': True},
+    {'delimiters': ('=',), 'default_section': 'a'},
+    {'interpolation': None},
+]
+
+
+@skipIf(six.PY2, 'the fast engine needs Python 3')
+class EngineTest(TestCase):
+    def contents(self, cfg):
+        result = {}
+        for section in [cfg.default_section] + cfg.sections():
+            if section == cfg.default_section:
+                options = cfg._defaults
+            else:
+                options = cfg._sections[section]
+            for option, value in options.items():
+                if isinstance(value, list):
+                    value = '\n'.join(value).rstrip()
+                location = cfg._option_lines.get(section, {}).get(option)
+                result[section, option] = value, location
+        return result
+
+    def read(self, text, engine, kwargs, source='test.cfg'):
+        cfg = configlines.ConfigParser(engine=engine, **kwargs)
+        cfg.read_string(u'[b]\nold = 1\n', 'old.cfg')
+        try:
+            cfg.read_string(text, source)
+        except Exception as e:
+            return type(e), getattr(e, 'errors', None), self.contents(cfg)
+        return None, None, self.contents(cfg)
+
+    def test_random(self):
+        rng = random.Random(1234)
+        for _ in range(1500):
+            text = random_text(rng)
+            kwargs = rng.choice(PARSER_OPTIONS)
+            expected = self.read(text, 'configparser', kwargs)
+            actual = self.read(text, 'fast', kwargs)
+            if expected[0] not in (None, configparser.ParsingError):
+                # Fatal errors leave configparser's values half-read
+                self.assertEqual(actual[0], expected[0], (text, kwargs))
+            else:
+                self.assertEqual(actual, expected, (text, kwargs))
+
+    def test_files(self):
+        paths = [resource_filename(__name__, name)
+                 for name in ('data1.cfg', 'data2.cfg', 'data3.cfg')]
+        parsers = []
+        for engine in ('configparser', 'fast'):
+            cfg = configlines.ConfigParser(engine=engine, track_history=True)
+            cfg.read(paths)
+            cfg.set('sectA', 'foo', 'x')
+            cfg.read(paths[1])
+            parsers.append(cfg)
+        eager, fast = parsers
+        self.assertTrue(fast._fast)
+        self.assertEqual(self.contents(fast), self.contents(eager))
+        self.assertEqual(fast.get_location_history('sectA', 'foo'),
+                         eager.get_location_history('sectA', 'foo'))
+        self.assertEqual(fast.get('sectA', 'foo'), eager.get('sectA', 'foo'))
+        self.assertEqual(fast.get_source('sectA', 'bar'),
+                         eager.get_source('sectA', 'bar'))
+
+    def test_lazy(self):
+        path = resource_filename(__name__, 'data2.cfg')
+        eager = configlines.ConfigParser()
+        lazy = configlines.ConfigParser(engine='fast', track_locations='lazy')
+        for cfg in (eager, lazy):
+            cfg.read(path)
+        self.assertEqual(self.contents(lazy), dict(
+            (key, (value, None))
+            for key, (value, _) in self.contents(eager).items()))
+        lazy._resolve_lazy()
+        self.assertEqual(self.contents(lazy), self.contents(eager))
+
+    def test_interpolation(self):
+        cfg = configlines.ConfigParser(engine='fast')
+        cfg.read_string(u'[s]\na = 1\nb = %(a)s\n')
+        self.assertEqual(cfg.get('s', 'b'), '1')
+        cfg.read_string(u'[s]\na = 2\n')
+        self.assertEqual(cfg.get('s', 'b'), '2')
+
+    def test_fallback(self):
+        class Upper(configparser.BasicInterpolation):
+            def before_read(self, parser, section, option, value):
+                return value.upper()
+
+        cfg = configlines.ConfigParser(engine='fast', interpolation=Upper())
+        self.assertFalse(cfg._fast)
+        cfg.read_string(u'[s]\na = x\n')
+        self.assertEqual(cfg.get('s', 'a'), 'X')
+        with self.assertRaises(ValueError):
+            configlines.ConfigParser(engine='regex')
+
+    def test_inherited(self):
+        cfg = configlines.ConfigParser(engine='fast')
+        self.assertTrue(cfg.overlay()._fast)
+        self.assertTrue(cfg._fragment_parser()._fast)
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from configlines.locations import _LocationStore
+
+
+class LocationStoreTest(TestCase):
+    def test_roundtrip(self):
+        store = _LocationStore()
+        store['foo']['bar'] = ('a.cfg', 1)
+        store['foo']['baz'] = ('b.cfg', 2)
+        store['qwerty']['bar'] = ('a.cfg', 3)
+
+        self.assertEqual(store['foo'].get('bar'), ('a.cfg', 1))
+        self.assertEqual(store['foo'].get('baz'), ('b.cfg', 2))
+        self.assertEqual(store['qwerty'].get('bar'), ('a.cfg', 3))
+        self.assertIsNone(store['foo'].get('nope'))
+        self.assertEqual(len(store.files), 2)
+        self.assertEqual(sorted(store['foo']), ['bar', 'baz'])
+
+    def test_unusual_locations(self):
+        store = _LocationStore()
+        locations = [('a.cfg', -1), ('a.cfg', 2**40), (None, 1),
+                     ('a.cfg', '12'), ['a.cfg', 5]]
+        for location in locations:
+            store['foo']['bar'] = location
+            self.assertEqual(store['foo'].get('bar'), location)
+
+        store['foo']['bar'] = ('a.cfg', 7)
+        self.assertEqual(store['foo'].get('bar'), ('a.cfg', 7))
+        self.assertEqual(len(store['foo']), 1)
+
+    def test_remove(self):
+        store = _LocationStore()
+        store['foo']['bar'] = ('a.cfg', 1)
+        store['foo']['baz'] = ('a.cfg', 2)
+
+        self.assertEqual(store['foo'].pop('bar'), ('a.cfg', 1))
+        self.assertIsNone(store['foo'].pop('bar'))
+        with self.assertRaises(KeyError):
+            del store['foo']['bar']
+
+        # Freed slots are reused
+        store['foo']['qux'] = ('b.cfg', 3)
+        self.assertEqual(len(store['foo'].lines), 2)
+        self.assertEqual(store['foo'].get('qux'), ('b.cfg', 3))
+        self.assertEqual(store['foo'].get('baz'), ('a.cfg', 2))
+
+        store['foo']['baz'] = None
+        self.assertNotIn('baz', store['foo'])
+
+        self.assertIsNotNone(store.pop('foo'))
+        self.assertNotIn('foo', store)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase, skipIf
+import os
+import shutil
+import tempfile
+
+import six
+from six.moves import configparser
+from pkg_resources import resource_filename
+
+import configlines
+from configlines import MappedConfig
+
+
+class MappedTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'config.map')
+        self.paths = [resource_filename(__name__, name)
+                      for name in ('data1.cfg', 'data2.cfg', 'data3.cfg')]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def assertSameAsParser(self, mapped, cfg):
+        self.assertEqual(mapped.sections(), sorted(cfg.sections()))
+        for section in cfg.sections():
+            self.assertTrue(mapped.has_section(section))
+            self.assertEqual(mapped.options(section),
+                             sorted(cfg.options(section)))
+            for option in cfg.options(section):
+                self.assertTrue(mapped.has_option(section, option))
+                self.assertEqual(mapped.get(section, option),
+                                 cfg.get(section, option))
+                self.assertEqual(mapped.get(section, option, raw=True),
+                                 cfg.get(section, option, raw=True))
+                self.assertEqual(mapped.get_location(section, option),
+                                 cfg.get_location(section, option))
+        for option in cfg.defaults():
+            self.assertTrue(mapped.has_option('DEFAULT', option))
+            self.assertEqual(mapped.get('DEFAULT', option),
+                             cfg.get('DEFAULT', option))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_export(self):
+        for track_locations in (True, 'lazy'):
+            cfg = configlines.ConfigParser(track_locations=track_locations)
+            cfg.read(self.paths)
+            cfg.read_string(u'[sectA]\nref = %(foo)s/x\n[été]\n'
+                            u'café = crème\n', 'string.cfg')
+            cfg.set('sectB', 'new', 'set')
+            cfg.export_mapped(self.path)
+            with MappedConfig(self.path) as mapped:
+                self.assertSameAsParser(mapped, cfg)
+
+        cfg = configlines.RawConfigParser(allow_no_value=True)
+        cfg.read_string(u'[s]\nflag\n')
+        cfg.overlay().export_mapped(self.path)
+        with MappedConfig(self.path) as mapped:
+            self.assertSameAsParser(mapped, cfg)
+            self.assertIsNone(mapped.get('s', 'flag'))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_lookups(self):
+        cfg = configlines.ConfigParser()
+        cfg.read_string(u'[DEFAULT]\nd = 1\n[s]\nA = %(missing)s\n')
+        cfg.export_mapped(self.path)
+        mapped = MappedConfig(self.path)
+        self.assertFalse(mapped.has_section('DEFAULT'))
+        self.assertFalse(mapped.has_section('t'))
+        self.assertFalse(mapped.has_option('s', 'b'))
+        self.assertFalse(mapped.has_option('t', 'd'))
+        self.assertTrue(mapped.has_option('', 'd'))
+        self.assertEqual(mapped.get('s', 'a', raw=True), '%(missing)s')
+        with self.assertRaises(configparser.InterpolationError):
+            mapped.get('s', 'a')
+        self.assertEqual(mapped.get('t', 'x', fallback=None), None)
+        with self.assertRaises(configparser.NoSectionError):
+            mapped.get('t', 'x')
+        with self.assertRaises(configparser.NoOptionError):
+            mapped.get('s', 'x')
+        with self.assertRaises(configparser.NoSectionError):
+            mapped.get_location('DEFAULT', 'd')
+        with self.assertRaises(configparser.NoSectionError):
+            mapped.options('DEFAULT')
+
+        # Other parsers' options are looked up as given
+        cfg = configlines.RawConfigParser()
+        cfg.optionxform = str
+        cfg.read_string(u'[s]\nA = 1\n')
+        cfg.export_mapped(self.path)
+        with MappedConfig(self.path) as mapped:
+            self.assertTrue(mapped.has_option('s', 'A'))
+            self.assertFalse(mapped.has_option('s', 'a'))
+        with MappedConfig(self.path, optionxform=str.upper) as mapped:
+            self.assertTrue(mapped.has_option('s', 'a'))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_replace(self):
+        cfg = configlines.ConfigParser()
+        cfg.read_string(u'[s]\na = 1\n')
+        cfg.export_mapped(self.path)
+        mapped = MappedConfig(self.path)
+        cfg.set('s', 'a', '2')
+        cfg.export_mapped(self.path)
+        # Attached processes keep the version they attached to
+        self.assertEqual(mapped.get('s', 'a'), '1')
+        self.assertEqual(MappedConfig(self.path).get('s', 'a'), '2')
+        self.assertEqual(os.listdir(self.tmp), ['config.map'])
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_errors(self):
+        with open(self.path, 'wb') as fp:
+            fp.write(b'[s]\na = 1\n')
+        with self.assertRaises(ValueError):
+            MappedConfig(self.path)
+
+        cfg = configlines.RawConfigParser()
+        cfg.read_string(u'[s]\na = 1\n')
+        cfg.set('s', 'a', 1)
+        with self.assertRaises(ValueError):
+            cfg.export_mapped(self.path)
+        self.assertEqual(os.listdir(self.tmp), ['config.map'])
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_paths(self):
+        # Path-like and bytes file names are stored as text
+        import pathlib
+        path1, path2 = self.paths[:2]
+        cfg = configlines.ConfigParser()
+        cfg.read([pathlib.Path(path1), os.fsencode(path2)])
+        self.assertEqual(cfg.get_location('foo', 'bar'),
+                         (pathlib.Path(path1), 2))
+        cfg.export_mapped(self.path)
+        with MappedConfig(self.path) as mapped:
+            self.assertEqual(mapped.get_location('foo', 'bar'), (path1, 2))
+            self.assertEqual(mapped.get_location('sectA', 'foo'), (path2, 2))
@@ -1,5 +1,12 @@
-from unittest import TestCase
+from unittest import TestCase, skipIf
+from collections import OrderedDict
+import copy
+import gc
+import os
+import pickle
+import shutil
 import sys
+import tempfile
 
 import six
 from six.moves import configparser
@@ -299,3 +306,1147 @@ class ConfigTest(TestCase):
         self.assertEqual(cfg.get_filename('qwerty', 'abc'), path)
         self.assertEqual(cfg.get_line('qwerty', 'abc'), 11)
 
+
+    def test_remove_empty_section(self):
+        cfg = configlines.ConfigParser()
+        cfg.add_section('foo')
+        self.assertTrue(cfg.remove_section('foo'))
+        self.assertFalse(cfg.has_section('foo'))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_shared_wrapper_types(self):
+        cfg1 = configlines.ConfigParser()
+        cfg2 = configlines.RawConfigParser()
+        cfg1.read_string(u'[foo]\nbar = 1\n')
+        cfg2.read_string(u'[foo]\nbar = 1\n')
+        self.assertIs(type(cfg1._sections), type(cfg2._sections))
+        self.assertIs(type(cfg1._sections['foo']), type(cfg2._defaults))
+
+        # Sections outliving their parser stop tracking quietly
+        section = cfg1._sections['foo']
+        del cfg1
+        gc.collect()
+        section['baz'] = '2'
+        del section['bar']
+
+    @skipIf(six.PY2, 'concurrent.futures is not available')
+    def test_parallel_read(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        paths = [resource_filename(__name__, name)
+                 for name in ('data2.cfg', 'missing.cfg', 'data3.cfg',
+                              'data1.cfg', 'data2.cfg')]
+        expected = configlines.ConfigParser()
+        expected_ok = expected.read(paths)
+
+        with ThreadPoolExecutor(3) as executor:
+            threaded = configlines.ConfigParser()
+            threaded_ok = threaded.read(paths, executor=executor)
+        processes = configlines.RawConfigParser()
+        processes_ok = processes.read(paths, workers=2)
+
+        for cfg, read_ok in ((threaded, threaded_ok),
+                             (processes, processes_ok)):
+            self.assertEqual(read_ok, expected_ok)
+            self.assertEqual(cfg.sections(), expected.sections())
+            for section in cfg.sections():
+                self.assertEqual(cfg.items(section, raw=True),
+                                 expected.items(section, raw=True))
+                for option in cfg.options(section):
+                    self.assertEqual(cfg.get_location(section, option),
+                                     expected.get_location(section, option))
+            self.assertEqual(cfg.get_location('sectA', 'bar'), (paths[4], 9))
+
+    @skipIf(six.PY2, 'concurrent.futures is not available')
+    def test_parallel_read_optionxform(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        paths = []
+        for i, text in enumerate(('[Sect]\nFooBar = 1\nOther = 2\n',
+                                  '[Sect]\nfoobar = 3\n')):
+            paths.append(os.path.join(tmpdir, '%d.cfg' % i))
+            with open(paths[-1], 'w') as fp:
+                fp.write(text)
+        expected = configlines.ConfigParser()
+        expected.optionxform = str
+        expected.read(paths)
+
+        # A lambda can't be sent to worker processes, so those files are
+        # read sequentially
+        for xform, kwargs in ((str, {'workers': 2}),
+                              (lambda option: option, {'workers': 2}),
+                              (str, {'executor': ThreadPoolExecutor(2)})):
+            cfg = configlines.ConfigParser()
+            cfg.optionxform = xform
+            cfg.read(paths, **kwargs)
+            executor = kwargs.get('executor')
+            if executor is not None:
+                executor.shutdown()
+            self.assertEqual(cfg.sections(), expected.sections())
+            for section in cfg.sections():
+                self.assertEqual(cfg.items(section, raw=True),
+                                 expected.items(section, raw=True))
+                for option in cfg.options(section):
+                    self.assertEqual(cfg.get_location(section, option),
+                                     expected.get_location(section, option))
+            self.assertEqual(cfg.options('Sect'),
+                             ['FooBar', 'Other', 'foobar'])
+
+    @skipIf(six.PY2, 'concurrent.futures is not available')
+    def test_parallel_read_errors(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        good = resource_filename(__name__, 'data2.cfg')
+        bad = resource_filename(__name__, 'data3.cfg')
+
+        class Picky(configlines.ConfigParser):
+            # A parser that chokes on data3.cfg
+            def optionxform(self, option):
+                if option == 'baz':
+                    raise ValueError(option)
+                return option.lower()
+
+        with ThreadPoolExecutor(2) as executor:
+            cfg = Picky()
+            with self.assertRaises(ValueError):
+                cfg.read([good, bad], executor=executor)
+        self.assertEqual(cfg.get_location('sectB', 'bar'), (good, 5))
+        self.assertEqual(cfg.options('sectA'), ['foo', 'bar'])
+
+
+@skipIf(six.PY2, 'asyncio is not available')
+class AsyncTest(TestCase):
+    def setUp(self):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.path1 = resource_filename(__name__, 'data1.cfg')
+        self.path2 = resource_filename(__name__, 'data2.cfg')
+
+    def tearDown(self):
+        import asyncio
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def run_async(self, *coroutines):
+        # The tasks are created here so that they start in the order given;
+        # gather() schedules bare coroutines in no particular order on some
+        # Pythons.
+        import asyncio
+        tasks = [asyncio.ensure_future(coroutine, loop=self.loop)
+                 for coroutine in coroutines]
+        return self.loop.run_until_complete(asyncio.gather(*tasks))
+
+    def test_read(self):
+        expected = configlines.ConfigParser()
+        expected.read([self.path1, self.path2])
+
+        cfg = configlines.ConfigParser()
+        read_ok, = self.run_async(cfg.read_async(
+            [self.path1, 'missing.cfg', self.path2]))
+        self.assertEqual(read_ok, [self.path1, self.path2])
+        for section in expected.sections():
+            for option in expected.options(section):
+                self.assertEqual(cfg.get(section, option),
+                                 expected.get(section, option))
+                self.assertEqual(cfg.get_location(section, option),
+                                 expected.get_location(section, option))
+        self.assertEqual(cfg.get_source('foo', 'bar'), [(2, 'bar = 1')])
+
+    def test_optionxform(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'case.cfg')
+        with open(path, 'w') as f:
+            f.write('[Sect]\nFooBar = 1\n')
+        cfg = configlines.ConfigParser()
+        cfg.optionxform = str
+        self.run_async(cfg.read_async([path]))
+        self.run_async(cfg.read_string_async(u'[Sect]\nOther = 2\n'))
+        self.assertEqual(cfg.options('Sect'), ['FooBar', 'Other'])
+        self.assertEqual(cfg.get_location('Sect', 'FooBar'), (path, 2))
+
+    def test_concurrent(self):
+        # Results are installed in the order the coroutines start running
+        cfg = configlines.ConfigParser()
+        self.run_async(cfg.read_async(self.path1),
+                       cfg.read_string_async(u'[foo]\nbar = 5\n', 'a.cfg'),
+                       cfg.read_file_async(six.StringIO(u'[foo]\n\nbar = 6\n'),
+                                           'b.cfg'))
+        self.assertEqual(cfg.get('foo', 'bar'), '6')
+        self.assertEqual(cfg.get_location('foo', 'bar'), ('b.cfg', 3))
+        self.assertEqual(cfg.get_location('foo', 'baz'), (self.path1, 3))
+        self.assertIsNone(cfg._curr_filename)
+
+        cfg.read_string(u'[foo]\nbar = 7\n', 'c.cfg')
+        self.assertEqual(cfg.get_location('foo', 'bar'), ('c.cfg', 2))
+
+    def test_errors(self):
+        cfg = configlines.ConfigParser()
+        cfg.read(self.path1)
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        bad = os.path.join(tmpdir, 'bad.cfg')
+        with open(bad, 'w') as f:
+            f.write('[x]\na = 1\na = 2\n')
+        with self.assertRaises(configparser.DuplicateOptionError):
+            self.run_async(cfg.read_async([self.path2, bad]))
+        with self.assertRaises(configparser.DuplicateOptionError):
+            self.run_async(cfg.read_string_async(u'[x]\na = 1\na = 2\n'))
+
+        # Nothing was applied
+        self.assertFalse(cfg.has_section('sectA'))
+        self.assertFalse(cfg.has_section('x'))
+        self.assertEqual(cfg.sections(), ['foo', 'qwerty'])
+
+        # Later calls aren't held up by the failures
+        self.run_async(cfg.read_async(self.path2))
+        self.assertEqual(cfg.get_location('sectA', 'bar'), (self.path2, 9))
+
+
+class ReloadTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.base = self.write('base.cfg', '[s]\na = 1\nb = 2\n')
+        self.override = self.write('override.cfg', '[s]\nb = 3\nc = 4\n')
+        self.cfg = configlines.ConfigParser()
+        self.cfg.read([self.base, self.override])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as fp:
+            fp.write(text)
+        # Make sure the change is visible even on coarse timestamps
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + len(text)))
+        return path
+
+    def test_unchanged(self):
+        self.assertEqual(self.cfg.reload_changed(), [])
+
+    def test_reload(self):
+        self.cfg.set('s', 'a', 'mine')
+        self.write('override.cfg', '[s]\n\nc = 5\nd = 6\na = 7\n[t]\n')
+        changes = self.cfg.reload_changed()
+
+        self.assertEqual(changes, [
+            configlines.LocationChange('s', 'b', (self.override, 2),
+                                       (self.base, 3)),
+            configlines.LocationChange('s', 'c', (self.override, 3),
+                                       (self.override, 3)),
+            configlines.LocationChange('s', 'd', None, (self.override, 4)),
+        ])
+        self.assertEqual(self.cfg.get('s', 'a'), 'mine')
+        self.assertIsNone(self.cfg.get_location('s', 'a'))
+        self.assertEqual(self.cfg.get('s', 'b'), '2')
+        self.assertEqual(self.cfg.get('s', 'c'), '5')
+        self.assertEqual(self.cfg.get('s', 'd'), '6')
+        self.assertTrue(self.cfg.has_section('t'))
+        self.assertEqual(self.cfg.reload_changed(), [])
+
+    def test_optionxform(self):
+        path = self.write('case.cfg', '[s]\nCase = 1\n')
+        cfg = configlines.ConfigParser()
+        cfg.optionxform = str
+        cfg.read(path)
+        self.write('case.cfg', '[s]\n\nCase = 2\n')
+        self.assertEqual(cfg.reload_changed(), [
+            configlines.LocationChange('s', 'Case', (path, 2), (path, 3)),
+        ])
+        self.assertEqual(dict(cfg.items('s', raw=True)), {'Case': '2'})
+
+    def test_shadowed_by_later_file(self):
+        self.write('base.cfg', '[s]\na = 10\nb = 20\n')
+        changes = self.cfg.reload_changed()
+        self.assertEqual(changes, [
+            configlines.LocationChange('s', 'a', (self.base, 2),
+                                       (self.base, 2)),
+        ])
+        self.assertEqual(self.cfg.get('s', 'a'), '10')
+        self.assertEqual(self.cfg.get('s', 'b'), '3')
+
+    def test_deleted(self):
+        os.remove(self.override)
+        changes = self.cfg.reload_changed()
+        self.assertEqual(changes, [
+            configlines.LocationChange('s', 'b', (self.override, 2),
+                                       (self.base, 3)),
+            configlines.LocationChange('s', 'c', (self.override, 3), None),
+        ])
+        self.assertFalse(self.cfg.has_option('s', 'c'))
+        self.assertEqual(self.cfg.reload_changed(), [])
+
+    def test_recreated(self):
+        os.remove(self.override)
+        self.cfg.reload_changed()
+        self.assertFalse(self.cfg.has_option('s', 'c'))
+        self.assertEqual(self.cfg.reload_changed(), [])
+
+        self.write('override.cfg', '[s]\nc = 2\n')
+        self.assertEqual(self.cfg.reload_changed(), [
+            configlines.LocationChange('s', 'c', None, (self.override, 2)),
+        ])
+        self.assertEqual(self.cfg.get('s', 'c'), '2')
+        self.assertEqual(self.cfg.reload_changed(), [])
+
+    def test_emptied_sections(self):
+        self.write('override.cfg', '[s]\nb = 3\n[t]\nx = 1\n[u]\ny = 2\n')
+        self.cfg.reload_changed()
+        self.cfg.add_section('mine')
+        self.assertEqual(self.cfg.sections(), ['s', 't', 'u', 'mine'])
+
+        self.write('override.cfg', '[s]\nb = 3\n[u]\n')
+        self.cfg.reload_changed()
+        fresh = configlines.ConfigParser()
+        fresh.read([self.base, self.override])
+        self.assertEqual(self.cfg.sections(), ['s', 'u', 'mine'])
+        self.assertEqual(fresh.sections(), ['s', 'u'])
+
+    def test_overlay(self):
+        tenant = self.write('tenant.cfg', '[s]\na = 5\n')
+        cfg = self.cfg.overlay()
+        cfg.read(tenant)
+        self.write('tenant.cfg', '[s]\n\nc = 7\n')
+        self.assertEqual(cfg.reload_changed(), [
+            configlines.LocationChange('s', 'a', (tenant, 2), (self.base, 2)),
+            configlines.LocationChange('s', 'c', None, (tenant, 3)),
+        ])
+        self.assertEqual(cfg.get('s', 'a'), '1')
+        self.assertEqual(cfg.get('s', 'c'), '7')
+        self.assertEqual(self.cfg.get('s', 'c'), '4')
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_errors(self):
+        self.write('override.cfg', '[s]\nb = 3\nb = 4\n')
+        with self.assertRaises(configparser.DuplicateOptionError):
+            self.cfg.reload_changed()
+        self.assertEqual(self.cfg.get('s', 'b'), '3')
+        self.assertEqual(self.cfg.get_location('s', 'b'), (self.override, 2))
+
+
+class SourceTest(TestCase):
+    def test_get_source(self):
+        path = resource_filename(__name__, 'data1.cfg')
+        for source_cache in (None, 2):
+            cfg = configlines.ConfigParser(source_cache=source_cache)
+            cfg.read(path)
+
+            self.assertEqual(cfg.get_source('foo', 'bar'), [(2, 'bar = 1')])
+            self.assertEqual(cfg.get_source('foo', 'baz', context=1),
+                             [(2, 'bar = 1'), (3, 'baz = 2'), (4, '')])
+            self.assertEqual(cfg.get_source('qwerty', 'abc'),
+                             [(11, 'abc = a split'), (12, ' line')])
+            self.assertEqual(cfg.get_source('qwerty', 'abc', context=2),
+                             [(9, ''), (10, ''), (11, 'abc = a split'),
+                              (12, ' line'), (13, '')])
+
+            cfg.set('foo', 'bar', 'x')
+            self.assertIsNone(cfg.get_source('foo', 'bar'))
+
+    def test_defaults(self):
+        path = resource_filename(__name__, 'data2.cfg')
+        cfg = configlines.ConfigParser(source_cache=1)
+        cfg.read(path)
+        self.assertEqual(cfg.get_source('sectA', 'bar'), [(9, 'bar = B')])
+
+    def test_changed(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            paths = []
+            for i in range(3):
+                paths.append(os.path.join(tmp, '%d.cfg' % i))
+                with open(paths[-1], 'w') as fp:
+                    fp.write('[s%d]\nfoo = 1\n  2\n# comment\n\nbar = 3\n' % i)
+
+            cfg = configlines.ConfigParser(source_cache=1)
+            cfg.read(paths)
+            # Evicted text is read again
+            for i in range(3):
+                self.assertEqual(cfg.get_source('s%d' % i, 'foo'),
+                                 [(2, 'foo = 1'), (3, '  2')])
+
+            with open(paths[0], 'a') as fp:
+                fp.write('baz = 4\n')
+            with self.assertRaises(configlines.SourceChangedError):
+                cfg.get_source('s0', 'foo')
+            # Unchanged files are still available
+            self.assertEqual(cfg.get_source('s1', 'bar'), [(6, 'bar = 3')])
+        finally:
+            shutil.rmtree(tmp)
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_comments(self):
+        # A comment ends the value where the parser does
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, 'comments.cfg')
+        with open(path, 'w') as fp:
+            fp.write('[s]\nfoo = 1\n# comment\n  bar = 2\n')
+
+        cfg = configlines.ConfigParser()
+        cfg.read(path)
+        self.assertEqual(cfg.get('s', 'foo'), '1\nbar = 2')
+        self.assertEqual(cfg.get_source('s', 'foo'),
+                         [(2, 'foo = 1'), (3, '# comment'), (4, '  bar = 2')])
+
+        cfg = configlines.ConfigParser(empty_lines_in_values=False)
+        cfg.read(path)
+        self.assertEqual(cfg.get('s', 'foo'), '1')
+        self.assertEqual(cfg.get_source('s', 'foo'), [(2, 'foo = 1')])
+        self.assertEqual(cfg.get_source('s', 'bar'), [(4, '  bar = 2')])
+
+
+class ReverseIndexTest(TestCase):
+    def test_lookup(self):
+        path1 = resource_filename(__name__, 'data1.cfg')
+        path2 = resource_filename(__name__, 'data2.cfg')
+        cfg = configlines.ConfigParser()
+        cfg.read([path1, path2])
+
+        self.assertIsNone(cfg.get_option_at(path1, 1))
+        self.assertEqual(cfg.get_option_at(path1, 2), ('foo', 'bar'))
+        self.assertEqual(cfg.get_option_at(path1, 3), ('foo', 'baz'))
+        self.assertEqual(cfg.get_option_at(path1, 12), ('qwerty', 'abc'))
+        self.assertEqual(cfg.get_option_at(path2, 9), ('DEFAULT', 'bar'))
+        self.assertIsNone(cfg.get_option_at('elsewhere.cfg', 9))
+
+        self.assertEqual(cfg.get_options_in(path1, 3, 11),
+                         [('foo', 'baz', 3), ('qwerty', 'abc', 11)])
+        self.assertEqual(cfg.get_options_in(path2, 1, 100),
+                         [('sectA', 'foo', 2), ('sectB', 'bar', 5),
+                          ('DEFAULT', 'foo', 8), ('DEFAULT', 'bar', 9)])
+
+    def test_updates(self):
+        path = resource_filename(__name__, 'data1.cfg')
+        cfg = configlines.ConfigParser()
+        cfg.read(path)
+        self.assertEqual(cfg.get_option_at(path, 3), ('foo', 'baz'))
+
+        # Built lazily, then maintained
+        cfg.set('foo', 'baz', 'x')
+        self.assertEqual(cfg.get_option_at(path, 3), ('foo', 'bar'))
+        cfg.set('foo', 'baz', 'y', location=(path, 3))
+        self.assertEqual(cfg.get_option_at(path, 3), ('foo', 'baz'))
+        cfg.set_location('foo', 'bar', ('other.cfg', 20))
+        self.assertEqual(cfg.get_option_at('other.cfg', 25), ('foo', 'bar'))
+        self.assertEqual(cfg.get_options_in(path, 1, 2), [])
+
+        cfg.remove_option('qwerty', 'abc')
+        self.assertEqual(cfg.get_options_in(path, 4, 100), [])
+        cfg.remove_section('foo')
+        self.assertIsNone(cfg.get_option_at('other.cfg', 25))
+
+        cfg.read(path)
+        self.assertEqual(cfg.get_options_in(path, 1, 100),
+                         [('foo', 'bar', 2), ('foo', 'baz', 3),
+                          ('qwerty', 'abc', 11)])
+
+
+class BulkLocationTest(TestCase):
+    def setUp(self):
+        self.path1 = resource_filename(__name__, 'data1.cfg')
+        self.path2 = resource_filename(__name__, 'data2.cfg')
+
+    def assertSameAsSingle(self, cfg):
+        expected = {}
+        for section in cfg.sections():
+            expected[section] = dict(
+                (option, cfg.get_location(section, option))
+                for option in cfg.options(section))
+        locations = cfg.get_locations()
+        self.assertEqual(dict((section, dict(view))
+                              for section, view in locations.items()),
+                         expected)
+        for section in cfg.sections():
+            self.assertEqual(dict(cfg.get_locations(section)),
+                             expected[section])
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_locations(self):
+        for track_locations in (True, 'lazy'):
+            cfg = configlines.ConfigParser(track_locations=track_locations)
+            cfg.read([self.path1, self.path2])
+            self.assertSameAsSingle(cfg)
+            self.assertEqual(cfg.get_locations('sectB'),
+                             {'bar': (self.path2, 5), 'foo': (self.path2, 8)})
+            with self.assertRaises(configparser.NoSectionError):
+                cfg.get_locations('nope')
+
+            cfg.set('sectB', 'bar', 'x')
+            cfg.set('DEFAULT', 'new', 'y', location=('elsewhere.cfg', 1))
+            cfg.set_location('foo', 'bar', ('elsewhere.cfg', 2))
+            cfg.remove_option('sectA', 'foo')
+            self.assertSameAsSingle(cfg)
+            cfg.remove_section('qwerty')
+            cfg.read_string(u'[sectA]\nfoo = 3\n', 'string.cfg')
+            self.assertSameAsSingle(cfg)
+
+    def test_views(self):
+        cfg = configlines.ConfigParser()
+        cfg.read([self.path1, self.path2])
+        view = cfg.get_locations('sectA')
+        if not six.PY2:
+            with self.assertRaises(TypeError):
+                view['foo'] = None
+        self.assertIs(cfg.get_locations('sectA'), view)
+        self.assertIs(cfg.get_locations()['sectA'], view)
+
+        # Only views of changed sections are dropped
+        cfg.set('sectB', 'baz', 'x')
+        self.assertIs(cfg.get_locations('sectA'), view)
+        self.assertIsNone(cfg.get_locations('sectB')['baz'])
+        cfg.set('DEFAULT', 'bar', 'x')
+        self.assertIsNot(cfg.get_locations('sectA'), view)
+        self.assertIsNone(cfg.get_locations('sectA')['bar'])
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_overlay(self):
+        base = configlines.ConfigParser()
+        base.read([self.path1, self.path2])
+        cfg = base.overlay()
+        cfg.read_string(u'[sectA]\nbar = 1\n', 'tenant.cfg')
+        self.assertSameAsSingle(cfg)
+        base.set('sectA', 'new', '3', location=('base.cfg', 1))
+        self.assertEqual(cfg.get_locations('sectA')['new'], ('base.cfg', 1))
+        self.assertSameAsSingle(cfg)
+
+
+class DigestTest(TestCase):
+    TEXT = (u'[DEFAULT]\n'
+            u'shared = 1\n'
+            u'[a]\n'
+            u'x = 1\n'
+            u'y = 2\n'
+            u'[b]\n'
+            u'z = 3\n')
+
+    def parser(self, text=TEXT, source='golden.cfg', **kwargs):
+        cfg = configlines.ConfigParser(**kwargs)
+        cfg.read_string(text, source)
+        return cfg
+
+    def assertFresh(self, cfg):
+        # Cached digests must match those of a parser read from scratch
+        fresh = configlines.RawConfigParser()
+        fresh.read_dict(dict((name, dict(cfg._sections[name]))
+                             for name in cfg.sections()))
+        fresh.read_dict({'DEFAULT': cfg.defaults()})
+        self.assertEqual(cfg.section_digests(), fresh.section_digests())
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_digests(self):
+        golden = self.parser()
+        digests = golden.section_digests()
+        self.assertEqual(sorted(digests), ['DEFAULT', 'a', 'b'])
+        reordered = self.parser(u'[b]\nz = 3\n[a]\ny = 2\nx = 1\n'
+                                u'[DEFAULT]\nshared = 1\n', 'host.cfg')
+        self.assertEqual(reordered.section_digests(), digests)
+        self.assertEqual(golden.diff(reordered), [])
+
+        for track_locations in (True, 'lazy'):
+            cfg = self.parser(track_locations=track_locations)
+            cfg.section_digests()
+            cfg.set('a', 'x', '5')
+            self.assertFresh(cfg)
+            cfg.set('DEFAULT', 'shared', '2')
+            cfg.remove_option('b', 'z')
+            self.assertFresh(cfg)
+            cfg.remove_section('a')
+            cfg.read_string(u'[a]\nnew = 1\n[c]\n')
+            self.assertFresh(cfg)
+            self.assertNotEqual(cfg.section_digests()['b'], digests['b'])
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_incremental(self):
+        cfg = self.parser()
+        cfg.section_digests()
+        cfg.set('a', 'x', '5')
+        self.assertEqual(sorted(cfg._digests), ['DEFAULT', 'b'])
+        # Other sections don't include DEFAULT, so they keep their digests
+        cfg.set('DEFAULT', 'shared', '2')
+        self.assertEqual(sorted(cfg._digests), ['b'])
+        self.assertEqual(copy.copy(cfg)._digests, cfg._digests)
+
+        base = self.parser()
+        overlay = base.overlay()
+        overlay.section_digests()
+        self.assertEqual(overlay._digests, {})
+        base.set('a', 'x', '5')
+        self.assertEqual(overlay.section_digests(), base.section_digests())
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_diff(self):
+        golden = self.parser()
+        host = self.parser(u'[DEFAULT]\n'
+                           u'shared = 2\n'
+                           u'[a]\n'
+                           u'y = 2\n'
+                           u'x = 1\n'
+                           u'w = 0\n'
+                           u'[c]\n', 'host.cfg')
+        self.assertEqual(golden.diff(host), [
+            ('DEFAULT', 'shared', '1', '2', ('golden.cfg', 2),
+             ('host.cfg', 2)),
+            ('a', 'w', None, '0', None, ('host.cfg', 6)),
+            ('b', 'z', '3', None, ('golden.cfg', 7), None),
+        ])
+        self.assertEqual(host.diff(golden)[1],
+                         ('a', 'w', '0', None, ('host.cfg', 6), None))
+
+        # Section 'c' is empty, so only its digest tells it apart
+        self.assertEqual([diff.section for diff in golden.diff(host)],
+                         ['DEFAULT', 'a', 'b'])
+        shipped = host.section_digests()
+        self.assertEqual(golden.diff(shipped), [
+            configlines.ConfigDifference(name, None, None, None, None, None)
+            for name in ('DEFAULT', 'a', 'b', 'c')])
+
+
+class StatsTest(TestCase):
+    def setUp(self):
+        self.paths = [resource_filename(__name__, name)
+                      for name in ('data1.cfg', 'data2.cfg')]
+
+    def test_stats(self):
+        events = []
+        cfg = configlines.ConfigParser()
+        self.assertEqual(cfg.stats()['reads'], 0)
+        cfg.enable_stats(events.append)
+        cfg.read(self.paths)
+        cfg.set('sectA', 'new', '1')
+        cfg.remove_option('sectA', 'new')
+        cfg.remove_section('sectB')
+
+        stats = cfg.stats()
+        self.assertEqual(stats['reads'], 2)
+        self.assertEqual(stats['files'][self.paths[0]]['lines'], 13)
+        self.assertEqual(stats['lines'], 22)
+        # Python 3 joins the values of every section after each file, so
+        # reading the second file stores the options of the first once more.
+        joined = 0 if six.PY2 else 3
+        self.assertEqual(stats['hooks'], {'set': 15 + joined, 'remove': 1,
+                                          'remove_section': 1, 'bulk': 0})
+        self.assertGreater(stats['read_seconds'], 0)
+        self.assertGreater(stats['location_bytes'], 0)
+        self.assertEqual([event[:1] + event[2:] for event in events],
+                         [(self.paths[0], 13, 6),
+                          (self.paths[1], 9, 8 + joined)])
+        self.assertIsInstance(events[0], configlines.ReadStats)
+
+    @skipIf(six.PY2, 'the fast engine needs Python 3')
+    def test_bulk(self):
+        # Whatever the dict type, bulk stores don't go through the hooks
+        for dict_type in (dict, OrderedDict):
+            cfg = configlines.ConfigParser(engine='fast', source_cache=True,
+                                           dict_type=dict_type)
+            cfg.enable_stats()
+            cfg.read(self.paths)
+            stats = cfg.stats()
+            self.assertEqual(stats['lines'], 22)
+            self.assertEqual(stats['hooks']['bulk'], 7)
+            self.assertEqual(stats['hooks']['set'], 0)
+            self.assertEqual(cfg.get_source('sectB', 'foo'),
+                             [(8, 'foo = A')])
+            self.assertEqual(cfg.get_location('sectB', 'foo'),
+                             (self.paths[1], 8))
+
+    def test_disabled(self):
+        # Nothing is replaced until stats are enabled, or once disabled
+        cfg = configlines.ConfigParser()
+        before = set(cfg.__dict__)
+        cfg.enable_stats()
+        self.assertIn('_track_set', cfg.__dict__)
+        cfg.read(self.paths)
+        cfg.disable_stats()
+        self.assertEqual(set(cfg.__dict__) - before, set(['_fp_wrapper']))
+        self.assertIs(cfg._fp_wrapper, type(cfg)._fp_wrapper)
+        cfg.read(self.paths)
+        self.assertEqual(cfg.stats()['reads'], 2)
+
+        # Copies aren't instrumented
+        cfg.enable_stats()
+        for clone in (copy.copy(cfg), pickle.loads(pickle.dumps(cfg))):
+            self.assertNotIn('_read', clone.__dict__)
+            self.assertEqual(clone.stats()['reads'], 0)
+
+
+class InterpolationTest(TestCase):
+    TEXT = (u'[DEFAULT]\n'
+            u'base = /opt\n'
+            u'[paths]\n'
+            u'root = /srv\n'
+            u'logs = %(root)s/logs\n'
+            u'[app]\n'
+            u'dir = %(base)s/app\n'
+            u'log = %(dir)s/log\n')
+
+    def setUp(self):
+        self.cfg = configlines.ConfigParser()
+        self.cfg.read_string(self.TEXT, 'a.cfg')
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_chain(self):
+        cfg = self.cfg
+        self.assertEqual(cfg.get_location_chain('paths', 'logs'), [
+            ('paths', 'logs', ('a.cfg', 5)),
+            ('paths', 'root', ('a.cfg', 4)),
+        ])
+        self.assertEqual(cfg.get_location_chain('app', 'LOG'), [
+            ('app', 'log', ('a.cfg', 8)),
+            ('app', 'dir', ('a.cfg', 7)),
+            ('DEFAULT', 'base', ('a.cfg', 2)),
+        ])
+        self.assertEqual(cfg.get_location_chain('paths', 'base'), [
+            ('DEFAULT', 'base', ('a.cfg', 2)),
+        ])
+        cfg.set('paths', 'root', '%(base)s/srv')
+        self.assertEqual(cfg.get_location_chain('paths', 'logs'), [
+            ('paths', 'logs', ('a.cfg', 5)),
+            ('paths', 'root', None),
+            ('DEFAULT', 'base', ('a.cfg', 2)),
+        ])
+        with self.assertRaises(configparser.NoOptionError):
+            cfg.get_location_chain('paths', 'nope')
+        cfg.set('paths', 'bad', '%(nope)s')
+        with self.assertRaises(configparser.InterpolationMissingOptionError):
+            cfg.get_location_chain('paths', 'bad')
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_cache(self):
+        cfg = self.cfg
+        values = cfg._interpolated.values
+        self.assertEqual(cfg.get('paths', 'logs'), '/srv/logs')
+        self.assertEqual(cfg.get('app', 'log'), '/opt/app/log')
+        self.assertEqual(cfg['app']['dir'], '/opt/app')
+        self.assertEqual(values[('paths', 'logs')], '/srv/logs')
+        self.assertEqual(len(values), 3)
+
+        # Only values that depend on a changed option are dropped
+        cfg.set('paths', 'root', '/data')
+        self.assertNotIn(('paths', 'logs'), values)
+        self.assertEqual(len(values), 2)
+        self.assertEqual(cfg.get('paths', 'logs'), '/data/logs')
+        cfg.read_string(u'[app]\ndir = /usr\n', 'b.cfg')
+        self.assertEqual(sorted(values), [('paths', 'logs')])
+        self.assertEqual(cfg.get('app', 'log'), '/usr/log')
+
+        # Through DEFAULT, including options that start shadowing it
+        cfg.set('app', 'dir', '%(base)s/app')
+        self.assertEqual(cfg.get('app', 'log'), '/opt/app/log')
+        cfg.set('DEFAULT', 'base', '/home')
+        self.assertEqual(sorted(values), [('paths', 'logs')])
+        self.assertEqual(cfg.get('app', 'log'), '/home/app/log')
+        cfg.set('app', 'base', '/root')
+        self.assertEqual(cfg.get('app', 'log'), '/root/app/log')
+        cfg.remove_option('app', 'base')
+        self.assertEqual(cfg.get('app', 'log'), '/home/app/log')
+        cfg.remove_section('app')
+        self.assertEqual(sorted(values), [('paths', 'logs')])
+
+        # Only plain lookups are cached
+        self.assertEqual(cfg.get('paths', 'nope', fallback='x'), 'x')
+        self.assertEqual(cfg.get('paths', 'logs', raw=True), '%(root)s/logs')
+        self.assertEqual(cfg.get('paths', 'logs', vars={'root': '/v'}),
+                         '/v/logs')
+        self.assertEqual(sorted(values), [('paths', 'logs')])
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_extended(self):
+        cfg = configlines.ConfigParser(
+            interpolation=configparser.ExtendedInterpolation())
+        cfg.read_string(u'[a]\nx = ${b:y}/z\n[b]\ny = ${c:w}\n[c]\nw = 1\n'
+                        u'[d]\nv = 2\n', 'a.cfg')
+        self.assertEqual(cfg.get('a', 'x'), '1/z')
+        self.assertEqual(cfg.get('d', 'v'), '2')
+        self.assertEqual(cfg.get_location_chain('a', 'x'), [
+            ('a', 'x', ('a.cfg', 2)),
+            ('b', 'y', ('a.cfg', 4)),
+            ('c', 'w', ('a.cfg', 6)),
+        ])
+        cfg.set('c', 'w', '3')
+        self.assertEqual(sorted(cfg._interpolated.values), [('d', 'v')])
+        self.assertEqual(cfg.get('a', 'x'), '3/z')
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_uncached(self):
+        raw = configlines.RawConfigParser()
+        base = configlines.ConfigParser()
+        lazy = configlines.ConfigParser(track_locations='lazy')
+        for cfg in (raw, base, lazy):
+            cfg.read_string(self.TEXT, 'a.cfg')
+        overlay = base.overlay()
+        self.assertIsNone(raw._interpolated)
+        self.assertIsNone(overlay._interpolated)
+
+        self.assertEqual(raw.get_location_chain('paths', 'logs'),
+                         [('paths', 'logs', ('a.cfg', 5))])
+        for cfg in (lazy, overlay):
+            self.assertEqual(cfg.get_location_chain('app', 'log'), [
+                ('app', 'log', ('a.cfg', 8)),
+                ('app', 'dir', ('a.cfg', 7)),
+                ('DEFAULT', 'base', ('a.cfg', 2)),
+            ])
+
+        base.set('DEFAULT', 'base', '/home')
+        self.assertEqual(overlay.get('app', 'log'), '/home/app/log')
+        lazy.read_string(u'[DEFAULT]\nbase = /home\n', 'b.cfg')
+        self.assertEqual(lazy.get('app', 'log'), '/home/app/log')
+        lazy.set('app', 'dir', '/usr')
+        self.assertEqual(lazy.get('app', 'log'), '/usr/log')
+
+
+class HistoryTest(TestCase):
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_history(self):
+        path1 = resource_filename(__name__, 'data2.cfg')
+        path2 = resource_filename(__name__, 'data3.cfg')
+        path3 = resource_filename(__name__, 'data1.cfg')
+        cfg = configlines.ConfigParser(track_history=True)
+        cfg.read([path1, path2])
+        cfg.read_string(u'[sectA]\nfoo = 2\n\nbaz = 4\n', 'override.cfg')
+
+        self.assertEqual(cfg.get_location_history('sectA', 'foo'),
+                         [(path1, 2), ('override.cfg', 2)])
+        self.assertEqual(cfg.get_location_history('sectA', 'baz'),
+                         [(path2, 2), ('override.cfg', 4)])
+        self.assertEqual(cfg.get_location_history('sectB', 'foo'),
+                         [(path1, 8)])
+
+        cfg.set('sectA', 'foo', '3')
+        cfg.set('sectA', 'foo', '4', location='preserve')
+        cfg.set_location('sectA', 'foo', ('somewhere', 'else'))
+        cfg.read(path1)
+        self.assertEqual(cfg.get_location_history('sectA', 'FOO'),
+                         [(path1, 2), ('override.cfg', 2),
+                          ('somewhere', 'else'), (path1, 2)])
+
+        cfg.read(path3)
+        cfg.remove_section('foo')
+        cfg.read(path3)
+        self.assertEqual(cfg.get_location_history('foo', 'bar'),
+                         [(path3, 2), (path3, 2)])
+
+        # Preserving a location doesn't log it again
+        cfg.set('foo', 'bar', 'x', location='preserve')
+        self.assertEqual(cfg.get_location('foo', 'bar'), (path3, 2))
+        self.assertEqual(cfg.get_location_history('foo', 'bar'),
+                         [(path3, 2), (path3, 2)])
+        cfg.set_location('foo', 'baz', ('somewhere', 'else'))
+        cfg.set('foo', 'baz', 'y', location='preserve')
+        self.assertEqual(cfg.get_location_history('foo', 'baz'),
+                         [(path3, 3), (path3, 3), ('somewhere', 'else')])
+
+        with self.assertRaises(configparser.NoOptionError):
+            cfg.get_location_history('sectA', 'nope')
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_disabled(self):
+        cfg = configlines.ConfigParser()
+        cfg.read_string(u'[foo]\nbar = 1\n')
+        self.assertIsNone(cfg.get_location_history('foo', 'bar'))
+
+
+class LazyTest(TestCase):
+    def setUp(self):
+        self.paths = [resource_filename(__name__, name)
+                      for name in ('data1.cfg', 'data2.cfg', 'data3.cfg')]
+
+    def locations(self, cfg):
+        return dict(((section, option), cfg.get_location(section, option))
+                    for section in cfg.sections()
+                    for option in cfg.options(section))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_same_as_eager(self):
+        eager = configlines.ConfigParser()
+        lazy = configlines.ConfigParser(track_locations='lazy')
+        for cfg in (eager, lazy):
+            cfg.read(self.paths[:2])
+            cfg.set('foo', 'bar', 'x')
+            cfg.set('foo', 'baz', 'y', location='preserve')
+            cfg.remove_option('sectA', 'foo')
+            cfg.read_string(u'[sectB]\n\nnew = 1\n', 'string.cfg')
+            cfg.set_location('sectB', 'new', ('elsewhere', 7))
+            cfg.remove_section('qwerty')
+            cfg.read(self.paths)
+
+        self.assertEqual(self.locations(lazy), self.locations(eager))
+        self.assertEqual(lazy.get_location('sectA', 'foo'),
+                         (self.paths[1], 2))
+        self.assertEqual(lazy.get_location('sectB', 'new'), ('elsewhere', 7))
+        self.assertEqual(lazy.get_option_at(self.paths[2], 2),
+                         ('sectA', 'baz'))
+
+        # Changes after resolving are applied directly
+        for cfg in (eager, lazy):
+            cfg.set('sectA', 'baz', 'z')
+            cfg.remove_option('sectB', 'bar')
+        self.assertEqual(self.locations(lazy), self.locations(eager))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_optionxform(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, 'case.cfg')
+        with open(path, 'w') as fp:
+            fp.write('[Sec]\nFooBar = 1\n')
+        cfg = configlines.ConfigParser(track_locations='lazy')
+        cfg.optionxform = str
+        cfg.read(path)
+        cfg.read_string(u'[Sec]\nOther = 2\n', 'string.cfg')
+        self.assertEqual(cfg.get_location('Sec', 'FooBar'), (path, 2))
+        self.assertEqual(cfg.get_location('Sec', 'Other'), ('string.cfg', 2))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_partly_read(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        path = os.path.join(tmp, 'a.cfg')
+        with open(path, 'w') as fp:
+            fp.write('[hdr]\nx = 0\n[s]\nx = 1\n')
+        for track_locations in (True, 'lazy'):
+            cfg = configlines.ConfigParser(track_locations=track_locations)
+            with open(path) as fp:
+                fp.readline()
+                fp.readline()
+                cfg.read_file(fp)
+            self.assertEqual(cfg.get_location('s', 'x'), (path, 2))
+            self.assertEqual(cfg.get_option_at(path, 2), ('s', 'x'))
+            self.assertFalse(cfg.has_section('hdr'))
+
+    def test_defaults(self):
+        cfg = configlines.ConfigParser(track_locations='lazy')
+        cfg.read(self.paths[1])
+        self.assertEqual(cfg.get_location('sectA', 'bar'), (self.paths[1], 9))
+        cfg.set('DEFAULT', 'bar', 'C')
+        self.assertIsNone(cfg.get_location('sectA', 'bar'))
+
+    def test_changed(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'test.cfg')
+            with open(path, 'w') as fp:
+                fp.write('[s]\na = 1\n')
+            cfg = configlines.ConfigParser(track_locations='lazy')
+            cfg.read(path)
+            self.assertEqual(len(cfg._option_lines), 0)
+
+            with open(path, 'w') as fp:
+                fp.write('[s]\n\na = 1\nb = 2\n')
+            with self.assertRaises(configlines.SourceChangedError) as cm:
+                cfg.get_location('s', 'a')
+            self.assertEqual(cm.exception.filename, path)
+
+            cfg = configlines.ConfigParser(track_locations='lazy')
+            cfg.read(path)
+            self.assertEqual(cfg.get_location('s', 'b'), (path, 4))
+            # Once scanned, locations don't depend on the file anymore
+            os.remove(path)
+            self.assertEqual(cfg.get_location('s', 'a'), (path, 3))
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            configlines.ConfigParser(track_locations='lazy',
+                                     track_history=True)
+        with self.assertRaises(ValueError):
+            configlines.ConfigParser(track_locations='sometimes')
+        cfg = configlines.ConfigParser(track_locations='lazy')
+        with self.assertRaises(ValueError):
+            cfg.reload_changed()
+
+
+class CopyTest(TestCase):
+    def setUp(self):
+        self.path = resource_filename(__name__, 'data1.cfg')
+
+    def parser(self, **kwargs):
+        cfg = configlines.ConfigParser(**kwargs)
+        cfg.read(self.path)
+        cfg.set('foo', 'baz', 'x', location=('elsewhere', 'line 5'))
+        return cfg
+
+    def check(self, cfg):
+        self.assertEqual(cfg.get('foo', 'bar'), '1')
+        self.assertEqual(cfg.get_location('foo', 'bar'), (self.path, 2))
+        self.assertEqual(cfg.get_location('foo', 'baz'),
+                         ('elsewhere', 'line 5'))
+        self.assertEqual(cfg.get_location('qwerty', 'abc'), (self.path, 11))
+        # Changes are still tracked
+        cfg.set('foo', 'bar', '2')
+        self.assertIsNone(cfg.get_location('foo', 'bar'))
+
+    def variants(self):
+        # Parsers using each of the helpers that end up in their state
+        yield self.parser()
+        yield self.parser(track_locations='lazy')
+        cfg = self.parser(track_history=True)
+        cfg.get_option_at(self.path, 2)
+        yield cfg
+
+    def test_pickle(self):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            for cfg in self.variants():
+                self.check(pickle.loads(pickle.dumps(cfg, protocol)))
+
+    def test_converters(self):
+        if sys.hexversion < 0x03050000:
+            return
+        cfg = self.parser(converters={'list': str.split})
+        clone = pickle.loads(pickle.dumps(cfg))
+        self.assertEqual(clone.getlist('qwerty', 'abc'),
+                         ['a', 'split', 'line'])
+        self.assertEqual(clone['qwerty'].getlist('abc'),
+                         ['a', 'split', 'line'])
+        self.assertFalse(hasattr(clone['foo'], 'get_location'))
+
+    def test_copy(self):
+        for copier in (copy.copy, copy.deepcopy):
+            for cfg in self.variants():
+                clone = copier(cfg)
+                self.check(clone)
+                clone.remove_section('qwerty')
+                self.assertEqual(cfg.get_location('foo', 'bar'),
+                                 (self.path, 2))
+                self.assertEqual(cfg.get_location('qwerty', 'abc'),
+                                 (self.path, 11))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_snapshot(self):
+        data = self.parser().snapshot()
+        for kwargs in ({}, {'track_history': True},
+                       {'track_locations': 'lazy'}):
+            cfg = configlines.ConfigParser(**kwargs)
+            cfg.read_string(u'[foo]\nbar = 0\nnew = 1\n', 'first.cfg')
+            cfg.load_snapshot(data)
+            self.assertEqual(cfg.get('foo', 'new'), '1')
+            self.assertEqual(cfg.get_location('foo', 'new'), ('first.cfg', 3))
+            self.check(cfg)
+            self.assertEqual(cfg.get_source('qwerty', 'abc'),
+                             [(11, 'abc = a split'), (12, ' line')])
+
+        with self.assertRaises(ValueError):
+            cfg.load_snapshot(b'not a snapshot')
+
+
+class OverlayTest(TestCase):
+    def setUp(self):
+        self.path1 = resource_filename(__name__, 'data1.cfg')
+        self.path2 = resource_filename(__name__, 'data2.cfg')
+        self.base = configlines.ConfigParser()
+        self.base.read([self.path1, self.path2])
+        self.cfg = self.base.overlay()
+        self.cfg.read_string(u'[foo]\nbar = 9\n\n[new]\nx = 1\n'
+                             u'[DEFAULT]\nfoo = Z\n', 'tenant.cfg')
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_layers(self):
+        cfg = self.cfg
+        self.assertEqual(cfg.get('foo', 'bar'), '9')
+        self.assertEqual(cfg.get_location('foo', 'bar'), ('tenant.cfg', 2))
+        self.assertEqual(cfg.get('foo', 'baz'), '2')
+        self.assertEqual(cfg.get_location('foo', 'baz'), (self.path1, 3))
+        self.assertEqual(cfg.get_location('new', 'x'), ('tenant.cfg', 5))
+        self.assertEqual(cfg.sections(),
+                         ['foo', 'qwerty', 'sectA', 'sectB', 'new'])
+
+        # DEFAULT fallback goes through the layers too
+        self.assertEqual(cfg.get('sectB', 'foo'), 'Z')
+        self.assertEqual(cfg.get_location('sectB', 'foo'), ('tenant.cfg', 7))
+        self.assertEqual(cfg.get_location('sectA', 'foo'), (self.path2, 2))
+        self.assertEqual(cfg.get_location('sectA', 'bar'), (self.path2, 9))
+        self.assertEqual(cfg.get_source('sectA', 'bar'), [(9, 'bar = B')])
+
+        # The base is unchanged
+        self.assertEqual(self.base.get('foo', 'bar'), '1')
+        self.assertEqual(self.base.get_location('sectB', 'foo'),
+                         (self.path2, 8))
+        self.assertFalse(self.base.has_section('new'))
+        self.assertEqual(len(self.base._option_lines['foo']), 2)
+        self.assertNotIn('qwerty', cfg._option_lines)
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_changes(self):
+        cfg = self.cfg
+        cfg.set('foo', 'baz', 'x')
+        self.assertIsNone(cfg.get_location('foo', 'baz'))
+        cfg.set('sectA', 'foo', 'y', location='preserve')
+        self.assertEqual(cfg.get_location('sectA', 'foo'), (self.path2, 2))
+
+        # Removed options don't fall back to the base's value
+        cfg.remove_option('sectB', 'bar')
+        self.assertEqual(cfg.get('sectB', 'bar'), 'B')
+        self.assertEqual(cfg.get_location('sectB', 'bar'), (self.path2, 9))
+        cfg.set('DEFAULT', 'bar', 'C')
+        self.assertEqual(cfg.get('sectB', 'bar'), 'C')
+        self.assertIsNone(cfg.get_location('sectB', 'bar'))
+        cfg.remove_option('foo', 'baz')
+        self.assertFalse(cfg.has_option('foo', 'baz'))
+
+        cfg.remove_section('qwerty')
+        self.assertFalse(cfg.has_section('qwerty'))
+        cfg.add_section('qwerty')
+        self.assertEqual(cfg.options('qwerty'), ['foo', 'bar'])
+        if sys.hexversion >= 0x03020000:
+            self.assertEqual(dict(cfg['foo']), {'bar': '9', 'foo': 'Z'})
+
+        self.assertEqual(self.base.get('foo', 'baz'), '2')
+        self.assertEqual(self.base.get('sectB', 'bar'), '2')
+        self.assertTrue(self.base.has_option('qwerty', 'abc'))
+
+        # Later changes to the base show through
+        self.base.set('sectB', 'new', 'value')
+        self.assertEqual(cfg.get('sectB', 'new'), 'value')
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_standalone(self):
+        for clone in (pickle.loads(pickle.dumps(self.cfg)),
+                      copy.copy(self.cfg)):
+            self.assertIsNone(clone._base)
+            self.assertEqual(clone.get_location('foo', 'bar'),
+                             ('tenant.cfg', 2))
+            self.assertEqual(clone.get_location('foo', 'baz'),
+                             (self.path1, 3))
+            self.assertEqual(clone.get_location('sectB', 'foo'),
+                             ('tenant.cfg', 7))
+
+        cfg = configlines.ConfigParser()
+        cfg.load_snapshot(self.cfg.snapshot())
+        self.assertEqual(cfg.get_location('sectA', 'bar'), (self.path2, 9))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_optionxform(self):
+        base = configlines.ConfigParser()
+        base.optionxform = str
+        base.read_string(u'[foo]\nBase = 1\n', 'base.cfg')
+        cfg = base.overlay()
+        cfg.read_string(u'[foo]\nMixed = 2\n', 'tenant.cfg')
+        self.assertEqual(cfg.options('foo'), ['Base', 'Mixed'])
+        self.assertEqual(cfg.get_location('foo', 'Mixed'), ('tenant.cfg', 2))
+        self.assertEqual(base.options('foo'), ['Base'])
+
+        for clone in (pickle.loads(pickle.dumps(cfg)), copy.copy(cfg)):
+            clone.read_string(u'[foo]\nMore = 3\n', 'clone.cfg')
+            self.assertEqual(clone.options('foo'), ['Base', 'Mixed', 'More'])
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_subclass(self):
+        class Parser(configlines.ConfigParser):
+            def __init__(self, *args, **kwargs):
+                configlines.ConfigParser.__init__(self, *args, **kwargs)
+                self.environment = {'name': 'test'}
+                self._private = True
+
+        base = Parser()
+        base.read(self.path1)
+        for cfg in (base.overlay(), copy.copy(base.overlay())):
+            self.assertIsInstance(cfg, Parser)
+            self.assertIs(cfg.environment, base.environment)
+            self.assertFalse(hasattr(cfg, '_private'))
+            self.assertEqual(cfg.get('foo', 'bar'), '1')
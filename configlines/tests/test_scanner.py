@@ -0,0 +1,93 @@
+from unittest import TestCase, skipIf
+
+import six
+from six.moves import configparser
+from pkg_resources import resource_filename
+
+import configlines
+from configlines import ScannedOption, iter_options
+
+
+TRICKY = u'''\
+# comment
+[DEFAULT]
+shared = 0
+
+[First]
+Multi = line one
+    line two
+
+    line four
+; comment
+plain: 1 ; not a comment
+empty =
+trailing = x
+
+[second]
+ indented = 1
+   continued
+'''
+
+
+class ScannerTest(TestCase):
+    def assertSameAsParser(self, text, **kwargs):
+        cfg = configlines.RawConfigParser(**kwargs)
+        cfg.read_string(text, 'test.cfg')
+        scanned = list(iter_options(six.StringIO(text), source='test.cfg',
+                                    parser=cfg))
+        expected = set()
+        for section in [cfg.default_section] + cfg.sections():
+            if section == cfg.default_section:
+                options = cfg.defaults()
+            else:
+                options = cfg._sections[section]
+            for option, value in options.items():
+                filename, lineno = cfg._option_lines[section][option]
+                expected.add(ScannedOption(section, option, value, filename,
+                                           lineno))
+        self.assertEqual(set(scanned), expected)
+        self.assertEqual(len(scanned), len(expected))
+        return scanned
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_files(self):
+        for name in ('data1.cfg', 'data2.cfg', 'data3.cfg'):
+            path = resource_filename(__name__, name)
+            cfg = configlines.RawConfigParser()
+            cfg.read(path)
+            for section, option, value, filename, lineno in iter_options(path):
+                self.assertEqual(filename, path)
+                self.assertEqual(cfg._option_lines[section][option],
+                                 (path, lineno))
+                self.assertEqual(cfg.get(section, option, raw=True), value)
+
+    def test_text(self):
+        # Option names are lowercased whatever the type of the text
+        for text in (u'[S]\nFooBar = 1\n', '[S]\nFooBar = 1\n'):
+            self.assertEqual(list(iter_options(six.StringIO(text), source='x')),
+                             [ScannedOption('S', 'foobar', '1', 'x', 2)])
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_syntax(self):
+        scanned = self.assertSameAsParser(TRICKY)
+        self.assertEqual(scanned[:2], [
+            ('DEFAULT', 'shared', '0', 'test.cfg', 3),
+            ('First', 'multi', 'line one\nline two\n\nline four',
+             'test.cfg', 6),
+        ])
+        self.assertSameAsParser(TRICKY.replace(u'\n    line four', u''),
+                                empty_lines_in_values=False,
+                                inline_comment_prefixes=(';',))
+        self.assertSameAsParser(u'[s]\na -> 1\nb\n', delimiters=('->',),
+                                allow_no_value=True)
+
+    def test_errors(self):
+        with self.assertRaises(configparser.MissingSectionHeaderError):
+            list(iter_options(six.StringIO(u'a = 1\n')))
+
+        scanned = []
+        with self.assertRaises(configparser.ParsingError) as cm:
+            for option in iter_options(six.StringIO(u'[s]\na = 1\nb\nc = 2\n')):
+                scanned.append(option.option)
+        self.assertEqual(scanned, ['a', 'c'])
+        self.assertEqual(cm.exception.errors, [(3, repr(u'b\n'))])
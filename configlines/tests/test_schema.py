@@ -0,0 +1,131 @@
+from unittest import TestCase, skipIf
+
+import six
+from six.moves import configparser
+
+import configlines
+from configlines import Option, Schema, SchemaError, SchemaViolation
+
+
+TEXT = (u'[DEFAULT]\n'
+        u'timeout = 5\n'
+        u'[server]\n'
+        u'Port = 8080\n'
+        u'debug = yes\n'
+        u'mode = %(level)s\n'
+        u'level = fast\n'
+        u'[client]\n'
+        u'retries = 3\n')
+
+
+class SchemaTest(TestCase):
+    def parser(self, text=TEXT, **kwargs):
+        cfg = configlines.ConfigParser(**kwargs)
+        cfg.read_string(text, 'app.cfg')
+        return cfg
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_values(self):
+        schema = Schema({
+            'DEFAULT': {'timeout': float},
+            'server': {
+                'port': Option(int, min=1, max=65535),
+                'debug': Option(bool, default=False),
+                'mode': Option(choices=('fast', 'safe')),
+                'user': Option(default=None),
+                'timeout': int,
+            },
+            'missing': {'name': Option(default='x')},
+        })
+        values = schema.validate(self.parser())
+        self.assertEqual(values, {
+            'DEFAULT': {'timeout': 5.0},
+            'server': {'port': 8080, 'debug': True, 'mode': 'fast',
+                       'user': None, 'timeout': 5},
+            'missing': {'name': 'x'},
+        })
+        # A schema can be used again
+        values = schema.validate(self.parser(TEXT.replace(u'yes', u'off')))
+        self.assertIs(values['server']['debug'], False)
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_errors(self):
+        def even(value):
+            return value % 2 == 0
+
+        schema = Schema({
+            'server': {
+                'port': Option(int, max=1024),
+                'debug': int,
+                'mode': Option(choices=('safe',)),
+                'user': str,
+            },
+            'client': {'retries': Option(int, check=even)},
+        })
+        with self.assertRaises(SchemaError) as cm:
+            schema.validate(self.parser())
+        errors = cm.exception.errors
+        self.assertEqual([error[:2] for error in errors], [
+            ('server', 'port'),
+            ('server', 'debug'),
+            ('server', 'mode'),
+            ('server', 'user'),
+            ('client', 'retries'),
+        ])
+        self.assertEqual(errors[0], SchemaViolation(
+            'server', 'port', 'must be at most 1024', ('app.cfg', 4)))
+        self.assertEqual(errors[1].location, ('app.cfg', 5))
+        self.assertEqual(errors[2].message, "must be one of 'safe'")
+        self.assertEqual(errors[3], SchemaViolation('server', 'user',
+                                                    'missing', None))
+        self.assertEqual(errors[4], SchemaViolation(
+            'client', 'retries', 'failed even', ('app.cfg', 9)))
+        self.assertIn("[server] port (app.cfg, line 4): must be at most 1024",
+                      str(cm.exception))
+        self.assertIsInstance(cm.exception, configparser.Error)
+
+        # So are TypeErrors from types, and from constraints that can't be
+        # compared with the value (Python 2 orders any two values)
+        spec = {'server': {'level': Option(type=abs),
+                           'mode': Option(type=len, min=0)}}
+        expected = [('server', 'level', ('app.cfg', 7))]
+        if not six.PY2:
+            spec['server']['port'] = Option(str, min=5)
+            expected.insert(0, ('server', 'port', ('app.cfg', 4)))
+        with self.assertRaises(SchemaError) as cm:
+            Schema(spec).validate(self.parser())
+        self.assertEqual(sorted((section, option, location)
+                                for section, option, _, location
+                                in cm.exception.errors), sorted(expected))
+
+        # Interpolation errors are reported like any other
+        cfg = self.parser(TEXT.replace(u'level = fast\n', u''))
+        with self.assertRaises(SchemaError) as cm:
+            Schema({'server': {'mode': str}}).validate(cfg)
+        self.assertEqual(cm.exception.errors[0].location, ('app.cfg', 6))
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_unknown(self):
+        schema = Schema({
+            'server': {'port': int, 'debug': bool, 'mode': str, 'level': str},
+        }, allow_unknown=False)
+        with self.assertRaises(SchemaError) as cm:
+            schema.validate(self.parser())
+        self.assertEqual(cm.exception.errors, [
+            ('DEFAULT', 'timeout', 'unknown option', ('app.cfg', 2)),
+            ('client', None, 'unknown section', None),
+        ])
+
+        schema = Schema({
+            'DEFAULT': {'timeout': int},
+            'server': {'port': int},
+            'client': {},
+        }, allow_unknown=False)
+        with self.assertRaises(SchemaError) as cm:
+            schema.validate(self.parser(track_locations='lazy'))
+        self.assertEqual(cm.exception.errors, [
+            ('server', 'debug', 'unknown option', ('app.cfg', 5)),
+            ('server', 'mode', 'unknown option', ('app.cfg', 6)),
+            ('server', 'level', 'unknown option', ('app.cfg', 7)),
+            ('client', 'retries', 'unknown option', ('app.cfg', 9)),
+        ])
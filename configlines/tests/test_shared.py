@@ -0,0 +1,109 @@
+from unittest import TestCase, skipIf
+import sys
+import threading
+
+import six
+
+import configlines
+
+
+def version_text(version, sections=10, options=10):
+    # Every value and location in a version refers to that version, and the
+    # options move down a line each time so that stale locations show.
+    lines = ['[DEFAULT]', 'version = %d' % version]
+    lines.extend([''] * version)
+    for i in range(sections):
+        lines.append('[section%d]' % i)
+        for j in range(options):
+            lines.append('opt%d = %%(version)s.%d.%d' % (j, i, j))
+    return '\n'.join(lines) + '\n'
+
+
+class SharedConfigTest(TestCase):
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_updates(self):
+        shared = configlines.SharedConfig()
+        shared.read_string(version_text(1), 'v1.cfg')
+        first = shared.current
+        self.assertEqual(shared.get('section0', 'opt1'), '1.0.1')
+        self.assertEqual(shared['section0']['opt1'], '1.0.1')
+        self.assertEqual(shared.get_location('section0', 'opt1'),
+                         ('v1.cfg', 6))
+        self.assertEqual(shared.get_option_at('v1.cfg', 6),
+                         ('section0', 'opt1'))
+        self.assertTrue(shared.has_section('section9'))
+        self.assertIn('section9', shared)
+
+        shared.update(lambda parser: parser.remove_section('section9'))
+        self.assertFalse(shared.has_section('section9'))
+        self.assertTrue(first.has_section('section9'))
+
+        # Values that the change didn't affect stay cached
+        shared.read_dict({'section0': {'opt0': 'x'}})
+        values = shared.current._interpolated.values
+        self.assertIn(('section0', 'opt1'), values)
+        self.assertNotIn(('section0', 'opt0'), values)
+
+        # Nothing is published if the update fails
+        current = shared.current
+        with self.assertRaises(ValueError):
+            shared.update(lambda parser: parser.set('section0', 'opt0',
+                                                    'y', location=('x',)))
+        self.assertIs(shared.current, current)
+        self.assertEqual(shared.get('section0', 'opt0'), 'x')
+
+        with self.assertRaises(AttributeError):
+            shared.set('section0', 'opt0', 'y')
+
+    @skipIf(six.PY2, 'needs the Python 3 configparser API')
+    def test_stress(self):
+        # 64 readers check that everything they see in a published parser
+        # belongs to the same version, while it's replaced over and over.
+        shared = configlines.SharedConfig()
+        shared.read_string(version_text(0), 'v0.cfg')
+        errors = []
+        seen = set()
+
+        def reader(seed):
+            try:
+                for i in range(seed, seed + 2000):
+                    section = 'section%d' % (i % 10)
+                    option = 'opt%d' % (i // 10 % 10)
+                    current = shared.current
+                    value = current.get(section, option)
+                    version = value.split('.')[0]
+                    filename, lineno = current.get_location(section, option)
+                    chain = current.get_location_chain(section, option)
+                    expected = 4 + int(version) + (i % 10) * 11 + i // 10 % 10
+                    if (filename != 'v%s.cfg' % version or
+                            lineno != expected or
+                            chain[-1] != ('DEFAULT', 'version',
+                                          (filename, 2)) or
+                            current.get('DEFAULT', 'version') != version):
+                        errors.append((value, filename, lineno, chain))
+                        return
+                    seen.add(version)
+                    # Lookups that may span versions still never fail
+                    shared.get_location(section, option)
+            except Exception as e:
+                errors.append(e)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-4)
+        threads = [threading.Thread(target=reader, args=(i * 7,))
+                   for i in range(64)]
+        try:
+            for thread in threads:
+                thread.start()
+            version = 0
+            while any(thread.is_alive() for thread in threads):
+                version += 1
+                shared.read_string(version_text(version % 50),
+                                   'v%d.cfg' % (version % 50))
+        finally:
+            for thread in threads:
+                thread.join()
+            sys.setswitchinterval(interval)
+
+        self.assertEqual(errors, [])
+        self.assertGreater(len(seen), 1)